@@ -2,16 +2,13 @@ from typing import Any
 
 import hmac
 import base64
-import asyncio
 import secrets
 import datetime
 from io import BytesIO
 from datetime import timedelta
-from urllib.parse import quote
 
 import pyotp
-import aiohttp
-from quart import Response, jsonify, request, current_app, render_template
+from quart import Response, jsonify, request, render_template
 from quart_auth import (
     login_user,
     logout_user,
@@ -24,9 +21,14 @@ from qrcode.constants import ERROR_CORRECT_M
 from quart_rate_limiter import rate_limit
 
 from backend import config
-from backend.factory import cache, bcrypt, docker, schema
+from backend.factory import cache, docker, schema
 from backend.utils.mail import send_email
-from backend.utils.twofa import hash_codes, verify_and_consume, generate_backup_codes
+from backend.utils.twofa import (
+    hash_codes,
+    has_legacy_codes,
+    verify_and_consume,
+    generate_backup_codes,
+)
 from backend.utils.models import User
 from backend.utils.tokens import (
     RESET_SALT,
@@ -38,8 +40,13 @@ from backend.utils.tokens import (
     password_fingerprint,
 )
 from backend.library.utils import client_ip
-from backend.library.helpers import capture_event, verify_2fa_code
-from backend.utils.decorators import check_confirmed
+from backend.library.hashing import hasher
+from backend.library.helpers import (
+    capture_event,
+    verify_2fa_code,
+    is_temporary_email,
+)
+from backend.utils.decorators import snapshot_user, check_confirmed
 from backend.library.validation import is_valid_username
 
 from . import auth_bp
@@ -105,6 +112,13 @@ async def _login_2fa_rate_limit_key() -> str:
     return client_ip()
 
 
+# The fields a login reads: the password, the second factor and what
+# _user_dict() returns.
+_LOGIN_FIELDS = (
+    User.AUTH_FIELDS + User.TWOFA_FIELDS + ("wallet_created", "wallet_connected")
+)
+
+
 def _user_dict(user: User) -> dict[str, Any]:
     """Returns the safe, client-facing representation of a user."""
     return {
@@ -190,42 +204,28 @@ async def _register() -> tuple[Response, int]:
         ), 409
 
     try:
-        await User.get_by_email(email)
+        await User.get_by_email(email, ())
         return jsonify(
             {"status": "error", "error": "This email address is already registered."}
         ), 409
     except ValueError:
         pass
 
-    try:
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=5)
-        ) as session:
-            async with session.get(
-                f"https://block-temporary-email.com/check/email/{quote(email, safe='')}",
-                headers={
-                    "x-api-key": str(
-                        current_app.config.get("TEMP_MAIL_BLOCK_API_KEY", "")
-                    )
-                },
-            ) as res:
-                if res.status == 200 and (await res.json()).get("temporary"):
-                    return jsonify(
-                        {
-                            "status": "error",
-                            "error": "Registrations with temporary disposable "
-                            "emails are not allowed.",
-                        }
-                    ), 400
-    except (aiohttp.ClientError, asyncio.TimeoutError):
-        pass
+    if await is_temporary_email(email):
+        return jsonify(
+            {
+                "status": "error",
+                "error": "Registrations with temporary disposable "
+                "emails are not allowed.",
+            }
+        ), 400
 
     if not schema.validate(password):
         return jsonify({"status": "error", "error": PASSWORD_POLICY}), 400
 
     user = User(username=username)
     user.email = email
-    user.password = bcrypt.generate_password_hash(password).decode("utf8")
+    user.password = await hasher.hash(password)
     await user.save()
 
     token = generate_token(user.email, CONFIRM_SALT)
@@ -262,7 +262,7 @@ async def _confirm(token: str) -> tuple[Response, int]:
     try:
         if not email:
             raise ValueError
-        user = await User.get_by_email(email)
+        user = await User.get_by_email(email, User.AUTH_FIELDS)
     except ValueError:
         return jsonify(
             {
@@ -338,16 +338,16 @@ async def _login() -> tuple[Response, int]:
     password = str(data.get("password") or "")
 
     try:
-        user = await User.get_by_username(username)
+        user = await User.get_by_username(username, _LOGIN_FIELDS)
     except ValueError:
         # Equalise timing with the valid-user path so a fast response does not
         # reveal that the username is unregistered.
-        bcrypt.check_password_hash(_DUMMY_PASSWORD_HASH, password)
+        await hasher.check(_DUMMY_PASSWORD_HASH, password)
         return jsonify(
             {"status": "error", "error": "Invalid username or password."}
         ), 401
 
-    if not bcrypt.check_password_hash(user.password, password):
+    if not await hasher.check(user.password, password):
         return jsonify(
             {"status": "error", "error": "Invalid username or password."}
         ), 401
@@ -381,9 +381,12 @@ async def _login() -> tuple[Response, int]:
 @login_required
 async def _logout() -> tuple[Response, int]:
     """
-    Logs the user out, stops their wallet container, and clears wallet data.
+    Logs the user out, hibernates their wallet container, and clears wallet
+    data.
     """
-    await docker.stop_container(current_user.wallet_container)
+    await docker.hibernation.hibernate(
+        current_user.username, current_user.wallet_container
+    )
     await capture_event(current_user.username, "stop_container")
     await current_user.clear_wallet_data(
         expected_container=current_user.wallet_container
@@ -422,7 +425,7 @@ async def _reset() -> tuple[Response, int]:
     )
 
     try:
-        user = await User.get_by_email(email)
+        user = await User.get_by_email(email, User.AUTH_FIELDS)
     except ValueError:
         return generic, 200
 
@@ -476,14 +479,14 @@ async def _reset_token(token: str) -> tuple[Response, int]:
         return jsonify({"status": "error", "error": PASSWORD_POLICY}), 400
 
     try:
-        user = await User.get_by_email(email)
+        user = await User.get_by_email(email, User.AUTH_FIELDS)
     except ValueError:
         return invalid, 400
 
     if password_fingerprint(user.password) != fingerprint:
         return invalid, 400
 
-    user.password = bcrypt.generate_password_hash(password).decode("utf8")
+    user.password = await hasher.hash(password)
     user.session_version += 1
     await user.save(["password", "session_version"])
 
@@ -509,7 +512,7 @@ async def _change_password() -> tuple[Response, int]:
     confirm = str(data.get("confirm_password") or "")
     code = str(data.get("code") or "")
 
-    if not bcrypt.check_password_hash(current_user.password, current_password):
+    if not await hasher.check(current_user.password, current_password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -527,7 +530,7 @@ async def _change_password() -> tuple[Response, int]:
     if not schema.validate(password):
         return jsonify({"status": "error", "error": PASSWORD_POLICY}), 400
 
-    current_user.password = bcrypt.generate_password_hash(password).decode("utf8")
+    current_user.password = await hasher.hash(password)
     current_user.session_version += 1
     await current_user.save(["password", "session_version"])
     _issue_session(current_user.username, current_user.session_version)
@@ -578,10 +581,8 @@ async def _login_2fa() -> tuple[Response, int]:
         return expired, 400
 
     username, fingerprint = payload
-    user = User(username=str(username))
-
     try:
-        await user.load()
+        user = await User.get(str(username), _LOGIN_FIELDS)
     except ValueError:
         return expired, 400
 
@@ -596,7 +597,9 @@ async def _login_2fa() -> tuple[Response, int]:
         if pyotp.TOTP(user.totp_secret).verify(code, valid_window=TOTP_VALID_WINDOW):
             verified = True
         else:
-            matched, remaining = verify_and_consume(code, user.backup_codes)
+            matched, remaining = await verify_and_consume(
+                code, user.backup_codes, user.username
+            )
             if matched:
                 verified = True
                 used_backup = True
@@ -623,7 +626,17 @@ async def _login_2fa() -> tuple[Response, int]:
         )
         await send_email(user.email, "Backup Code Used", html)
 
-    return jsonify({"status": "success", "result": _user_dict(user)}), 200
+    result = _user_dict(user)
+    # Codes from before lookup tags cost a bcrypt each per wrong guess; swap
+    # them for tagged ones now, and show the new set once so it can be saved.
+    if method == "totp" and has_legacy_codes(user.backup_codes):
+        codes = generate_backup_codes()
+        user.backup_codes = await hash_codes(codes)
+        await user.save(["backup_codes"])
+        await capture_event(user.username, "2fa_backup_migrated")
+        result["backup_codes"] = codes
+
+    return jsonify({"status": "success", "result": result}), 200
 
 
 @auth_bp.route("/login/2fa/resend", methods=["POST"])
@@ -656,10 +669,8 @@ async def _login_2fa_resend() -> tuple[Response, int]:
         return expired, 400
 
     username, fingerprint = payload
-    user = User(username=str(username))
-
     try:
-        await user.load()
+        user = await User.get(str(username), _LOGIN_FIELDS)
     except ValueError:
         return expired, 400
 
@@ -698,7 +709,7 @@ async def _change_email() -> tuple[Response, int]:
     new_email = str(data.get("new_email") or "").strip().lower()
     code = str(data.get("code") or "")
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -721,34 +732,20 @@ async def _change_email() -> tuple[Response, int]:
         ), 400
 
     try:
-        await User.get_by_email(new_email)
+        await User.get_by_email(new_email, ())
         return jsonify(
             {"status": "error", "error": "That email address is already in use."}
         ), 409
     except ValueError:
         pass
 
-    try:
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=5)
-        ) as session:
-            async with session.get(
-                f"https://block-temporary-email.com/check/email/{quote(new_email, safe='')}",
-                headers={
-                    "x-api-key": str(
-                        current_app.config.get("TEMP_MAIL_BLOCK_API_KEY", "")
-                    )
-                },
-            ) as res:
-                if res.status == 200 and (await res.json()).get("temporary"):
-                    return jsonify(
-                        {
-                            "status": "error",
-                            "error": "Temporary disposable emails are not allowed.",
-                        }
-                    ), 400
-    except (aiohttp.ClientError, asyncio.TimeoutError):
-        pass
+    if await is_temporary_email(new_email):
+        return jsonify(
+            {
+                "status": "error",
+                "error": "Temporary disposable emails are not allowed.",
+            }
+        ), 400
 
     token = generate_token(
         [
@@ -808,7 +805,7 @@ async def _change_email_confirm(token: str) -> tuple[Response, int]:
         return invalid, 400
 
     try:
-        existing = await User.get_by_email(new_email)
+        existing = await User.get_by_email(new_email, ())
         if existing.username != current_user.username:
             return jsonify(
                 {"status": "error", "error": "That email address is already in use."}
@@ -849,7 +846,7 @@ async def _2fa_email_enable() -> tuple[Response, int]:
     data = await request.get_json(silent=True) or {}
     password = str(data.get("password") or "")
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -892,7 +889,7 @@ async def _2fa_email_disable() -> tuple[Response, int]:
     password = str(data.get("password") or "")
     code = str(data.get("code") or "")
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -929,7 +926,7 @@ async def _2fa_totp_setup() -> tuple[Response, int]:
     data = await request.get_json(silent=True) or {}
     password = str(data.get("password") or "")
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -989,7 +986,7 @@ async def _2fa_totp_verify() -> tuple[Response, int]:
 
     codes = generate_backup_codes()
     current_user.totp_secret = secret
-    current_user.backup_codes = hash_codes(codes)
+    current_user.backup_codes = await hash_codes(codes)
     current_user.totp_enabled = True
     current_user.email_2fa = False  # the authenticator app supersedes email
     await current_user.save(
@@ -1022,7 +1019,7 @@ async def _2fa_totp_disable() -> tuple[Response, int]:
     password = str(data.get("password") or "")
     code = str(data.get("code") or "").strip()
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -1039,7 +1036,9 @@ async def _2fa_totp_disable() -> tuple[Response, int]:
         )
     )
     if not valid:
-        valid, remaining = verify_and_consume(code, current_user.backup_codes)
+        valid, remaining = await verify_and_consume(
+            code, current_user.backup_codes, current_user.username
+        )
         current_user.backup_codes = remaining
 
     if not valid:
@@ -1077,7 +1076,7 @@ async def _2fa_backup_regenerate() -> tuple[Response, int]:
     password = str(data.get("password") or "")
     code = str(data.get("code") or "").strip()
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify(
             {"status": "error", "error": "Current password is incorrect."}
         ), 400
@@ -1095,7 +1094,7 @@ async def _2fa_backup_regenerate() -> tuple[Response, int]:
         ), 400
 
     codes = generate_backup_codes()
-    current_user.backup_codes = hash_codes(codes)
+    current_user.backup_codes = await hash_codes(codes)
     await current_user.save(["backup_codes"])
 
     await capture_event(current_user.username, "2fa_backup_regenerated")
@@ -1140,6 +1139,7 @@ async def _2fa_step_up_send() -> tuple[Response, int]:
 
 
 @auth_bp.route("/me", methods=["GET"])
+@snapshot_user
 @login_required
 async def _me() -> tuple[Response, int]:
     """
@@ -1,7 +1,8 @@
 from quart import Response, jsonify
 from quart_rate_limiter import rate_exempt
 
-from backend.factory import db, cache, daemon, docker
+from backend.factory import db, cache, docker
+from backend.library.chain import chain
 from backend.library.helpers import on_maintenance
 
 from . import meta_bp
@@ -13,7 +14,7 @@ async def _info() -> tuple[Response, int]:
     Returns node information and cached coin market data for the home page.
     """
     try:
-        node = await daemon.get_info()
+        node = await chain.get_info()
     except Exception:
         node = {}
 
@@ -40,7 +41,9 @@ async def _status() -> tuple[Response, int]:
             "result": {
                 "redis": (await cache.redis.ping()),  # type: ignore[misc]
                 "mongodb": (await db.client.admin.command("ping")) == {"ok": 1.0},
-                "docker": docker.client.ping(),
+                "docker": all(
+                    [await node.engine.ping() for node in docker.nodes.values()]
+                ),
             },
         }
     ), 200
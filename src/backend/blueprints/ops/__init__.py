@@ -0,0 +1,5 @@
+from quart import Blueprint
+
+ops_bp: Blueprint = Blueprint("ops", __name__, url_prefix="/ops")
+
+from . import routes as routes  # noqa: E402
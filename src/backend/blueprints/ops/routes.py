@@ -0,0 +1,23 @@
+from quart import Response, jsonify
+
+from backend.factory import docker
+from backend.library.hashing import hasher
+from backend.library.metrics import metrics
+from backend.utils.decorators import require_metrics_token
+
+from . import ops_bp
+
+
+@ops_bp.route("/metrics", methods=["GET"])
+@require_metrics_token
+async def _metrics() -> tuple[Response, int]:
+    """
+    Returns this worker's operational counters and latencies.
+    """
+    result = metrics.snapshot()
+    if docker.pool is not None:
+        result["pool"] = await docker.pool.stats()
+    result["hibernated"] = await docker.hibernation.count()
+    result["hashing"] = hasher.stats()
+
+    return jsonify({"status": "success", "result": result}), 200
@@ -1,5 +1,3 @@
-from typing import Any
-
 import json
 import base64
 import string
@@ -8,7 +6,7 @@ from asyncio import sleep
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 from secrets import token_hex
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, timedelta
 
 from PIL import Image
 from quart import Response, jsonify, request
@@ -23,16 +21,27 @@ from quart_rate_limiter import rate_limit
 from redis.asyncio.lock import Lock
 
 from backend import config
-from backend.factory import cache, bcrypt, daemon, docker
+from backend.factory import cache, docker
 from backend.library.rpc import Wallet
 from backend.utils.models import User
-from backend.library.utils import client_ip, to_atomic, sort_transactions
+from backend.library.chain import chain
+from backend.library.utils import client_ip, to_atomic
+from backend.library.address import decode_address, integrated_address
+from backend.library.clients import wallet_clients
+from backend.library.hashing import hasher
 from backend.library.helpers import (
     capture_event,
     verify_step_up,
     verify_2fa_code,
 )
-from backend.utils.decorators import check_confirmed
+from backend.library.history import (
+    SPENDABLE_AGE,
+    TransferFilters,
+    decode_cursor,
+    encode_cursor,
+    transfer_history,
+)
+from backend.utils.decorators import snapshot_user, check_confirmed
 from backend.library.validation import validate_seed, validate_restore_height
 
 from . import wallet_bp
@@ -53,8 +62,64 @@ ESTIMATE_IP_PERIOD = timedelta(minutes=1)
 ESTIMATE_ACCOUNT_LIMIT = 30
 ESTIMATE_ACCOUNT_PERIOD = timedelta(minutes=1)
 
-# Blocks an output stays locked after its block before it becomes spendable.
-SPENDABLE_AGE = 10
+# Seconds the dashboard waits on each wallet call, and on the price and
+# network height, which it can do without.
+OVERVIEW_DEADLINE = 10
+OVERVIEW_OPTIONAL_DEADLINE = 2
+
+# Transfers per history page by default, and at most.
+TRANSFERS_PAGE_SIZE = 50
+TRANSFERS_PAGE_MAX = 200
+TRANSFER_TYPES = ("in", "out", "pending", "pool", "failed")
+
+
+def _transfers_query() -> tuple[int, tuple[int, str] | None, TransferFilters]:
+    """Parse the paging and filter arguments of a transfers request.
+
+    Raises ValueError on a malformed argument.
+    """
+    args = request.args
+
+    def number(name: str) -> int | None:
+        value = args.get(name)
+        if value is None or value == "":
+            return None
+        parsed = int(value)
+        if parsed < 0:
+            raise ValueError(f"{name} must not be negative")
+        return parsed
+
+    limit = number("limit") or TRANSFERS_PAGE_SIZE
+    cursor = args.get("cursor")
+    types = None
+    if args.get("type"):
+        types = [t.strip() for t in args["type"].split(",") if t.strip()]
+        if not types or any(t not in TRANSFER_TYPES for t in types):
+            raise ValueError("Invalid transfer type")
+
+    return (
+        min(limit, TRANSFERS_PAGE_MAX),
+        decode_cursor(cursor) if cursor else None,
+        TransferFilters(
+            types=types,
+            since=number("from"),
+            until=number("to"),
+            min_amount=number("min_amount"),
+            max_amount=number("max_amount"),
+        ),
+    )
+
+
+async def _primary_address(wallet: Wallet) -> str:
+    """Return the user's primary address, reading it from the wallet RPC (and
+    storing it) only the first time.
+    """
+    if current_user.wallet_address:
+        return current_user.wallet_address
+
+    address = await wallet.get_address()
+    await current_user.remember_address(address)
+    return address
 
 
 async def _account_rate_limit_key() -> str:
@@ -83,17 +148,23 @@ async def _release_wallet_lock(lock: Lock) -> None:
 
 
 def _wallet_rpc(timeout: int | None = None) -> Wallet:
-    """Builds a Wallet RPC client for the current user's running container."""
-    kwargs: dict[str, Any] = {
-        "host": docker.rpc_host(current_user.username),
-        "port": current_user.wallet_port,
-        "ssl": False,
-        "username": current_user.username,
-        "password": current_user.wallet_password,
-    }
+    """Returns the pooled Wallet RPC client for the current user's running container."""
+    username, password = current_user.username, current_user.wallet_password or ""
+    if current_user.wallet_rpc_login:
+        # A container claimed from the warm pool keeps its own RPC login.
+        username, _, password = current_user.wallet_rpc_login.partition(":")
+
+    wallet = wallet_clients.get(
+        current_user.username,
+        current_user.wallet_container or "",
+        (username, password),
+        host=docker.rpc_host(current_user.username, current_user.wallet_node),
+        port=current_user.wallet_port,
+        ssl=False,
+    )
     if timeout is not None:
-        kwargs["timeout"] = timeout
-    return Wallet(**kwargs)
+        return wallet.with_timeout(timeout)
+    return wallet
 
 
 def _branded_qr(data: str) -> bytes:
@@ -119,6 +190,7 @@ def _branded_qr(data: str) -> bytes:
 
 
 @wallet_bp.route("/status", methods=["GET"])
+@snapshot_user
 @login_required
 @check_confirmed
 async def _status() -> tuple[Response, int]:
@@ -185,7 +257,7 @@ async def _setup() -> tuple[Response, int]:
             ), 400
 
         try:
-            network_height = int((await daemon.get_info())["height"])
+            network_height = int((await chain.get_info())["height"])
         except Exception:
             return jsonify(
                 {
@@ -228,7 +300,8 @@ async def _setup() -> tuple[Response, int]:
         ), 409
 
     try:
-        await current_user.load()
+        # Re-read under the lock: another request may have just set it up.
+        await current_user.load(["wallet_created"], refresh=True)
         if current_user.wallet_created:
             return jsonify(
                 {"status": "error", "error": "Wallet already exists."}
@@ -273,7 +346,8 @@ async def _connect() -> tuple[Response, int]:
         ), 409
 
     try:
-        await current_user.load()
+        # Re-read under the lock: another request may have just connected.
+        await current_user.load(["wallet_created", "wallet_connected"], refresh=True)
         if not current_user.wallet_created:
             return jsonify(
                 {"status": "error", "error": "Wallet not yet created."}
@@ -292,18 +366,11 @@ async def _connect() -> tuple[Response, int]:
                 {"status": "error", "error": "Failed to connect wallet."}
             ), 500
 
-        current_user.wallet_connected = await docker.container_exists(container)
-        current_user.wallet_port = port
-        current_user.wallet_container = container
-        current_user.wallet_started_at = datetime.now(UTC)
-        await current_user.save(
-            [
-                "wallet_connected",
-                "wallet_port",
-                "wallet_container",
-                "wallet_started_at",
-            ]
+        started_at = await current_user.start_session(
+            container, port, await docker.container_exists(container)
         )
+        await docker.expiry.schedule(current_user.username, started_at)
+        await docker.presync.seen(current_user.username)
 
         await capture_event(current_user.username, "start_wallet")
     finally:
@@ -315,6 +382,7 @@ async def _connect() -> tuple[Response, int]:
 
 
 @wallet_bp.route("/keepalive", methods=["POST"])
+@snapshot_user
 @login_required
 @check_confirmed
 async def _keepalive() -> tuple[Response, int]:
@@ -334,12 +402,12 @@ async def _keepalive() -> tuple[Response, int]:
             }
         ), 409
 
-    current_user.wallet_started_at = datetime.now(UTC)
-    await current_user.save(["wallet_started_at"])
+    started_at = await current_user.keep_alive()
+    await docker.expiry.schedule(current_user.username, started_at)
+    await docker.presync.seen(current_user.username)
 
     expires_at = (
-        current_user.wallet_started_at
-        + timedelta(seconds=config.PERMANENT_SESSION_LIFETIME)
+        started_at + timedelta(seconds=config.PERMANENT_SESSION_LIFETIME)
     ).isoformat()
 
     return jsonify(
@@ -352,6 +420,7 @@ async def _keepalive() -> tuple[Response, int]:
 
 
 @wallet_bp.route("", methods=["GET"])
+@snapshot_user
 @login_required
 @check_confirmed
 async def _overview() -> tuple[Response, int]:
@@ -381,7 +450,27 @@ async def _overview() -> tuple[Response, int]:
 
     wallet = _wallet_rpc()
 
-    if not await wallet.connected:
+    # The calls are independent, so they overlap: the dashboard costs about
+    # one round-trip instead of one per call.
+    results = await Wallet.gather(
+        {
+            "height": wallet.height(),
+            "address": _primary_address(wallet),
+            "transfers": transfer_history.sync(current_user.username, wallet),
+            "balances": wallet.get_balances(),
+            "coin": cache.get_coin_info(),
+            "info": chain.get_info(),
+        },
+        deadline=OVERVIEW_DEADLINE,
+        deadlines={
+            "coin": OVERVIEW_OPTIONAL_DEADLINE,
+            "info": OVERVIEW_OPTIONAL_DEADLINE,
+        },
+    )
+
+    try:
+        wallet_height = int(results["height"]["result"]["height"])
+    except (TypeError, KeyError, ValueError):
         return jsonify(
             {
                 "status": "error",
@@ -390,16 +479,20 @@ async def _overview() -> tuple[Response, int]:
             }
         ), 409
 
-    address = await wallet.get_address()
-    transfers = await wallet.get_transfers()
-    transactions = [tx for t in transfers.values() for tx in t]
-    balance, unlocked_balance = await wallet.get_balances()
-
-    coin = await cache.get_coin_info()
-    wallet_height = int((await wallet.height())["result"]["height"])
+    for name in ("address", "transfers", "balances"):
+        if isinstance(results[name], BaseException):
+            raise results[name]
+    address = results["address"]
+    unconfirmed = results["transfers"]
+    balance, unlocked_balance = results["balances"]
+
+    # The price and network height degrade to placeholders when slow.
+    coin = results["coin"]
+    if isinstance(coin, BaseException):
+        coin = {}
     try:
-        network_height = int((await daemon.get_info())["height"])
-    except Exception:
+        network_height = int(results["info"]["height"])
+    except (TypeError, KeyError, ValueError):
         network_height = wallet_height
 
     started = current_user.wallet_started_at
@@ -411,21 +504,15 @@ async def _overview() -> tuple[Response, int]:
             started + timedelta(seconds=config.PERMANENT_SESSION_LIFETIME)
         ).isoformat()
 
+    transactions, next_cursor = await transfer_history.page(
+        current_user.username, unconfirmed, TRANSFERS_PAGE_SIZE
+    )
+
     blocks_to_unlock = 0
     if balance > unlocked_balance:
-        for tx in transactions:
-            # Any still-locked output (a received tx, or the change from a sent
-            # one) unlocks SPENDABLE_AGE blocks after its block, unless a longer
-            # custom unlock height is set. Unconfirmed (pool) txs have no height
-            # yet, so estimate the lock from the current tip.
-            if not tx.get("locked"):
-                continue
-            height = int(tx.get("height") or 0) or wallet_height
-            unlock_height = height + SPENDABLE_AGE
-            unlock_time = int(tx.get("unlock_time") or 0)
-            if 0 < unlock_time < 500_000_000:
-                unlock_height = max(unlock_height, unlock_time)
-            blocks_to_unlock = max(blocks_to_unlock, unlock_height - wallet_height)
+        blocks_to_unlock = await transfer_history.blocks_to_unlock(
+            current_user.username, wallet_height, unconfirmed
+        )
         # Locked balance with nothing pinning a future unlock height yet (e.g. a
         # just-sent change tx still unconfirmed) — show a full lock rather than 0.
         if blocks_to_unlock <= 0:
@@ -441,7 +528,8 @@ async def _overview() -> tuple[Response, int]:
                 "email": current_user.email,
                 "balance": str(balance),
                 "unlocked_balance": str(unlocked_balance),
-                "sorted_transactions": sort_transactions(transfers),
+                "sorted_transactions": transactions,
+                "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
                 "price": coin.get("current_price", 0),
                 "wallet_height": wallet_height,
                 "network_height": network_height,
@@ -453,31 +541,47 @@ async def _overview() -> tuple[Response, int]:
 
 
 @wallet_bp.route("/address", methods=["GET"])
+@snapshot_user
 @login_required
 @check_confirmed
 async def _address() -> tuple[Response, int]:
     """
-    Returns the user's primary wallet address.
+    Returns the user's primary wallet address. Once it is known, no running
+    wallet is needed.
     """
-    wallet = _wallet_rpc()
+    if not current_user.wallet_address:
+        wallet = _wallet_rpc()
 
-    if not await wallet.connected:
-        return jsonify(
-            {"status": "error", "error": "Wallet RPC interface is unavailable."}
-        ), 503
+        if not await wallet.connected:
+            return jsonify(
+                {"status": "error", "error": "Wallet RPC interface is unavailable."}
+            ), 503
+
+        await _primary_address(wallet)
 
     return jsonify(
-        {"status": "success", "result": {"address": await wallet.get_address()}}
+        {"status": "success", "result": {"address": current_user.wallet_address}}
     ), 200
 
 
 @wallet_bp.route("/transfers", methods=["GET"])
+@snapshot_user
 @login_required
 @check_confirmed
 async def _transfers() -> tuple[Response, int]:
     """
-    Returns the user's transfers, both raw and with running balances.
+    Returns a page of the user's transfers with running balances, newest
+    first. Takes a cursor from the previous page, a limit, and optional type
+    (comma-separated), from/to (unix timestamps) and min_amount/max_amount
+    (atomic units) filters.
     """
+    try:
+        limit, cursor, filters = _transfers_query()
+    except ValueError:
+        return jsonify(
+            {"status": "error", "error": "Invalid transfer query parameters."}
+        ), 400
+
     wallet = _wallet_rpc()
 
     if not await wallet.connected:
@@ -485,36 +589,43 @@ async def _transfers() -> tuple[Response, int]:
             {"status": "error", "error": "Wallet RPC interface is unavailable."}
         ), 503
 
-    transfers = await wallet.get_transfers()
+    unconfirmed = await transfer_history.sync(current_user.username, wallet)
+    transactions, next_cursor = await transfer_history.page(
+        current_user.username, unconfirmed, limit, cursor, filters
+    )
 
     return jsonify(
         {
             "status": "success",
             "result": {
-                "sorted_transactions": sort_transactions(transfers),
+                "sorted_transactions": transactions,
+                "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
             },
         }
     ), 200
 
 
 @wallet_bp.route("/qr", methods=["GET"])
+@snapshot_user
 @login_required
 @check_confirmed
 async def _qr() -> Response:
     """
     Returns a branded PNG QR code encoding the user's wallet address.
     """
-    wallet = _wallet_rpc()
+    address = current_user.wallet_address
+    if not address:
+        wallet = _wallet_rpc()
 
-    if not current_user.wallet_container or not await docker.container_exists(
-        current_user.wallet_container
-    ):
-        return Response(status=409)
+        if not current_user.wallet_container or not await docker.container_exists(
+            current_user.wallet_container
+        ):
+            return Response(status=409)
 
-    if not await wallet.connected:
-        return Response(status=409)
+        if not await wallet.connected:
+            return Response(status=409)
 
-    address = await wallet.get_address()
+        address = await _primary_address(wallet)
 
     return Response(_branded_qr(f"nerva:{address}"), mimetype="image/png")
 
@@ -540,28 +651,31 @@ async def _integrated_address() -> tuple[Response, int]:
             }
         ), 400
 
-    wallet = _wallet_rpc()
+    address = current_user.wallet_address
+    if not address:
+        wallet = _wallet_rpc()
 
-    if not await wallet.connected:
-        return jsonify(
-            {
-                "status": "error",
-                "error": "Wallet RPC interface is unavailable.",
-                "code": "not_connected",
-            }
-        ), 409
+        if not await wallet.connected:
+            return jsonify(
+                {
+                    "status": "error",
+                    "error": "Wallet RPC interface is unavailable.",
+                    "code": "not_connected",
+                }
+            ), 409
 
-    result = await wallet.make_integrated_address(payment_id)
-    qr = base64.b64encode(
-        _branded_qr(f"nerva:{result['integrated_address']}")
-    ).decode()
+        address = await _primary_address(wallet)
+
+    payment_id = payment_id or token_hex(8)
+    address = integrated_address(address, payment_id)
+    qr = base64.b64encode(_branded_qr(f"nerva:{address}")).decode()
 
     return jsonify(
         {
             "status": "success",
             "result": {
-                "integrated_address": result["integrated_address"],
-                "payment_id": result["payment_id"],
+                "integrated_address": address,
+                "payment_id": payment_id,
                 "qr": f"data:image/png;base64,{qr}",
             },
         }
@@ -654,6 +768,8 @@ async def _transfer() -> tuple[Response, int]:
         ), 400
 
     await capture_event(current_user.username, "tx_success")
+    if docker.pool is not None:
+        await docker.pool.checkpoint(current_user.wallet_container)
 
     return jsonify(
         {"status": "success", "message": "The transaction has been sent."}
@@ -692,7 +808,9 @@ async def _transfer_prepare() -> tuple[Response, int]:
             }
         ), 503
 
-    if not await wallet.validate_address(address):
+    try:
+        decoded = decode_address(address)
+    except ValueError:
         return jsonify(
             {"status": "error", "error": "Invalid Nerva address provided."}
         ), 400
@@ -708,7 +826,7 @@ async def _transfer_prepare() -> tuple[Response, int]:
                 }
             ), 400
 
-        if await wallet.is_integrated(address):
+        if decoded.integrated:
             return jsonify(
                 {
                     "status": "error",
@@ -717,6 +835,14 @@ async def _transfer_prepare() -> tuple[Response, int]:
                 }
             ), 400
 
+        if decoded.subaddress:
+            return jsonify(
+                {
+                    "status": "error",
+                    "error": "Payment IDs can't be used with subaddresses.",
+                }
+            ), 400
+
     amount: int | None = None
     if not sweep:
         try:
@@ -815,7 +941,7 @@ async def _secrets() -> tuple[Response, int]:
     password = str(data.get("password") or "")
     code = str(data.get("code") or "")
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify({"status": "error", "error": "Invalid password."}), 401
 
     if not await verify_2fa_code(current_user, code):
@@ -830,18 +956,7 @@ async def _secrets() -> tuple[Response, int]:
             {"status": "error", "error": "Wallet RPC interface is unavailable."}
         ), 503
 
-    return jsonify(
-        {
-            "status": "success",
-            "result": {
-                "mnemonic_seed": await wallet.seed(),
-                "public_spend_key": await wallet.public_spend_key(),
-                "secret_spend_key": await wallet.secret_spend_key(),
-                "public_view_key": await wallet.public_view_key(),
-                "secret_view_key": await wallet.secret_view_key(),
-            },
-        }
-    ), 200
+    return jsonify({"status": "success", "result": await wallet.keys()}), 200
 
 
 @wallet_bp.route("/delete", methods=["POST"])
@@ -866,7 +981,7 @@ async def _delete() -> tuple[Response, int]:
             {"status": "error", "error": "Please confirm deletion of the wallet."}
         ), 400
 
-    if not bcrypt.check_password_hash(current_user.password, password):
+    if not await hasher.check(current_user.password, password):
         return jsonify({"status": "error", "error": "Invalid password."}), 401
 
     if not await verify_2fa_code(current_user, code):
@@ -886,6 +1001,10 @@ async def _delete() -> tuple[Response, int]:
 
     try:
         await docker.stop_container(current_user.wallet_container)
+        await docker.hibernation.discard(current_user.username)
+        if docker.pool is not None:
+            await docker.pool.discard(current_user.username)
+        await docker.stop_presync(current_user.username)
         await capture_event(current_user.username, "stop_container")
 
         await sleep(2)
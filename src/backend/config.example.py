@@ -1,6 +1,12 @@
 # Security
 SECRET_KEY = "secret_key"
 PASSWORD_SALT = "password_salt"
+# bcrypt runs on this many threads per worker, off the event loop; beyond
+# PASSWORD_HASH_QUEUE waiting calls, requests get a 503 instead of queueing.
+PASSWORD_HASH_WORKERS = 4
+PASSWORD_HASH_QUEUE = 32
+# Bearer token operators present to read /v1/ops/metrics. Empty disables it.
+METRICS_TOKEN = ""
 
 # MongoDB
 MONGO_URI = (
@@ -10,6 +16,11 @@ MONGO_DB = "database_name"
 
 # Redis
 REDIS_URL = "redis://:password@host:port/0"
+# In-process cache of small, hot Redis values (e.g. the maintenance flag):
+# keys kept per worker and seconds each is served. Writes are pushed to every
+# worker over Redis pub/sub. 0 keys disables it.
+CACHE_LOCAL_SIZE = 1024
+CACHE_LOCAL_TTL = 30
 
 # Rate Limiting
 RATE_LIMIT_COUNT = 120
@@ -21,10 +32,48 @@ FRONTEND_URL = "http://localhost:3000"
 # Docker
 NERVA_DOCKER_IMAGE = "sn1f3rt/nerva:latest"
 PERMANENT_SESSION_LIFETIME = 3600
+WALLET_EXPIRY_INTERVAL = 5  # Seconds between expired-session reaper ticks
+WALLET_RECONCILE_INTERVAL = 300  # Seconds between Docker/DB reconcile cycles
+WALLET_RECONCILE_GRACE = 300  # Age before an unclaimed container is an orphan
+# Expired and logged-out wallet containers are paused rather than stopped, so
+# the next /connect resumes them instantly. They are stopped after this many
+# seconds paused (0 disables hibernation), or oldest first beyond the cap.
+WALLET_HIBERNATE_LIFETIME = 3600
+WALLET_HIBERNATE_MAX = 50  # Most paused containers kept in memory at once
 # Empty for the run-on-host model (wallet RPC published to 127.0.0.1). In the
 # containerized stack, set this to the shared Docker network name so the app
 # reaches spawned wallet containers by name (e.g. "nervault").
 WALLET_NETWORK = ""
+# Wallet RPC clients (keep-alive connection plus digest-auth challenge) kept
+# per worker, and the seconds an unused one is kept for.
+WALLET_CLIENT_CACHE_SIZE = 1000
+WALLET_CLIENT_IDLE_TTL = 300
+# Warm pool: idle wallet-rpc containers kept running so /connect claims one
+# instead of cold-starting. 0 disables the pool.
+WALLET_POOL_SIZE = 0
+WALLET_POOL_REFILL_RATE = 2  # Containers started per refill tick
+WALLET_POOL_REFILL_INTERVAL = 5  # Seconds between refill ticks
+# Off-peak pre-sync: refresh-only containers catch idle wallets of recently
+# active users up with the chain, so their next /connect scans few blocks.
+# 0 disables it.
+WALLET_PRESYNC_CONCURRENCY = 0
+WALLET_PRESYNC_HOURS = (2, 6)  # UTC hours [start, end) runs may start in
+WALLET_PRESYNC_INTERVAL = 3600  # Seconds between pre-sync runs
+WALLET_PRESYNC_ACTIVE_DAYS = 14  # Only users with a session this recently
+WALLET_PRESYNC_BLOCK_BUDGET = 100000  # Most blocks (estimated) scanned per run
+WALLET_PRESYNC_TIMEOUT = 900  # Seconds before a pre-sync container is stopped
+WALLET_POOL_MAX_REUSE = 1  # Sessions a pooled container serves before retiring
+# Engine API client (DOCKER_HOST or the local socket): per-call timeout in
+# seconds and the most simultaneous connections.
+DOCKER_API_TIMEOUT = 10
+DOCKER_API_POOL_SIZE = 32
+# Docker nodes wallets are placed on, e.g.
+# [{"name": "a", "host": "tcp://10.0.0.2:2376", "address": "10.0.0.2",
+#   "weight": 2, "max_wallets": 200}, ...]. New wallets go to the node with the
+# most memory per running container (times weight); "address" is where the
+# app reaches published RPC ports. The first node runs the warm pool. Empty
+# uses DOCKER_HOST (or the local socket) only.
+DOCKER_NODES: list[dict[str, object]] = []
 
 # Daemon
 DAEMON_HOST = "localhost"
@@ -32,6 +81,20 @@ DAEMON_PORT = 17566
 DAEMON_SSL = False
 DAEMON_USERNAME = "username"
 DAEMON_PASSWORD = "password"
+# Optional caching proxy shared by all wallet containers (python -m
+# backend.proxy). Set DAEMON_PROXY_ADDRESS to the URL wallets reach it at
+# (e.g. "http://daemon-proxy:17566" on the stack network) to route them through
+# it; leave empty to point wallets straight at the daemon.
+DAEMON_PROXY_ADDRESS = ""
+DAEMON_PROXY_BIND = "0.0.0.0"
+DAEMON_PROXY_PORT = 17566
+DAEMON_PROXY_CACHE_DIR = "/var/cache/nervault/blocks"
+DAEMON_PROXY_CACHE_MB = 2048  # Bound on the on-disk block cache
+# The chain tip (daemon get_info) is polled by one worker every
+# CHAIN_POLL_INTERVAL seconds and shared through Redis; readers accept info
+# up to CHAIN_MAX_AGE seconds old before polling themselves.
+CHAIN_POLL_INTERVAL = 5
+CHAIN_MAX_AGE = 30
 
 # Email
 MAIL_HOST = "localhost"
@@ -43,8 +106,18 @@ MAIL_USERNAME = "email@example.com"
 MAIL_PASSWORD = "password"
 MAIL_DEFAULT_SENDER = "NerVault <email@example.com>"
 
+# Outbound HTTP (CoinGecko, temp-mail checks): default timeout in seconds,
+# pooled connections in total and per host, and seconds DNS lookups are cached.
+HTTP_TIMEOUT = 10
+HTTP_POOL_SIZE = 100
+HTTP_POOL_PER_HOST = 10
+HTTP_DNS_TTL = 300
+
 # COINGECKO
 COINGECKO_API_KEY = "coingecko_api_key"
+# Seconds coin info is served before it counts as stale; it is refreshed in
+# the background ahead of that, and the last good copy is kept on errors.
+COIN_INFO_TTL = 900
 
 # TEMP MAIL BLOCK
 TEMP_MAIL_BLOCK_API_KEY = "temp_mail_block_api_key"
@@ -22,6 +22,7 @@ from backend.utils.csrf import init_csrf
 from backend.library.utils import client_ip
 
 if TYPE_CHECKING:
+    from backend.library.http import HTTPClient
     from backend.library.cache import Cache
     from backend.library.docker import Docker
 
@@ -31,6 +32,7 @@ cache: Cache
 daemon: DaemonHTTP
 db: AsyncDatabase[Any]
 docker: Docker
+http: HTTPClient
 schema: PasswordValidator
 
 
@@ -80,11 +82,21 @@ async def create_app() -> Quart:
             "(the config.example.py placeholders are not allowed)."
         )
 
-    global bcrypt, cache, daemon, db, docker, schema
+    global bcrypt, cache, daemon, db, docker, http, schema
 
     # Initialize bcrypt for password hashing
     bcrypt = Bcrypt(app)
 
+    # Initialize the pooled client for outbound HTTP (CoinGecko, temp-mail checks)
+    from backend.library.http import HTTPClient
+
+    http = HTTPClient(
+        timeout=app.config.get("HTTP_TIMEOUT", 10),
+        pool_size=app.config.get("HTTP_POOL_SIZE", 100),
+        per_host=app.config.get("HTTP_POOL_PER_HOST", 10),
+        dns_ttl=app.config.get("HTTP_DNS_TTL", 300),
+    )
+
     # Initialize cache (Redis)
     from backend.library.cache import Cache
 
@@ -114,6 +126,7 @@ async def create_app() -> Quart:
     from backend.library.docker import Docker
 
     docker = Docker()
+    await docker.check()
 
     # Set up password validation schema
     schema = PasswordValidator()
@@ -141,8 +154,13 @@ async def create_app() -> Quart:
             if _is_public_endpoint():
                 return
 
+            # Polled views marked @snapshot_user only need the cached snapshot.
+            view = app.view_functions.get(request.endpoint or "")
             try:
-                await current_user.load()  # type: ignore[attr-defined]
+                if getattr(view, "snapshot_user", False):
+                    await current_user.load_snapshot()  # type: ignore[attr-defined]
+                else:
+                    await current_user.load()  # type: ignore[attr-defined]
             except ValueError:
                 # The cookie names a user that no longer exists: clear the stale
                 # session instead of proceeding with a default "ghost" user.
@@ -168,19 +186,123 @@ async def create_app() -> Quart:
 
             return None
 
-        # Background task: clean up stale/expired wallet containers every hour
+        # Background task: hibernate wallet containers as their sessions expire,
+        # stop them once they have been hibernated for too long, and retry
+        # pooled releases whose wallet copy-back failed
+        @app.before_serving
+        async def _start_expiry_loop() -> None:
+            interval: int = app.config.get("WALLET_EXPIRY_INTERVAL", 5)
+
+            async def _expiry_loop() -> None:
+                try:
+                    scheduled = await docker.expiry.rebuild()
+                    app.logger.info(f"Scheduled {scheduled} wallet session(s)")
+                except Exception:
+                    app.logger.exception("Failed to schedule wallet sessions")
+
+                while True:
+                    try:
+                        reaped = await docker.expiry.reap()
+                        if reaped:
+                            app.logger.info(f"Reaped {reaped} wallet session(s)")
+                    except Exception:
+                        app.logger.exception("Failed to reap wallet sessions")
+                    try:
+                        stopped = await docker.hibernation.reap()
+                        if stopped:
+                            app.logger.info(
+                                f"Stopped {stopped} hibernated wallet(s)"
+                            )
+                    except Exception:
+                        app.logger.exception("Failed to stop hibernated wallets")
+                    if docker.pool is not None:
+                        try:
+                            released = await docker.pool.retry_releases()
+                            if released:
+                                app.logger.info(
+                                    f"Released {released} pooled wallet(s)"
+                                )
+                        except Exception:
+                            app.logger.exception("Failed to release pooled wallets")
+                    await asyncio.sleep(interval)
+
+            app.add_background_task(_expiry_loop)
+
+        # Background task: reconcile Docker resources with the database
+        @app.before_serving
+        async def _start_reconcile_loop() -> None:
+            interval: int = app.config.get("WALLET_RECONCILE_INTERVAL", 300)
+
+            async def _reconcile_loop() -> None:
+                while True:
+                    await asyncio.sleep(interval)
+                    try:
+                        result = await docker.reconciler.run()
+                        if result and any(result.values()):
+                            app.logger.info(f"Reconciled wallet resources: {result}")
+                    except Exception:
+                        app.logger.exception("Failed to reconcile wallet resources")
+
+            app.add_background_task(_reconcile_loop)
+
+        # Background task: follow Docker events to keep each node's container index current
+        @app.before_serving
+        async def _start_docker_index() -> None:
+            for node in docker.nodes.values():
+                app.add_background_task(node.index.follow, node.engine)
+
+        # Background task: catch idle wallets up with the chain off-peak
+        @app.before_serving
+        async def _start_presync_loop() -> None:
+            if docker.presync.concurrency <= 0:
+                return
+
+            interval: int = app.config.get("WALLET_PRESYNC_INTERVAL", 3600)
+
+            async def _presync_loop() -> None:
+                while True:
+                    await asyncio.sleep(interval)
+                    try:
+                        synced = await docker.presync.run()
+                        if synced:
+                            app.logger.info(f"Pre-synced {synced} idle wallet(s)")
+                    except Exception:
+                        app.logger.exception("Failed to pre-sync idle wallets")
+
+            app.add_background_task(_presync_loop)
+
+        # Background task: drop locally cached keys as other workers write them
         @app.before_serving
-        async def _start_cleanup_loop() -> None:
-            async def _cleanup_loop() -> None:
+        async def _start_cache_invalidations() -> None:
+            app.add_background_task(cache.listen_invalidations)
+
+        # Background task: follow the chain tip for the height consumers
+        @app.before_serving
+        async def _start_chain_watcher() -> None:
+            from backend.library.chain import chain
+
+            app.add_background_task(chain.run)
+
+        # Background task: keep the warm pool of wallet containers topped up
+        @app.before_serving
+        async def _start_pool_loop() -> None:
+            pool = docker.pool
+            if pool is None:
+                return
+
+            interval: int = app.config.get("WALLET_POOL_REFILL_INTERVAL", 5)
+
+            async def _pool_loop() -> None:
                 while True:
                     try:
-                        await docker.cleanup()
-                        app.logger.info("Cleaned up expired wallet containers")
+                        added = await pool.refill()
+                        if added:
+                            app.logger.info(f"Added {added} wallet(s) to the pool")
                     except Exception:
-                        app.logger.exception("Failed to clean up wallet containers")
-                    await asyncio.sleep(3600)
+                        app.logger.exception("Failed to refill the wallet pool")
+                    await asyncio.sleep(interval)
 
-            app.add_background_task(_cleanup_loop)
+            app.add_background_task(_pool_loop)
 
         # Background task: probe the SMTP server without blocking startup.
         @app.before_serving
@@ -203,17 +325,49 @@ async def create_app() -> Quart:
 
             app.add_background_task(_check)
 
+        # Create the transfer history indexes (a no-op once they exist).
+        @app.before_serving
+        async def _ensure_history_indexes() -> None:
+            from backend.library.history import transfer_history
+
+            await transfer_history.ensure_indexes()
+
         # Background task: warm the coin-info cache so the first page load is fast.
         @app.before_serving
         async def _warm_coin_cache() -> None:
             async def _warm() -> None:
                 try:
-                    await cache.get_coin_info()
+                    await cache.refresh_coin_info()
                 except Exception:
                     app.logger.warning("Could not warm the coin info cache")
 
             app.add_background_task(_warm)
 
+        # Release the pooled Docker Engine API connections on shutdown.
+        @app.after_serving
+        async def _close_docker_engine() -> None:
+            for node in docker.nodes.values():
+                await node.engine.close()
+
+        # Release the pooled outbound HTTP connections on shutdown.
+        @app.after_serving
+        async def _close_http_client() -> None:
+            await http.close()
+
+        # Stop the password hashing threads on shutdown.
+        @app.after_serving
+        async def _close_hasher() -> None:
+            from backend.library.hashing import hasher
+
+            hasher.close()
+
+        # Close the pooled wallet RPC connections on shutdown.
+        @app.after_serving
+        async def _close_wallet_clients() -> None:
+            from backend.library.clients import wallet_clients
+
+            await wallet_clients.close()
+
         # CLI commands
         @app.cli.command("reset_wallet")
         @click.argument("username")
@@ -228,9 +382,8 @@ async def create_app() -> Quart:
             async def __reset_wallet() -> None:
                 from backend.utils.models import User
 
-                user = User(username=username)
                 try:
-                    await user.load()
+                    user = await User.get(username, User.WALLET_FIELDS)
                 except ValueError:
                     print(f"User {username} not found")
                     return
@@ -252,9 +405,8 @@ async def create_app() -> Quart:
             async def __reset_2fa() -> None:
                 from backend.utils.models import User
 
-                user = User(username=username)
                 try:
-                    await user.load()
+                    user = await User.get(username, User.TWOFA_FIELDS)
                 except ValueError:
                     print(f"User {username} not found")
                     return
@@ -309,6 +461,18 @@ async def create_app() -> Quart:
                 {"status": "error", "error": "Authentication required"}
             ), 401
 
+        from backend.library.hashing import HasherBusy
+
+        @app.errorhandler(HasherBusy)
+        async def _handle_hasher_busy(*_: Any) -> tuple[Response, int]:
+            """Returns a 503 while the password hashing queue is full."""
+            return jsonify(
+                {
+                    "status": "error",
+                    "error": "The server is busy; please try again shortly.",
+                }
+            ), 503
+
         @app.errorhandler(HTTPException)
         async def _handle_http_exception(
             error: HTTPException,
@@ -327,13 +491,14 @@ async def create_app() -> Quart:
             ), 500
 
         # Register the API blueprint (mounts everything under /v1)
-        from backend.blueprints import api_bp, auth_bp, meta_bp, wallet_bp
+        from backend.blueprints import api_bp, ops_bp, auth_bp, meta_bp, wallet_bp
 
         count: int = app.config["RATE_LIMIT_COUNT"]
         period: timedelta = timedelta(seconds=app.config["RATE_LIMIT_PERIOD"])
 
         limit_blueprint(auth_bp, count, period)
         limit_blueprint(meta_bp, count, period)
+        limit_blueprint(ops_bp, count, period)
         limit_blueprint(wallet_bp, count, period)
 
         app.register_blueprint(api_bp)
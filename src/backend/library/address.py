@@ -0,0 +1,321 @@
+from typing import Optional
+
+# Nerva mainnet base58 address prefixes (cryptonote_config.h).
+STANDARD_PREFIX = 0x3800
+INTEGRATED_PREFIX = 0x7081
+SUBADDRESS_PREFIX = 0x1080
+PREFIXES = {
+    STANDARD_PREFIX: "standard",
+    INTEGRATED_PREFIX: "integrated",
+    SUBADDRESS_PREFIX: "subaddress",
+}
+
+KEY_SIZE = 32
+PAYMENT_ID_SIZE = 8
+CHECKSUM_SIZE = 4
+
+ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+ALPHABET_INDEX = {c: i for i, c in enumerate(ALPHABET)}
+FULL_BLOCK_SIZE = 8
+FULL_ENCODED_BLOCK_SIZE = 11
+# Encoded length of a block of n bytes, and the reverse.
+ENCODED_BLOCK_SIZES = [0, 2, 3, 5, 6, 7, 9, 10, 11]
+DECODED_BLOCK_SIZES = {n: i for i, n in enumerate(ENCODED_BLOCK_SIZES)}
+
+KECCAK_RATE = 136
+KECCAK_ROUND_CONSTANTS = [
+    0x0000000000000001,
+    0x0000000000008082,
+    0x800000000000808A,
+    0x8000000080008000,
+    0x000000000000808B,
+    0x0000000080000001,
+    0x8000000080008081,
+    0x8000000000008009,
+    0x000000000000008A,
+    0x0000000000000088,
+    0x0000000080008009,
+    0x000000008000000A,
+    0x000000008000808B,
+    0x800000000000008B,
+    0x8000000000008089,
+    0x8000000000008003,
+    0x8000000000008002,
+    0x8000000000000080,
+    0x000000000000800A,
+    0x800000008000000A,
+    0x8000000080008081,
+    0x8000000000008080,
+    0x0000000080000001,
+    0x8000000080008008,
+]
+KECCAK_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+MASK_64 = 2**64 - 1
+
+
+class Address:
+    """
+    A decoded Nerva address.
+
+    Attributes:
+        kind (str): "standard", "subaddress" or "integrated".
+        spend_key (bytes): The public spend key.
+        view_key (bytes): The public view key.
+        payment_id (Optional[bytes]): The embedded payment ID of an integrated
+            address.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        spend_key: bytes,
+        view_key: bytes,
+        payment_id: Optional[bytes] = None,
+    ) -> None:
+        self.kind: str = kind
+        self.spend_key: bytes = spend_key
+        self.view_key: bytes = view_key
+        self.payment_id: Optional[bytes] = payment_id
+
+    @property
+    def integrated(self) -> bool:
+        return self.kind == "integrated"
+
+    @property
+    def subaddress(self) -> bool:
+        return self.kind == "subaddress"
+
+
+def _rotate(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & MASK_64 if shift else value
+
+
+def _keccak_f(state: list[int]) -> None:
+    for rc in KECCAK_ROUND_CONSTANTS:
+        # θ
+        c = [
+            state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20]
+            for x in range(5)
+        ]
+        d = [c[(x - 1) % 5] ^ _rotate(c[(x + 1) % 5], 1) for x in range(5)]
+        for i in range(25):
+            state[i] ^= d[i % 5]
+        # ρ and π
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = _rotate(
+                    state[x + 5 * y], KECCAK_ROTATIONS[x][y]
+                )
+        # χ
+        for y in range(0, 25, 5):
+            for x in range(5):
+                state[y + x] = b[y + x] ^ (~b[y + (x + 1) % 5] & b[y + (x + 2) % 5])
+        # ι
+        state[0] ^= rc
+
+
+def keccak_256(data: bytes) -> bytes:
+    """
+    Hashes data with the original Keccak-256 (CryptoNote's cn_fast_hash),
+    which pads differently from the standardized SHA3-256 in hashlib.
+
+    Args:
+        data (bytes): The data to hash.
+
+    Returns:
+        bytes: The 32-byte digest.
+    """
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % KECCAK_RATE))
+    padded[-1] |= 0x80
+
+    state = [0] * 25
+    for offset in range(0, len(padded), KECCAK_RATE):
+        block = padded[offset : offset + KECCAK_RATE]
+        for i in range(KECCAK_RATE // 8):
+            state[i] ^= int.from_bytes(block[i * 8 : i * 8 + 8], "little")
+        _keccak_f(state)
+
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+def b58encode(data: bytes) -> str:
+    """
+    Encodes data with CryptoNote's base58, which encodes 8-byte blocks into
+    11 characters each so the output length is fixed.
+
+    Args:
+        data (bytes): The data to encode.
+
+    Returns:
+        str: The encoded string.
+    """
+    out = []
+    for offset in range(0, len(data), FULL_BLOCK_SIZE):
+        block = data[offset : offset + FULL_BLOCK_SIZE]
+        value = int.from_bytes(block, "big")
+        chars = []
+        for _ in range(ENCODED_BLOCK_SIZES[len(block)]):
+            value, digit = divmod(value, 58)
+            chars.append(ALPHABET[digit])
+        out.append("".join(reversed(chars)))
+    return "".join(out)
+
+
+def b58decode(text: str) -> bytes:
+    """
+    Decodes CryptoNote base58.
+
+    Args:
+        text (str): The encoded string.
+
+    Returns:
+        bytes: The decoded data.
+
+    Raises:
+        ValueError: If the string is not valid CryptoNote base58.
+    """
+    out = bytearray()
+    for offset in range(0, len(text), FULL_ENCODED_BLOCK_SIZE):
+        block = text[offset : offset + FULL_ENCODED_BLOCK_SIZE]
+        size = DECODED_BLOCK_SIZES.get(len(block))
+        if size is None:
+            raise ValueError("Invalid base58 length")
+
+        value = 0
+        for c in block:
+            digit = ALPHABET_INDEX.get(c)
+            if digit is None:
+                raise ValueError("Invalid base58 character")
+            value = value * 58 + digit
+        if value >> (8 * size):
+            raise ValueError("Invalid base58 block")
+        out += value.to_bytes(size, "big")
+    return bytes(out)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(data: bytes) -> tuple[int, int]:
+    value = shift = 0
+    for i, byte in enumerate(data[:10]):
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, i + 1
+        shift += 7
+    raise ValueError("Invalid address prefix")
+
+
+def decode_address(address: str) -> Address:
+    """
+    Decodes and checks a Nerva mainnet address in-process, as the wallet-rpc's
+    validate_address does.
+
+    Args:
+        address (str): The address.
+
+    Returns:
+        Address: The decoded address.
+
+    Raises:
+        ValueError: If the address is malformed, fails its checksum, or is not
+            a Nerva mainnet address.
+    """
+    if not isinstance(address, str):
+        raise ValueError("Invalid address")
+
+    data = b58decode(address)
+    if len(data) <= CHECKSUM_SIZE:
+        raise ValueError("Invalid address")
+    body, checksum = data[:-CHECKSUM_SIZE], data[-CHECKSUM_SIZE:]
+    if keccak_256(body)[:CHECKSUM_SIZE] != checksum:
+        raise ValueError("Invalid address checksum")
+
+    prefix, offset = _read_varint(body)
+    kind = PREFIXES.get(prefix)
+    if kind is None:
+        raise ValueError("Not a Nerva mainnet address")
+
+    keys = body[offset:]
+    size = 2 * KEY_SIZE + (PAYMENT_ID_SIZE if kind == "integrated" else 0)
+    if len(keys) != size:
+        raise ValueError("Invalid address length")
+
+    return Address(
+        kind,
+        keys[:KEY_SIZE],
+        keys[KEY_SIZE : 2 * KEY_SIZE],
+        keys[2 * KEY_SIZE :] or None,
+    )
+
+
+def encode_address(
+    spend_key: bytes, view_key: bytes, prefix: int, payment_id: bytes = b""
+) -> str:
+    """
+    Encodes public keys (and a payment ID) as an address.
+
+    Args:
+        spend_key (bytes): The public spend key.
+        view_key (bytes): The public view key.
+        prefix (int): The address prefix.
+        payment_id (bytes): The payment ID of an integrated address.
+
+    Returns:
+        str: The address.
+    """
+    body = _varint(prefix) + spend_key + view_key + payment_id
+    return b58encode(body + keccak_256(body)[:CHECKSUM_SIZE])
+
+
+def is_valid_address(address: str) -> bool:
+    """Return True if the string is a valid Nerva mainnet address."""
+    try:
+        decode_address(address)
+    except ValueError:
+        return False
+    return True
+
+
+def integrated_address(address: str, payment_id: str) -> str:
+    """
+    Builds the integrated address of a standard address and a payment ID, as
+    the wallet-rpc's make_integrated_address does.
+
+    Args:
+        address (str): The standard address.
+        payment_id (str): The 16-hex payment ID.
+
+    Returns:
+        str: The integrated address.
+
+    Raises:
+        ValueError: If the address is not a standard address or the payment ID
+            is not 16 hexadecimal characters.
+    """
+    decoded = decode_address(address)
+    if decoded.kind != "standard":
+        raise ValueError("Only standard addresses can be integrated")
+
+    pid = bytes.fromhex(payment_id)
+    if len(pid) != PAYMENT_ID_SIZE:
+        raise ValueError("Invalid payment ID")
+
+    return encode_address(
+        decoded.spend_key, decoded.view_key, INTEGRATED_PREFIX, pid
+    )
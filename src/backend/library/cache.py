@@ -1,14 +1,102 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Callable, Optional, Awaitable
 
 import sys
 import json
+import asyncio
+from time import time, monotonic
 from datetime import timedelta
+from collections import OrderedDict
 
-from aiohttp import ClientError, ClientSession
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
 
 from backend import config
+from backend.library.http import HTTPError
+from backend.library.metrics import metrics
+
+COIN_INFO_KEY = "coin-info"
+COIN_INFO_LOCK = "coin-info:refresh"
+# Seconds a worker waits before retrying a failed CoinGecko fetch.
+COIN_INFO_RETRY = 60
+# The pub/sub channel that carries the names of locally cached keys written
+# by any worker.
+INVALIDATE_CHANNEL = "cache-invalidate"
+
+
+class LocalCache:
+    """
+    A per-process, TTL-bounded LRU of small values (including misses).
+
+    Every invalidation bumps a generation counter; a value read from Redis is
+    only kept if no invalidation happened while it was being read, so a write
+    racing the read can't leave the old value cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Initializes the local tier.
+
+        Args:
+            max_size (int): The most keys kept; 0 disables the tier.
+            ttl (float): Seconds a value is served before it is read again.
+        """
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.generation: int = 0
+        self._values: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """
+        Looks a key up.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            tuple[bool, Any]: Whether the key was cached, and its value (None
+            for a cached miss).
+        """
+        entry = self._values.get(key)
+        if entry is None:
+            return False, None
+        if monotonic() >= entry[1]:
+            del self._values[key]
+            return False, None
+        self._values.move_to_end(key)
+        return True, entry[0]
+
+    def put(self, key: str, value: Any, generation: int) -> None:
+        """
+        Caches a value read from its source.
+
+        Args:
+            key (str): The key.
+            value (Any): The value, or None if the key was unset.
+            generation (int): The generation read before the value was.
+        """
+        if self.max_size <= 0 or generation != self.generation:
+            return
+        self._values[key] = (value, monotonic() + self.ttl)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """
+        Drops a key, e.g. when any worker wrote it.
+
+        Args:
+            key (str): The key.
+        """
+        self.generation += 1
+        self._values.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drops every key, e.g. when invalidations may have been missed.
+        """
+        self.generation += 1
+        self._values.clear()
 
 
 class Cache:
@@ -21,6 +109,9 @@ class Cache:
 
     Attributes:
         redis (Redis): An instance of the Redis client to interact with the cache.
+        coin_info (Dict[str, Any]): This worker's copy of the coin information.
+        coin_info_at (float): When that copy was fetched (Unix time).
+        local (LocalCache): The in-process tier of get_local().
     """
 
     def __init__(self) -> None:
@@ -42,6 +133,21 @@ class Cache:
 
         self.redis: Redis = Redis.from_url(config.REDIS_URL)
 
+        # Coin info is served for COIN_INFO_TTL seconds and refreshed ahead of
+        # that, once four fifths of it have passed.
+        self.coin_info_ttl: int = getattr(config, "COIN_INFO_TTL", 900)
+        self.coin_info_refresh: float = self.coin_info_ttl * 0.8
+        self.coin_info: Dict[str, Any] = {}
+        self.coin_info_at: float = 0.0
+        self._coin_refresh: Optional[asyncio.Future[bool]] = None
+
+        self.local: LocalCache = LocalCache(
+            max_size=getattr(config, "CACHE_LOCAL_SIZE", 1024),
+            ttl=getattr(config, "CACHE_LOCAL_TTL", 30),
+        )
+        # The local tier is only used while invalidations are being received.
+        self._subscribed: bool = False
+
     async def store_data(
         self, item_name: str, expiration_minutes: int, data: str
     ) -> None:
@@ -72,19 +178,172 @@ class Cache:
             return str(data.decode())
         return None
 
+    async def get_local(self, item_name: str) -> Optional[str]:
+        """
+        Retrieves a small, frequently read value (e.g. a flag), served from
+        this worker's memory when it has read it recently. Values cached here
+        must only be written through set_local() and delete_local(), which
+        invalidate every worker's copy.
+
+        Args:
+            item_name (str): The name of the item.
+
+        Returns:
+            Optional[str]: The value, or None if it is unset.
+        """
+        value: Optional[str] = await self.get_local_with(
+            item_name, lambda: self.get_data(item_name)
+        )
+        return value
+
+    async def get_local_with(
+        self, item_name: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Retrieves a value from this worker's memory, loading it on a miss. The
+        owner of the value must call invalidate_local() whenever it changes.
+
+        Args:
+            item_name (str): The name of the item.
+            loader (Callable[[], Awaitable[Any]]): Reads the value from its
+                source (e.g. Redis or MongoDB).
+
+        Returns:
+            Any: The value; callers must not modify it.
+        """
+        if not self._subscribed:
+            return await loader()
+
+        found, value = self.local.get(item_name)
+        if found:
+            metrics.incr("cache.local.hit")
+            return value
+
+        metrics.incr("cache.local.miss")
+        generation = self.local.generation
+        value = await loader()
+        self.local.put(item_name, value, generation)
+        return value
+
+    async def set_local(
+        self, item_name: str, data: str, expiration_seconds: Optional[int] = None
+    ) -> None:
+        """
+        Stores a value read through get_local(), invalidating every worker's
+        copy.
+
+        Args:
+            item_name (str): The name of the item.
+            data (str): The value.
+            expiration_seconds (Optional[int]): The expiration time, or None to
+                keep it until it is deleted.
+        """
+        await self.redis.set(item_name, data, ex=expiration_seconds)
+        await self.invalidate_local(item_name)
+
+    async def delete_local(self, item_name: str) -> None:
+        """
+        Deletes a value read through get_local(), invalidating every worker's
+        copy.
+
+        Args:
+            item_name (str): The name of the item.
+        """
+        await self.redis.delete(item_name)
+        await self.invalidate_local(item_name)
+
+    async def listen_invalidations(self) -> None:
+        """
+        Drops locally cached keys as any worker writes them, for as long as the
+        app runs. While the subscription is down the local tier is bypassed,
+        and it starts empty again on every reconnect.
+        """
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATE_CHANNEL)
+                    self.local.clear()
+                    self._subscribed = True
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.local.discard(message["data"].decode())
+            except RedisError as e:
+                print(f"Cache invalidation feed lost: {e}")
+            finally:
+                self._subscribed = False
+                self.local.clear()
+            await asyncio.sleep(1)
+
+    async def invalidate_local(self, item_name: str) -> None:
+        """
+        Drops every worker's in-memory copy of an item, after it was written.
+
+        Args:
+            item_name (str): The name of the item.
+        """
+        self.local.discard(item_name)
+        await self.redis.publish(INVALIDATE_CHANNEL, item_name)
+
     async def get_coin_info(self) -> Dict[str, Any]:
         """
-        Retrieves coin information (e.g., price, market cap, volume) for Nerva from the CoinGecko API.
-        If the information is not found in the cache, it will fetch the data from the CoinGecko API
-        and store it in the cache for future use.
+        Returns the cached coin information (e.g., price, market cap, volume) for
+        Nerva without waiting on the network. Once the copy is older than
+        COIN_INFO_REFRESH, a background refresh from CoinGecko is started, and
+        the current copy is served until it lands; a failed refresh keeps the
+        last known good copy.
 
         Returns:
-            Dict[str, Any]: A dictionary containing coin information such as price, market cap, etc.
+            Dict[str, Any]: A dictionary containing coin information such as
+            price, market cap, etc., or an empty one if none was fetched yet.
         """
-        cached = await self.redis.get("coin_info")
+        if time() - self.coin_info_at < self.coin_info_refresh:
+            return self.coin_info
 
+        # This worker's copy is due; another worker may have refreshed it.
+        cached = await self.redis.get(COIN_INFO_KEY)
         if cached:
-            return json.loads(cached)  # type: ignore[no-any-return]
+            payload = json.loads(cached)
+            if payload["at"] > self.coin_info_at:
+                self.coin_info = payload["info"]
+                self.coin_info_at = payload["at"]
+
+        age = time() - self.coin_info_at
+        if age >= self.coin_info_refresh:
+            if self.coin_info and age >= self.coin_info_ttl:
+                metrics.incr("coin_info.stale")
+            if self._coin_refresh is None or self._coin_refresh.done():
+                self._coin_refresh = asyncio.ensure_future(self.refresh_coin_info())
+                self._coin_refresh.add_done_callback(self._coin_refresh_done)
+
+        return self.coin_info
+
+    @staticmethod
+    def _coin_refresh_done(task: asyncio.Future[bool]) -> None:
+        """
+        Reports a background coin-info refresh that raised (e.g. a RedisError),
+        which nothing else awaits.
+
+        Args:
+            task (asyncio.Future[bool]): The finished refresh.
+        """
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"Coin info refresh failed: {error}")
+            metrics.incr("coin_info.failed")
+
+    async def refresh_coin_info(self) -> bool:
+        """
+        Fetches the coin information from the CoinGecko API and shares it
+        through the cache. Only one worker fetches at a time, and a failed
+        fetch holds the others off for COIN_INFO_RETRY seconds.
+
+        Returns:
+            bool: True if new information was stored.
+        """
+        if not await self.redis.set(COIN_INFO_LOCK, 1, nx=True, ex=COIN_INFO_RETRY):
+            return False
 
         data = {
             "localization": "false",
@@ -101,12 +360,15 @@ class Cache:
         }
         url = "https://api.coingecko.com/api/v3/coins/nerva"
 
+        from backend.factory import http
+
         try:
-            async with ClientSession() as session:
-                async with session.get(url, headers=headers, params=data) as res:
-                    if res.status != 200:
-                        return {}
-                    res_json = await res.json()
+            status, res_json = await http.get_json(
+                "coingecko", url, params=data, headers=headers
+            )
+            if status != 200:
+                metrics.incr("coin_info.failed")
+                return False
 
             result: Dict[str, Any] = {
                 "genesis_date": res_json["genesis_date"],
@@ -117,9 +379,16 @@ class Cache:
                 "last_updated": res_json["last_updated"],
             }
 
-            await self.store_data("coin_info", 15, json.dumps(result))
-
-            return result
+        except (HTTPError, KeyError, TypeError):
+            metrics.incr("coin_info.failed")
+            return False
 
-        except (ClientError, KeyError, TypeError):
-            return {}
+        # Kept without expiry: it is the last known good copy.
+        now = time()
+        await self.redis.set(COIN_INFO_KEY, json.dumps({"info": result, "at": now}))
+        # The lock doubles as the retry back-off, so only drop it on success.
+        await self.redis.delete(COIN_INFO_LOCK)
+        self.coin_info = result
+        self.coin_info_at = now
+        metrics.incr("coin_info.refreshed")
+        return True
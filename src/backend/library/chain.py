@@ -0,0 +1,178 @@
+from typing import Any, Optional
+
+import json
+import asyncio
+from time import time
+
+from backend import config
+from backend.library.metrics import metrics
+
+CHAIN_KEY = "chain-info"
+CHAIN_LOCK = "chain-watcher"
+
+
+class ChainWatcher:
+    """
+    A process-wide view of the chain tip, so height consumers read the
+    daemon's get_info from memory instead of calling the daemon per request.
+
+    Every worker refreshes it each interval seconds from a copy shared in
+    Redis; the worker holding a short Redis lock is the one that polls the
+    daemon and publishes the result, so the daemon sees one get_info per
+    interval however many workers and requests there are. A new height wakes
+    the callers waiting in wait_for_block().
+    """
+
+    def __init__(self, interval: float, max_age: float) -> None:
+        """
+        Initializes the watcher.
+
+        Args:
+            interval (float): Seconds between refreshes.
+            max_age (float): The staleness get_info() accepts by default,
+                in seconds; older info is refreshed before it is returned.
+        """
+        self.interval: float = interval
+        self.max_age: float = max_age
+        self.info: dict[str, Any] = {}
+        # When the held info was fetched from the daemon (Unix time).
+        self.updated: float = 0.0
+        self._block: asyncio.Event = asyncio.Event()
+        self._refreshing: Optional[asyncio.Task[dict[str, Any]]] = None
+
+    @property
+    def height(self) -> int:
+        """
+        Returns the latest known network height.
+
+        Returns:
+            int: The height, or 0 if the chain tip is not known yet.
+        """
+        return int(self.info.get("height") or 0)
+
+    async def get_info(self, max_age: Optional[float] = None) -> dict[str, Any]:
+        """
+        Returns the daemon's get_info, refreshing it first if it is older than
+        max_age.
+
+        Args:
+            max_age (Optional[float]): The staleness accepted, in seconds;
+                defaults to the watcher's max_age.
+
+        Returns:
+            dict[str, Any]: The daemon info.
+
+        Raises:
+            Exception: Whatever the daemon call raised, if a refresh was
+                needed and failed.
+        """
+        if max_age is None:
+            max_age = self.max_age
+        if self.info and time() - self.updated <= max_age:
+            metrics.incr("chain.hit")
+            return self.info
+        metrics.incr("chain.miss")
+        return await self.refresh()
+
+    async def refresh(self) -> dict[str, Any]:
+        """
+        Refreshes the chain tip. Concurrent callers share one refresh.
+
+        Returns:
+            dict[str, Any]: The daemon info.
+        """
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        return await asyncio.shield(self._refreshing)
+
+    async def wait_for_block(self, timeout: Optional[float] = None) -> int:
+        """
+        Waits until the watcher sees a new block.
+
+        Args:
+            timeout (Optional[float]): The most seconds to wait, or None to
+                wait indefinitely.
+
+        Returns:
+            int: The new height.
+
+        Raises:
+            TimeoutError: If no block arrived in time.
+        """
+        await asyncio.wait_for(self._block.wait(), timeout)
+        return self.height
+
+    async def run(self) -> None:
+        """
+        Refreshes the chain tip every interval seconds, forever.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Failed to refresh the chain tip: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _refresh(self) -> dict[str, Any]:
+        """
+        Takes the shared copy from Redis if it is recent, and otherwise polls
+        the daemon and publishes the result.
+
+        Returns:
+            dict[str, Any]: The daemon info.
+        """
+        from backend.factory import cache, daemon
+
+        shared = await cache.redis.get(CHAIN_KEY)
+        payload = json.loads(shared) if shared is not None else None
+        age = time() - payload["at"] if payload is not None else None
+        if payload is not None and age is not None and age < self.interval:
+            self._update(payload["info"], payload["at"])
+            return self.info
+
+        # Only the lock holder polls; the others keep using the shared copy
+        # while it is fresh enough, and poll themselves only past max_age.
+        leader = await cache.redis.set(
+            CHAIN_LOCK, 1, nx=True, px=max(1, int(self.interval * 1000))
+        )
+        if not leader and payload is not None and age is not None:
+            if age <= self.max_age:
+                self._update(payload["info"], payload["at"])
+                return self.info
+
+        with metrics.timer("chain.poll"):
+            info = dict(await daemon.get_info())
+        at = time()
+        await cache.redis.set(
+            CHAIN_KEY,
+            json.dumps({"info": info, "at": at}),
+            ex=max(60, int(self.max_age * 4)),
+        )
+        self._update(info, at)
+        return self.info
+
+    def _update(self, info: dict[str, Any], at: float) -> None:
+        """
+        Holds newer info and wakes the block waiters on a new height.
+
+        Args:
+            info (dict[str, Any]): The daemon info.
+            at (float): When it was fetched from the daemon (Unix time).
+        """
+        if at < self.updated:
+            return
+
+        previous = self.height
+        self.info = info
+        self.updated = at
+        if self.height > previous:
+            if previous:
+                metrics.incr("chain.blocks", self.height - previous)
+            self._block.set()
+            self._block = asyncio.Event()
+
+
+chain = ChainWatcher(
+    interval=getattr(config, "CHAIN_POLL_INTERVAL", 5),
+    max_age=getattr(config, "CHAIN_MAX_AGE", 30),
+)
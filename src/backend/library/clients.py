@@ -0,0 +1,122 @@
+from typing import Any
+
+import asyncio
+from time import monotonic
+from collections import OrderedDict
+
+from backend import config
+from backend.library.rpc import Wallet, PersistentWalletRPC
+from backend.library.metrics import metrics
+
+# (username, container ID) -> (wallet, RPC login, last used)
+Entry = tuple[Wallet, tuple[str, str], float]
+
+
+class WalletClients:
+    """
+    A process-wide registry of wallet RPC clients, keyed by username and
+    container ID, so steady-state wallet calls reuse a keep-alive connection
+    and the cached digest-auth challenge instead of setting both up again on
+    every request.
+
+    Entries are dropped once idle for ttl seconds, least recently used first
+    beyond max_size, when the user's container changes, and when their
+    session is cleared.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Initializes the registry.
+
+        Args:
+            max_size (int): The most clients kept.
+            ttl (float): Seconds a client may sit unused before it is dropped.
+        """
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self._clients: OrderedDict[tuple[str, str], Entry] = OrderedDict()
+        self._closing: set[asyncio.Task[None]] = set()
+
+    def get(
+        self, username: str, container_id: str, login: tuple[str, str], **kwargs: Any
+    ) -> Wallet:
+        """
+        Returns the cached client for a user's container, creating it on a
+        miss.
+
+        Args:
+            username (str): The username of the container owner.
+            container_id (str): The ID of the wallet RPC container.
+            login (tuple[str, str]): The container's RPC username and password.
+            **kwargs (Any): The host, port and ssl passed on to the client.
+
+        Returns:
+            Wallet: The client.
+        """
+        now = monotonic()
+        self._expire(now)
+
+        key = (username, container_id)
+        entry = self._clients.get(key)
+        if entry is not None and entry[1] == login:
+            self._clients[key] = (entry[0], login, now)
+            self._clients.move_to_end(key)
+            metrics.incr("wallet_clients.hit")
+            return entry[0]
+
+        metrics.incr("wallet_clients.miss")
+        # Any client for another container of this user is for a container
+        # that is gone.
+        self.invalidate(username)
+        wallet = Wallet(
+            rpc=PersistentWalletRPC(username=login[0], password=login[1], **kwargs)
+        )
+        self._clients[key] = (wallet, login, now)
+        while len(self._clients) > self.max_size:
+            self._close(self._clients.popitem(last=False)[1][0])
+        return wallet
+
+    def invalidate(self, username: str) -> None:
+        """
+        Drops every client for a user, e.g. when their session is cleared.
+
+        Args:
+            username (str): The username.
+        """
+        for key in [k for k in self._clients if k[0] == username]:
+            self._close(self._clients.pop(key)[0])
+
+    async def close(self) -> None:
+        """
+        Closes every client, e.g. on shutdown.
+        """
+        while self._clients:
+            self._close(self._clients.popitem()[1][0])
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _expire(self, now: float) -> None:
+        # Entries are kept in last-used order, so the idle ones are in front.
+        while self._clients:
+            key, (wallet, _, used) = next(iter(self._clients.items()))
+            if now - used < self.ttl:
+                break
+            del self._clients[key]
+            self._close(wallet)
+            metrics.incr("wallet_clients.expired")
+
+    def _close(self, wallet: Wallet) -> None:
+        if not isinstance(wallet.rpc, PersistentWalletRPC):
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(wallet.rpc.aclose())
+        except RuntimeError:
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+wallet_clients = WalletClients(
+    max_size=getattr(config, "WALLET_CLIENT_CACHE_SIZE", 1000),
+    ttl=getattr(config, "WALLET_CLIENT_IDLE_TTL", 300),
+)
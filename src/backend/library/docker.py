@@ -1,19 +1,32 @@
-from typing import Optional, cast
+from typing import Any, Optional
 
-import re
+import io
+import os
 import sys
-import asyncio
+import shlex
+import tarfile
 from secrets import token_hex
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 
-from docker.errors import APIError, NotFound, NullResource, DockerException
-from docker.models.volumes import Volume
-from docker.models.containers import Container
-
-from docker import APIClient, from_env
 from backend import config
+from backend.library.pool import POOL_DIR, WalletPool
 from backend.utils.models import User
+from backend.library.chain import chain
+from backend.library.index import DockerIndex
+from backend.library.nodes import Node, Scheduler
+from backend.library.engine import EngineError, DockerEngine, EngineNotFound
+from backend.library.expiry import WalletExpiry
+from backend.library.history import transfer_history
+from backend.library.presync import WalletPresync
+from backend.library.progress import RestoreProgress
+from backend.library.reconcile import (
+    LABEL_ROLE,
+    LABEL_OWNER,
+    LABEL_CREATED,
+    Reconciler,
+)
 from backend.library.validation import validate_seed, validate_username
+from backend.library.hibernation import WalletHibernation
 
 
 class Docker:
@@ -23,13 +36,52 @@ class Docker:
 
     def __init__(self) -> None:
         """
-        Initializes the Docker client and sets necessary configurations.
+        Initializes the Docker client and sets necessary configurations. Call
+        check() before serving.
         """
-        try:
-            self.client = from_env()
-        except DockerException:
-            print("Failed to connect to Docker. Exiting...")
-            sys.exit(1)
+        node_configs: list[dict[str, Any]] = getattr(config, "DOCKER_NODES", []) or [
+            {"name": "local", "host": os.environ.get("DOCKER_HOST")}
+        ]
+        self.nodes: dict[str, Node] = {
+            n["name"]: Node(
+                n["name"],
+                DockerEngine(
+                    n.get("host"),
+                    timeout=getattr(config, "DOCKER_API_TIMEOUT", 10),
+                    pool_size=getattr(config, "DOCKER_API_POOL_SIZE", 32),
+                ),
+                weight=float(n.get("weight", 1.0)),
+                address=n.get("address", "127.0.0.1"),
+                max_wallets=int(n.get("max_wallets", 0)),
+            )
+            for n in node_configs
+        }
+        self.scheduler: Scheduler = Scheduler(list(self.nodes.values()))
+        # The first node also runs the warm pool and hosts users placed before
+        # multi-node support (who have no wallet_node yet).
+        self.default: Node = next(iter(self.nodes.values()))
+        self.engine: DockerEngine = self.default.engine
+        self.index: DockerIndex = self.default.index
+        self.expiry: WalletExpiry = WalletExpiry(
+            self, config.PERMANENT_SESSION_LIFETIME
+        )
+        self.hibernation: WalletHibernation = WalletHibernation(
+            self,
+            lifetime=getattr(config, "WALLET_HIBERNATE_LIFETIME", 3600),
+            max_paused=getattr(config, "WALLET_HIBERNATE_MAX", 50),
+        )
+        self.presync: WalletPresync = WalletPresync(
+            self,
+            concurrency=getattr(config, "WALLET_PRESYNC_CONCURRENCY", 0),
+            block_budget=getattr(config, "WALLET_PRESYNC_BLOCK_BUDGET", 100000),
+            active_for=getattr(config, "WALLET_PRESYNC_ACTIVE_DAYS", 14) * 86400,
+            hours=tuple(getattr(config, "WALLET_PRESYNC_HOURS", (2, 6))),
+            timeout=getattr(config, "WALLET_PRESYNC_TIMEOUT", 900),
+        )
+        self.progress: RestoreProgress = RestoreProgress(self)
+        self.reconciler: Reconciler = Reconciler(
+            self, grace=getattr(config, "WALLET_RECONCILE_GRACE", 300)
+        )
 
         self.nerva_docker_img: str = config.NERVA_DOCKER_IMAGE
         self.listen_port: int = 8888
@@ -38,6 +90,265 @@ class Docker:
         )
         self.extra_hosts: dict[str, str] = {"host.docker.internal": "host-gateway"}
 
+        pool_size: int = getattr(config, "WALLET_POOL_SIZE", 0)
+        self.pool: Optional[WalletPool] = (
+            WalletPool(
+                self,
+                size=pool_size,
+                refill_rate=getattr(config, "WALLET_POOL_REFILL_RATE", 2),
+                max_reuse=getattr(config, "WALLET_POOL_MAX_REUSE", 1),
+            )
+            if pool_size > 0
+            else None
+        )
+
+    async def check(self) -> None:
+        """
+        Checks that every node's Docker engine answers a ping.
+
+        Raises:
+            SystemExit: If a Docker engine is unreachable.
+        """
+        for node in self.nodes.values():
+            reachable = await node.engine.ping()
+            # The app is created on a different event loop from the one that
+            # serves it, so the session opened for the ping can't be kept.
+            await node.engine.close()
+            if not reachable:
+                print("Failed to connect to Docker. Exiting...")
+                sys.exit(1)
+
+    @staticmethod
+    def _daemon_flags() -> list[str]:
+        """
+        Returns the wallet-rpc flags that point a wallet at the Nerva daemon.
+
+        Returns:
+            list[str]: The daemon address, login and SSL flags.
+        """
+        proxy: str = getattr(config, "DAEMON_PROXY_ADDRESS", "")
+        if proxy:
+            # The in-stack caching proxy holds the daemon login itself.
+            return [
+                "--daemon-address",
+                proxy,
+                "--daemon-ssl",
+                "disabled",
+                "--trusted-daemon",
+            ]
+
+        daemon_address = (
+            f"{'https' if config.DAEMON_SSL else 'http'}://"
+            f"{config.DAEMON_HOST}:{config.DAEMON_PORT}"
+        )
+        return [
+            "--daemon-address",
+            daemon_address,
+            "--daemon-login",
+            f"{config.DAEMON_USERNAME}:{config.DAEMON_PASSWORD}",
+            "--daemon-ssl",
+            "enabled" if config.DAEMON_SSL else "disabled",
+            "--trusted-daemon",
+        ]
+
+    @staticmethod
+    def _labels(role: str, owner: Optional[str] = None) -> dict[str, str]:
+        """
+        Returns the labels every container and volume NerVault creates carries,
+        which the reconciler lists them by.
+
+        Args:
+            role (str): What the resource is for ("init", "rpc", "pool",
+                "presync", "carrier" or "wallet").
+            owner (Optional[str]): The owning username, if any.
+
+        Returns:
+            dict[str, str]: The labels.
+        """
+        labels = {
+            LABEL_ROLE: role,
+            LABEL_CREATED: datetime.now(UTC).isoformat(),
+        }
+        if owner:
+            labels[LABEL_OWNER] = owner
+        return labels
+
+    def _container_config(
+        self,
+        entrypoint: list[str],
+        volume: Optional[str] = None,
+        publish: bool = False,
+        auto_remove: bool = True,
+        tmpfs: Optional[dict[str, str]] = None,
+        labels: Optional[dict[str, str]] = None,
+        host_ip: str = "127.0.0.1",
+    ) -> dict[str, Any]:
+        """
+        Builds the Engine API create body for a wallet container.
+
+        Args:
+            entrypoint (list[str]): The container entrypoint.
+            volume (Optional[str]): A volume to mount at /wallet.
+            publish (bool): Publish the RPC port on a random host port.
+                Ignored on a shared network, where the app reaches it by name.
+            auto_remove (bool): Remove the container once it exits.
+            tmpfs (Optional[dict[str, str]]): tmpfs mounts, path to options.
+            labels (Optional[dict[str, str]]): Container labels.
+            host_ip (str): The host address a published port is bound to.
+
+        Returns:
+            dict[str, Any]: The container create request body.
+        """
+        host_config: dict[str, Any] = {
+            "AutoRemove": auto_remove,
+            "NetworkMode": self.wallet_network or "default",
+            "ExtraHosts": [f"{h}:{ip}" for h, ip in self.extra_hosts.items()],
+        }
+        if volume:
+            host_config["Binds"] = [f"{volume}:/wallet:rw"]
+        if tmpfs:
+            host_config["Tmpfs"] = tmpfs
+
+        body: dict[str, Any] = {
+            "Image": self.nerva_docker_img,
+            "Entrypoint": entrypoint,
+            "Labels": labels or {},
+            "HostConfig": host_config,
+        }
+        if publish and not self.wallet_network:
+            port = f"{self.listen_port}/tcp"
+            body["ExposedPorts"] = {port: {}}
+            host_config["PortBindings"] = {
+                port: [{"HostIp": host_ip, "HostPort": ""}]
+            }
+        return body
+
+    async def _run(
+        self, name: Optional[str], body: dict[str, Any], node: Optional[Node] = None
+    ) -> str:
+        """
+        Creates and starts a container, or returns the existing one when a
+        container with that name already exists.
+
+        Args:
+            name (Optional[str]): The container name.
+            body (dict[str, Any]): The Engine API create request body.
+            node (Optional[Node]): The node to run it on. Defaults to the
+                default node.
+
+        Returns:
+            str: The short ID of the container.
+        """
+        node = node or self.default
+        try:
+            container_id = await node.engine.create_container(name, body)
+        except EngineError as e:
+            if e.status == 409 and name:
+                info = await node.engine.inspect_container(name)
+                node.index.add_container(info["Id"], name)
+                return str(info["Id"])[:12]
+            raise
+
+        # Record it now rather than waiting for the create event, so an
+        # existence check straight after this call already sees it.
+        if name:
+            node.index.add_container(container_id, name)
+
+        try:
+            await node.engine.start_container(container_id)
+        except EngineError:
+            await node.engine.remove_container(container_id)
+            node.index.remove_container(container_id)
+            raise
+        return container_id[:12]
+
+    def node(self, name: Optional[str]) -> Node:
+        """
+        Returns a node by name.
+
+        Args:
+            name (Optional[str]): The node name, e.g. a user's wallet_node.
+
+        Returns:
+            Node: The node, or the default node for an unknown or unset name.
+        """
+        if name is None:
+            return self.default
+        return self.nodes.get(name, self.default)
+
+    async def node_of(self, container_id: str) -> Node:
+        """
+        Finds the node a container runs on, from the events indexes when they
+        can answer.
+
+        Args:
+            container_id (str): The ID or name of the container.
+
+        Returns:
+            Node: The node holding the container, or the default node if none
+            does.
+        """
+        unknown: list[Node] = []
+        for node in self.nodes.values():
+            known = node.index.container_exists(container_id)
+            if known:
+                return node
+            if known is None:
+                unknown.append(node)
+
+        for node in unknown:
+            try:
+                await node.engine.inspect_container(container_id)
+                return node
+            except EngineNotFound:
+                continue
+        return self.default
+
+    async def _volume_on(self, node: Node, volume_id: str) -> bool:
+        """
+        Checks if a volume exists on one node.
+
+        Args:
+            node (Node): The node.
+            volume_id (str): The ID of the volume.
+
+        Returns:
+            bool: True if the volume exists there, False otherwise.
+        """
+        known = node.index.volume_exists(volume_id)
+        if known is not None:
+            return known
+
+        try:
+            await node.engine.inspect_volume(volume_id)
+            return True
+        except EngineNotFound:
+            return False
+
+    async def _place(self, u: User) -> Node:
+        """
+        Returns the node a user's wallet lives on, choosing (and storing) one
+        for a user who has none yet.
+
+        Args:
+            u (User): The loaded user.
+
+        Returns:
+            Node: The user's node.
+        """
+        if u.wallet_node in self.nodes:
+            return self.nodes[u.wallet_node]
+
+        # A wallet created before placement was recorded lives on the default
+        # node; anyone else goes wherever there is the most headroom.
+        if await self._volume_on(self.default, self.get_user_volume(u.username)):
+            node = self.default
+        else:
+            node = await self.scheduler.place()
+        u.wallet_node = node.name
+        await u.save(["wallet_node"])
+        return node
+
     async def create_wallet(
         self,
         username: str,
@@ -57,24 +368,14 @@ class Docker:
         Returns:
             str: The short ID of the wallet initialization container.
         """
-        from backend.factory import daemon
-
         username = validate_username(username)
 
-        u = User(username=username)
-        await u.load()
+        u = await User.get(username, User.WALLET_FIELDS)
         volume_name = self.get_user_volume(u.username)
         wallet_password = token_hex(16)
         u.wallet_password = wallet_password
         await u.save(["wallet_password"])
 
-        daemon_address = (
-            f"{'https' if config.DAEMON_SSL else 'http'}://"
-            f"{config.DAEMON_HOST}:{config.DAEMON_PORT}"
-        )
-        daemon_login = f"{config.DAEMON_USERNAME}:{config.DAEMON_PASSWORD}"
-        daemon_ssl = "enabled" if config.DAEMON_SSL else "disabled"
-
         entrypoint: list[str]
         if seed:
             seed = validate_seed(seed)
@@ -84,10 +385,7 @@ class Docker:
                 '--generate-new-wallet "/wallet/$1.wallet" '
                 '--restore-height "$4" '
                 '--password "$2" '
-                f'--daemon-address "{daemon_address}" '
-                f'--daemon-login "{daemon_login}" '
-                f'--daemon-ssl "{daemon_ssl}" '
-                "--trusted-daemon "
+                f"{shlex.join(self._daemon_flags())} "
                 '--electrum-seed "$3" '
                 '--log-file "/wallet/$1-init.log" '
                 "--command refresh"
@@ -108,56 +406,46 @@ class Docker:
                 "--generate-new-wallet",
                 f"/wallet/{u.username}.wallet",
                 "--restore-height",
-                str((await daemon.get_info())["height"]),
+                str((await chain.get_info())["height"]),
                 "--password",
                 wallet_password,
                 "--mnemonic-language",
                 "English",
-                "--daemon-address",
-                daemon_address,
-                "--daemon-login",
-                daemon_login,
-                "--daemon-ssl",
-                daemon_ssl,
-                "--trusted-daemon",
+                *self._daemon_flags(),
                 "--log-file",
                 f"/wallet/{u.username}-init.log",
                 "--command",
                 "version",
             ]
 
-        if not await self.volume_exists(volume_name):
-            await asyncio.to_thread(
-                self.client.volumes.create, name=volume_name, driver="local"
-            )
+        # A new or restored wallet rebuilds its transfer history from scratch.
+        await transfer_history.clear(u.username)
 
-        container_name = f"init_wallet_{u.username}"
-        try:
-            container = await asyncio.to_thread(
-                self.client.containers.run,
-                self.nerva_docker_img,
-                entrypoint=entrypoint,
-                auto_remove=True,
-                name=container_name,
-                remove=True,
-                detach=True,
-                volumes={volume_name: {"bind": "/wallet", "mode": "rw"}},
-                network=self.wallet_network,
-                extra_hosts=self.extra_hosts,
+        node = await self._place(u)
+        if not await self._volume_on(node, volume_name):
+            await node.engine.create_volume(
+                volume_name, labels=self._labels("wallet", u.username)
             )
-            return container.short_id
-
-        except APIError as e:
-            if str(e).startswith("409"):
-                container = await asyncio.to_thread(
-                    self.client.containers.get, container_name
-                )
-                return container.short_id
-            raise
+            node.index.add_volume(volume_name)
+
+        container_id = await self._run(
+            f"init_wallet_{u.username}",
+            self._container_config(
+                entrypoint,
+                volume=volume_name,
+                labels=self._labels("init", u.username),
+            ),
+            node,
+        )
+        if seed:
+            await self.progress.watch(u.username)
+        return container_id
 
     async def start_wallet(self, username: str) -> str:
         """
-        Starts the wallet RPC container for a user.
+        Starts the wallet RPC container for a user: resumes their hibernated
+        container if they have one, else claims one from the warm pool when it
+        is enabled, falling back to a cold start on a miss.
 
         Args:
             username (str): The username of the user.
@@ -167,20 +455,38 @@ class Docker:
         """
         username = validate_username(username)
 
-        u = User(username=username)
-        await u.load()
+        u = await User.get(username, User.WALLET_FIELDS)
 
         if not u.wallet_password:
             raise ValueError("Wallet password is not set for this user")
 
-        wallet_password = u.wallet_password
+        resumed = await self.hibernation.resume(u.username)
+        if resumed is not None:
+            return resumed
+        if self.pool is not None:
+            reclaimed = await self.pool.reclaim(u)
+            if reclaimed is not None:
+                return reclaimed
+        await self.stop_presync(u.username)
+
+        node = await self._place(u)
         container_name = f"rpc_wallet_{u.username}"
+        # Pooled containers run on the default node, next to its volumes.
+        if (
+            self.pool is not None
+            and node is self.default
+            and not await self.container_exists(container_name)
+        ):
+            claimed = await self.pool.claim(u)
+            if claimed is not None:
+                return claimed
+
+        if u.wallet_rpc_login:
+            u.wallet_rpc_login = None
+            await u.save(["wallet_rpc_login"])
+
+        wallet_password = u.wallet_password
         volume_name = self.get_user_volume(u.username)
-        daemon_address = (
-            f"{'https' if config.DAEMON_SSL else 'http'}://"
-            f"{config.DAEMON_HOST}:{config.DAEMON_PORT}"
-        )
-        daemon_ssl = "enabled" if config.DAEMON_SSL else "disabled"
         entrypoint: list[str] = [
             "nerva-wallet-rpc",
             "--non-interactive",
@@ -197,48 +503,195 @@ class Docker:
             f"{u.username}:{wallet_password}",
             "--password",
             wallet_password,
-            "--daemon-address",
-            daemon_address,
-            "--daemon-login",
-            f"{config.DAEMON_USERNAME}:{config.DAEMON_PASSWORD}",
-            "--daemon-ssl",
-            daemon_ssl,
-            "--trusted-daemon",
+            *self._daemon_flags(),
             "--log-file",
             f"/wallet/{u.username}-rpc.log",
         ]
-        ports: Optional[dict[str, tuple[str, int]]] = (
-            None
-            if self.wallet_network
-            else {
-                f"{self.listen_port}/tcp": cast(
-                    "tuple[str, int]", ("127.0.0.1", None)
-                )
-            }
+        return await self._run(
+            container_name,
+            self._container_config(
+                entrypoint,
+                volume=volume_name,
+                publish=True,
+                labels=self._labels("rpc", u.username),
+                host_ip=node.address,
+            ),
+            node,
+        )
+
+    async def start_presync(self, u: User) -> tuple[Node, str]:
+        """
+        Starts a low-priority, refresh-only wallet-cli container for a user's
+        stopped wallet, which scans the chain into the wallet cache on their
+        volume and exits.
+
+        Args:
+            u (User): The loaded user.
+
+        Returns:
+            tuple[Node, str]: The node it runs on and the container's short ID.
+        """
+        if not u.wallet_password:
+            raise ValueError("Wallet password is not set for this user")
+
+        node = self.node(u.wallet_node)
+        entrypoint: list[str] = [
+            "nerva-wallet-cli",
+            "--wallet-file",
+            f"/wallet/{u.username}.wallet",
+            "--password",
+            u.wallet_password,
+            *self._daemon_flags(),
+            "--log-file",
+            f"/wallet/{u.username}-presync.log",
+            "--command",
+            "refresh",
+        ]
+        body = self._container_config(
+            entrypoint,
+            volume=self.get_user_volume(u.username),
+            labels=self._labels("presync", u.username),
         )
+        # A tenth of the default CPU weight: live wallets always come first.
+        body["HostConfig"]["CpuShares"] = 102
+        return node, await self._run(f"presync_wallet_{u.username}", body, node)
+
+    async def stop_presync(self, username: str) -> None:
+        """
+        Stops a user's pre-sync container, if one is running, so the wallet
+        file is free for the wallet RPC.
+
+        Args:
+            username (str): The username of the user.
+        """
+        name = f"presync_wallet_{username}"
+        if not await self.container_exists(name):
+            return
+
+        node = await self.node_of(name)
         try:
-            container = await asyncio.to_thread(
-                self.client.containers.run,
-                self.nerva_docker_img,
-                entrypoint=entrypoint,
-                auto_remove=True,
-                name=container_name,
-                remove=True,
-                detach=True,
-                volumes={volume_name: {"bind": "/wallet", "mode": "rw"}},
-                network=self.wallet_network,
-                extra_hosts=self.extra_hosts,
-                ports=ports,
-            )
-            return container.short_id
-
-        except APIError as e:
-            if str(e).startswith("409"):
-                container = await asyncio.to_thread(
-                    self.client.containers.get, container_name
-                )
-                return container.short_id
-            raise
+            await node.engine.stop_container(name)
+        except EngineNotFound:
+            pass
+
+    async def start_pooled(self, name: str, rpc_login: str) -> str:
+        """
+        Starts an idle wallet RPC container for the warm pool, serving
+        --wallet-dir from a private tmpfs with no wallet open yet.
+
+        Args:
+            name (str): The container name.
+            rpc_login (str): The "user:password" RPC login for the container.
+
+        Returns:
+            str: The short ID of the started container.
+        """
+        entrypoint: list[str] = [
+            "nerva-wallet-rpc",
+            "--non-interactive",
+            "--rpc-bind-port",
+            str(self.listen_port),
+            "--rpc-bind-ip",
+            "0.0.0.0",
+            "--confirm-external-bind",
+            "--rpc-ssl",
+            "disabled",
+            "--wallet-dir",
+            POOL_DIR,
+            "--rpc-login",
+            rpc_login,
+            *self._daemon_flags(),
+            "--log-file",
+            f"{POOL_DIR}/rpc.log",
+        ]
+        return await self._run(
+            name,
+            self._container_config(
+                entrypoint,
+                publish=True,
+                tmpfs={POOL_DIR: ""},
+                labels=self._labels("pool"),
+                host_ip=self.default.address,
+            ),
+        )
+
+    @staticmethod
+    def empty_archive(names: list[str]) -> bytes:
+        """
+        Builds a tar archive of zero-length files.
+
+        Args:
+            names (list[str]): The file names to include.
+
+        Returns:
+            bytes: The tar archive.
+        """
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name in names:
+                tar.addfile(tarfile.TarInfo(name), io.BytesIO(b""))
+        return buffer.getvalue()
+
+    async def read_wallet_files(
+        self, username: str, names: list[str]
+    ) -> list[bytes]:
+        """
+        Reads files from a user's wallet volume, through a created-but-never-
+        started carrier container that mounts it.
+
+        Args:
+            username (str): The username of the user.
+            names (list[str]): The file names inside the volume.
+
+        Returns:
+            list[bytes]: One tar archive per file, in order.
+        """
+        carrier = await self._carrier(username)
+        try:
+            return [
+                await self.engine.get_archive(carrier, f"/wallet/{n}") for n in names
+            ]
+        finally:
+            await self.engine.remove_container(carrier)
+
+    async def write_wallet_files(self, username: str, archives: list[bytes]) -> None:
+        """
+        Extracts tar archives into a user's wallet volume, through a carrier
+        container that mounts it.
+
+        Args:
+            username (str): The username of the user.
+            archives (list[bytes]): The tar archives to extract.
+        """
+        carrier = await self._carrier(username)
+        try:
+            for archive in archives:
+                await self.engine.put_archive(carrier, "/wallet", archive)
+        finally:
+            await self.engine.remove_container(carrier)
+
+    async def _carrier(self, username: str) -> str:
+        """
+        Creates (without starting) a container mounting a user's wallet volume,
+        which the archive API can read and write while it is stopped. Carriers
+        serve the warm pool, so they run on the default node.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            str: The ID of the created carrier container.
+        """
+        username = validate_username(username)
+        return await self.engine.create_container(
+            None,
+            self._container_config(
+                ["true"],
+                volume=self.get_user_volume(username),
+                auto_remove=False,
+                labels=self._labels("carrier", username),
+            ),
+        )
 
     async def get_port(self, container_id: str) -> int:
         """
@@ -250,26 +703,27 @@ class Docker:
         Returns:
             int: The mapped host port.
         """
-        client = APIClient()
-        port_data = await asyncio.to_thread(
-            client.port, container_id, self.listen_port
-        )
+        node = await self.node_of(container_id)
+        info = await node.engine.inspect_container(container_id)
+        port_data = info["NetworkSettings"]["Ports"].get(f"{self.listen_port}/tcp")
         host_port = port_data[0]["HostPort"]
         return int(host_port)
 
-    def rpc_host(self, username: str) -> str:
+    def rpc_host(self, username: str, node: Optional[str] = None) -> str:
         """
         Returns the host the app should use to reach a user's wallet RPC.
 
         Args:
             username (str): The username of the user.
+            node (Optional[str]): The user's wallet_node.
 
         Returns:
-            str: The wallet container name (shared network) or loopback.
+            str: The wallet container name (shared network) or the address of
+            the node the container runs on.
         """
         if self.wallet_network:
             return f"rpc_wallet_{username}"
-        return "127.0.0.1"
+        return self.node(node).address
 
     async def rpc_port(self, container_id: str) -> int:
         """
@@ -287,7 +741,8 @@ class Docker:
 
     async def container_exists(self, container_id: str) -> bool:
         """
-        Checks if a container exists.
+        Checks if a container exists on any node, from the events indexes when
+        they can answer.
 
         Args:
             container_id (str): The ID of the container.
@@ -295,15 +750,22 @@ class Docker:
         Returns:
             bool: True if the container exists, False otherwise.
         """
-        try:
-            await asyncio.to_thread(self.client.containers.get, container_id)
-            return True
-        except (NotFound, NullResource):
-            return False
+        for node in self.nodes.values():
+            known = node.index.container_exists(container_id)
+            if known is None:
+                try:
+                    await node.engine.inspect_container(container_id)
+                    known = True
+                except EngineNotFound:
+                    known = False
+            if known:
+                return True
+        return False
 
     async def restore_progress(self, username: str) -> Optional[dict[str, int]]:
         """
-        Reads the seed-restore scan progress from a user's init container.
+        Reads the seed-restore scan progress of a user's init container, as
+        published to Redis by its log follower.
 
         Args:
             username (str): The username of the user.
@@ -312,35 +774,12 @@ class Docker:
             Optional[dict[str, int]]: The scanned and target block heights, or
             None when no restore scan is in progress.
         """
-        username = validate_username(username)
-
-        try:
-            container = await asyncio.to_thread(
-                self.client.containers.get, f"init_wallet_{username}"
-            )
-            raw = (await asyncio.to_thread(container.logs, tail=1)).decode(
-                "utf-8", errors="ignore"
-            )
-        except (NotFound, NullResource):
-            return None
-
-        matches = re.findall(r"Height (\d+) / (\d+)", raw)
-        if not matches:
-            return None
-
-        # The tailed log chunk can slice mid-number, truncating the final
-        # match; truncation only ever shrinks a value, so the max of each
-        # group recovers the true latest height and chain tip.
-        total = max(int(t) for _, t in matches)
-        if total <= 0:
-            return None
-
-        current = min(max(int(c) for c, _ in matches), total)
-        return {"current": current, "total": total}
+        return await self.progress.get(validate_username(username))
 
     async def volume_exists(self, volume_id: str) -> bool:
         """
-        Checks if a volume exists.
+        Checks if a volume exists on any node, from the events indexes when
+        they can answer.
 
         Args:
             volume_id (str): The ID of the volume.
@@ -348,24 +787,32 @@ class Docker:
         Returns:
             bool: True if the volume exists, False otherwise.
         """
-        try:
-            await asyncio.to_thread(self.client.volumes.get, volume_id)
-            return True
-        except (NotFound, NullResource):
-            return False
+        for node in self.nodes.values():
+            if await self._volume_on(node, volume_id):
+                return True
+        return False
 
     async def stop_container(self, container_id: Optional[str]) -> None:
         """
-        Stops a running container.
+        Stops a running container, or returns a pooled one to the warm pool.
 
         Args:
             container_id (str): The ID of the container.
         """
-        if container_id and await self.container_exists(container_id):
-            c: Container = await asyncio.to_thread(
-                self.client.containers.get, container_id
-            )
-            await asyncio.to_thread(c.stop)
+        if not container_id:
+            return
+
+        node = await self.node_of(container_id)
+        try:
+            info = await node.engine.inspect_container(container_id)
+        except EngineNotFound:
+            return
+
+        labels = info["Config"].get("Labels") or {}
+        if self.pool is not None and labels.get(LABEL_ROLE) == "pool":
+            if await self.pool.release(container_id):
+                return
+        await node.engine.stop_container(container_id)
 
     async def delete_wallet_data(self, user_id: str) -> bool:
         """
@@ -378,10 +825,11 @@ class Docker:
             bool: True if the operation is successful, False otherwise.
         """
         volume_name = self.get_user_volume(user_id)
-        volume: Volume = await asyncio.to_thread(
-            self.client.volumes.get, volume_name
-        )
-        await asyncio.to_thread(volume.remove)
+        for node in self.nodes.values():
+            if await self._volume_on(node, volume_name):
+                await node.engine.remove_volume(volume_name)
+                node.index.remove_volume(volume_name)
+        await transfer_history.clear(user_id)
         return True
 
     @staticmethod
@@ -397,44 +845,3 @@ class Docker:
         """
         volume_name = f"user_{user_id}_wallet"
         return volume_name
-
-    async def cleanup(self) -> None:
-        """
-        Cleans up expired wallet containers and stale data for all users.
-        """
-        users = await User.get_all()
-        async for u in users:
-            username = str(u["username"])
-            # Isolate each user: one failure (e.g. a stuck stop_container) must
-            # not abort the whole batch, and a failed stop must not clear the DB
-            # (which would orphan the still-running container).
-            try:
-                u = User(username=username)
-                await u.load()
-
-                if u.wallet_started_at:
-                    session_lifetime: int = config.PERMANENT_SESSION_LIFETIME
-                    wallet_started: datetime = u.wallet_started_at
-                    if wallet_started.tzinfo is None:
-                        wallet_started = wallet_started.replace(tzinfo=UTC)
-                    expiration_time: datetime = wallet_started + timedelta(
-                        seconds=session_lifetime
-                    )
-                    now: datetime = datetime.now(UTC)
-                    time_diff: timedelta = expiration_time - now
-                    if time_diff.total_seconds() <= 0:
-                        print(f"Found expired container for {u}. Killing...")
-                        await self.stop_container(u.wallet_container)
-                        await u.clear_wallet_data(
-                            expected_container=u.wallet_container
-                        )
-                        continue
-
-                if u.wallet_container and not await self.container_exists(
-                    u.wallet_container
-                ):
-                    print(f"Found stale data for {u}. Deleting...")
-                    await u.clear_wallet_data(expected_container=u.wallet_container)
-            except Exception as e:
-                print(f"Cleanup failed for {username}: {e}")
-                continue
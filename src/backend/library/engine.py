@@ -0,0 +1,625 @@
+from typing import Any, Optional, AsyncIterator
+
+import json
+import struct
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from aiohttp import (
+    ClientError,
+    TCPConnector,
+    ClientSession,
+    ClientTimeout,
+    UnixConnector,
+    ClientResponse,
+)
+
+from backend.library.metrics import metrics
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+API_VERSION = "v1.41"
+
+
+class EngineError(Exception):
+    """
+    An error response (or transport failure) from the Docker Engine API.
+
+    Attributes:
+        status (int): The HTTP status code, or 0 for a transport failure.
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"{status} {message}")
+        self.status: int = status
+
+
+class EngineNotFound(EngineError):
+    """A 404 from the Docker Engine API (no such container or volume)."""
+
+
+class DockerEngine:
+    """
+    A minimal asyncio client for the Docker Engine API.
+
+    Requests share one aiohttp session with a bounded pool of keep-alive
+    connections to the unix socket or the DOCKER_HOST TCP endpoint (e.g. the
+    docker-socket-proxy), so a burst of logins neither opens a connection per
+    call nor queues on the default thread pool. Every call has a timeout and
+    records its latency under "docker.<operation>".
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        timeout: float = 10.0,
+        pool_size: int = 32,
+    ) -> None:
+        """
+        Initializes the client. The HTTP session is created lazily, inside the
+        event loop that first uses it.
+
+        Args:
+            host (Optional[str]): A DOCKER_HOST-style URL ("unix:///path" or
+                "tcp://host:port"). Defaults to the local unix socket.
+            timeout (float, optional): The default per-call timeout, in seconds.
+                Defaults to 10.
+            pool_size (int, optional): The most simultaneous connections.
+                Defaults to 32.
+        """
+        url = urlsplit(host or f"unix://{DEFAULT_SOCKET}")
+        if url.scheme == "unix":
+            self.socket: Optional[str] = url.path or DEFAULT_SOCKET
+            self.base_url: str = f"http://docker/{API_VERSION}"
+        elif url.scheme in ("tcp", "http"):
+            self.socket = None
+            self.base_url = f"http://{url.netloc}/{API_VERSION}"
+        else:
+            raise ValueError(f"Unsupported DOCKER_HOST: {host}")
+
+        self.timeout: float = timeout
+        self.pool_size: int = pool_size
+        self._session: Optional[ClientSession] = None
+
+    def _get_session(self) -> ClientSession:
+        if self._session is None or self._session.closed:
+            connector = (
+                UnixConnector(
+                    path=self.socket, limit=self.pool_size, keepalive_timeout=30
+                )
+                if self.socket
+                else TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            )
+            self._session = ClientSession(connector=connector)
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Closes the pooled connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        *,
+        params: Optional[dict[str, Any]] = None,
+        body: Optional[Any] = None,
+        data: Optional[bytes] = None,
+        timeout: Optional[float] = None,
+    ) -> bytes:
+        """
+        Sends one Engine API request and returns the raw response body.
+
+        Args:
+            operation (str): The name latency is recorded under.
+            method (str): The HTTP method.
+            path (str): The API path, e.g. "/containers/create".
+            params (Optional[dict[str, Any]]): Query parameters.
+            body (Optional[Any]): A JSON request body.
+            data (Optional[bytes]): A raw (tar) request body.
+            timeout (Optional[float]): Overrides the default timeout.
+
+        Returns:
+            bytes: The response body.
+
+        Raises:
+            EngineNotFound: On a 404.
+            EngineError: On any other error status, a timeout or a transport
+                failure.
+        """
+        headers: dict[str, str] = {}
+        if data is not None:
+            headers["Content-Type"] = "application/x-tar"
+
+        query = {
+            k: str(v).lower() if isinstance(v, bool) else str(v)
+            for k, v in (params or {}).items()
+            if v is not None
+        }
+
+        with metrics.timer(f"docker.{operation}"):
+            try:
+                async with self._get_session().request(
+                    method,
+                    f"{self.base_url}{path}",
+                    params=query,
+                    json=body,
+                    data=data,
+                    headers=headers,
+                    timeout=ClientTimeout(total=timeout or self.timeout),
+                ) as res:
+                    payload = await res.read()
+                    self._raise_for_status(res, payload)
+                    return payload
+            except (ClientError, asyncio.TimeoutError) as e:
+                metrics.incr("docker.error")
+                raise EngineError(0, f"{operation}: {e!r}") from e
+
+    async def request_json(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Sends one Engine API request and decodes its JSON response.
+
+        Args:
+            operation (str): The name latency is recorded under.
+            method (str): The HTTP method.
+            path (str): The API path.
+            **kwargs (Any): Passed on to request().
+
+        Returns:
+            Any: The decoded response, or None for an empty body.
+        """
+        payload = await self.request(operation, method, path, **kwargs)
+        return json.loads(payload) if payload else None
+
+    @staticmethod
+    def _raise_for_status(res: ClientResponse, payload: bytes) -> None:
+        if res.status < 400:
+            return
+
+        metrics.incr("docker.error")
+        try:
+            message = str(json.loads(payload).get("message", ""))
+        except (ValueError, AttributeError):
+            message = payload.decode("utf-8", errors="ignore")
+
+        if res.status == 404:
+            raise EngineNotFound(res.status, message)
+        raise EngineError(res.status, message)
+
+    async def ping(self) -> bool:
+        """
+        Checks that the engine is reachable.
+
+        Returns:
+            bool: True if the engine answered the ping.
+        """
+        try:
+            return await self.request("ping", "GET", "/_ping", timeout=5) == b"OK"
+        except EngineError:
+            return False
+
+    async def info(self) -> dict[str, Any]:
+        """
+        Reads the engine's system information.
+
+        Returns:
+            dict[str, Any]: The Engine API /info description (e.g.
+            ContainersRunning, MemTotal).
+        """
+        res: dict[str, Any] = await self.request_json("info", "GET", "/info")
+        return res
+
+    async def list_containers(
+        self, filters: Optional[dict[str, list[str]]] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Lists containers, including stopped ones.
+
+        Args:
+            filters (Optional[dict[str, list[str]]]): Engine API list filters,
+                e.g. {"name": ["rpc_wallet_"]}.
+
+        Returns:
+            list[dict[str, Any]]: The Engine API container summaries.
+        """
+        res: list[dict[str, Any]] = await self.request_json(
+            "list",
+            "GET",
+            "/containers/json",
+            params={"all": True, "filters": json.dumps(filters or {})},
+        )
+        return res
+
+    async def create_container(
+        self, name: Optional[str], config: dict[str, Any]
+    ) -> str:
+        """
+        Creates a container.
+
+        Args:
+            name (Optional[str]): The container name, or None for a random one.
+            config (dict[str, Any]): The Engine API container config.
+
+        Returns:
+            str: The full ID of the new container.
+        """
+        res = await self.request_json(
+            "create",
+            "POST",
+            "/containers/create",
+            params={"name": name},
+            body=config,
+        )
+        return str(res["Id"])
+
+    async def start_container(self, container_id: str) -> None:
+        """
+        Starts a created container.
+
+        Args:
+            container_id (str): The container ID or name.
+        """
+        await self.request("start", "POST", f"/containers/{container_id}/start")
+
+    async def inspect_container(self, container_id: str) -> dict[str, Any]:
+        """
+        Inspects a container.
+
+        Args:
+            container_id (str): The container ID or name.
+
+        Returns:
+            dict[str, Any]: The Engine API container description.
+        """
+        res: dict[str, Any] = await self.request_json(
+            "inspect", "GET", f"/containers/{container_id}/json"
+        )
+        return res
+
+    async def stop_container(self, container_id: str, grace: int = 10) -> None:
+        """
+        Stops a container, killing it after a grace period.
+
+        Args:
+            container_id (str): The container ID or name.
+            grace (int, optional): Seconds to wait before killing. Defaults to 10.
+        """
+        await self.request(
+            "stop",
+            "POST",
+            f"/containers/{container_id}/stop",
+            params={"t": grace},
+            timeout=self.timeout + grace,
+        )
+
+    async def wait_container(self, container_id: str, timeout: float) -> int:
+        """
+        Waits for a container to exit.
+
+        Args:
+            container_id (str): The container ID or name.
+            timeout (float): The most seconds to wait.
+
+        Returns:
+            int: The container's exit code.
+
+        Raises:
+            EngineError: With status 0 if it is still running after timeout.
+        """
+        res: dict[str, Any] = await self.request_json(
+            "wait",
+            "POST",
+            f"/containers/{container_id}/wait",
+            timeout=timeout,
+        )
+        return int(res.get("StatusCode", -1))
+
+    async def pause_container(self, container_id: str) -> None:
+        """
+        Freezes every process in a container, keeping its memory and state.
+
+        Args:
+            container_id (str): The container ID or name.
+        """
+        await self.request("pause", "POST", f"/containers/{container_id}/pause")
+
+    async def unpause_container(self, container_id: str) -> None:
+        """
+        Resumes a paused container.
+
+        Args:
+            container_id (str): The container ID or name.
+        """
+        await self.request("unpause", "POST", f"/containers/{container_id}/unpause")
+
+    async def remove_container(self, container_id: str, force: bool = True) -> None:
+        """
+        Removes a container.
+
+        Args:
+            container_id (str): The container ID or name.
+            force (bool, optional): Kill it first if running. Defaults to True.
+        """
+        await self.request(
+            "remove",
+            "DELETE",
+            f"/containers/{container_id}",
+            params={"force": force},
+        )
+
+    async def rename_container(self, container_id: str, name: str) -> None:
+        """
+        Renames a container.
+
+        Args:
+            container_id (str): The container ID or name.
+            name (str): The new name.
+        """
+        await self.request(
+            "rename",
+            "POST",
+            f"/containers/{container_id}/rename",
+            params={"name": name},
+        )
+
+    async def logs(self, container_id: str, tail: int) -> bytes:
+        """
+        Reads the last lines of a container's stdout and stderr.
+
+        Args:
+            container_id (str): The container ID or name.
+            tail (int): The number of lines to read.
+
+        Returns:
+            bytes: The log output, demultiplexed.
+        """
+        raw = await self.request(
+            "logs",
+            "GET",
+            f"/containers/{container_id}/logs",
+            params={"stdout": True, "stderr": True, "tail": tail},
+        )
+        return self.demux(raw)
+
+    @asynccontextmanager
+    async def follow_logs(
+        self, container_id: str, tail: int = 1
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        """
+        Follows a container's stdout and stderr until it exits.
+
+        Args:
+            container_id (str): The container ID or name.
+            tail (int, optional): Earlier lines to start with. Defaults to 1.
+
+        Yields:
+            AsyncIterator[bytes]: The demultiplexed log output, chunk by chunk.
+
+        Raises:
+            EngineError: If the stream could not be opened, or broke.
+        """
+        async with self._stream(
+            "logs",
+            f"/containers/{container_id}/logs",
+            {"stdout": "true", "stderr": "true", "follow": "true", "tail": tail},
+        ) as res:
+            yield self._demux_stream(res)
+
+    @staticmethod
+    async def _demux_stream(res: ClientResponse) -> AsyncIterator[bytes]:
+        buffer = b""
+        try:
+            async for chunk in res.content.iter_any():
+                buffer += chunk
+                while len(buffer) >= 8:
+                    stream, size = struct.unpack(">BxxxL", buffer[:8])
+                    if stream not in (0, 1, 2):
+                        # Not multiplexed (a TTY container): pass it through.
+                        yield buffer
+                        buffer = b""
+                        break
+                    if len(buffer) < 8 + size:
+                        break
+                    yield buffer[8 : 8 + size]
+                    buffer = buffer[8 + size :]
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise EngineError(0, f"logs: {e!r}") from e
+
+    @staticmethod
+    def demux(raw: bytes) -> bytes:
+        """
+        Strips the 8-byte stream headers Docker frames non-TTY logs with.
+
+        Args:
+            raw (bytes): The multiplexed log stream.
+
+        Returns:
+            bytes: The concatenated payloads.
+        """
+        out = bytearray()
+        offset = 0
+        while offset + 8 <= len(raw):
+            stream, size = struct.unpack(">BxxxL", raw[offset : offset + 8])
+            if stream not in (0, 1, 2):
+                # Not multiplexed (a TTY container): the body is the raw log.
+                return raw
+            out += raw[offset + 8 : offset + 8 + size]
+            offset += 8 + size
+        return bytes(out)
+
+    async def get_archive(self, container_id: str, path: str) -> bytes:
+        """
+        Reads a path out of a container as a tar archive.
+
+        Args:
+            container_id (str): The container ID or name.
+            path (str): The absolute path inside the container.
+
+        Returns:
+            bytes: The tar archive holding the path.
+        """
+        return await self.request(
+            "get_archive",
+            "GET",
+            f"/containers/{container_id}/archive",
+            params={"path": path},
+        )
+
+    async def put_archive(self, container_id: str, path: str, data: bytes) -> None:
+        """
+        Extracts a tar archive into a directory of a container.
+
+        Args:
+            container_id (str): The container ID or name.
+            path (str): The absolute directory inside the container.
+            data (bytes): The tar archive to extract.
+        """
+        await self.request(
+            "put_archive",
+            "PUT",
+            f"/containers/{container_id}/archive",
+            params={"path": path},
+            data=data,
+        )
+
+    async def list_volumes(
+        self, filters: Optional[dict[str, list[str]]] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Lists volumes.
+
+        Args:
+            filters (Optional[dict[str, list[str]]]): Engine API list filters.
+
+        Returns:
+            list[dict[str, Any]]: The Engine API volume descriptions.
+        """
+        res = await self.request_json(
+            "volume_list",
+            "GET",
+            "/volumes",
+            params={"filters": json.dumps(filters or {})},
+        )
+        return list(res.get("Volumes") or [])
+
+    async def create_volume(
+        self, name: str, labels: Optional[dict[str, str]] = None
+    ) -> None:
+        """
+        Creates a local volume.
+
+        Args:
+            name (str): The volume name.
+            labels (Optional[dict[str, str]]): Volume labels.
+        """
+        await self.request(
+            "volume_create",
+            "POST",
+            "/volumes/create",
+            body={"Name": name, "Driver": "local", "Labels": labels or {}},
+        )
+
+    async def inspect_volume(self, name: str) -> dict[str, Any]:
+        """
+        Inspects a volume.
+
+        Args:
+            name (str): The volume name.
+
+        Returns:
+            dict[str, Any]: The Engine API volume description.
+        """
+        res: dict[str, Any] = await self.request_json(
+            "volume_inspect", "GET", f"/volumes/{name}"
+        )
+        return res
+
+    async def remove_volume(self, name: str) -> None:
+        """
+        Removes a volume.
+
+        Args:
+            name (str): The volume name.
+        """
+        await self.request("volume_remove", "DELETE", f"/volumes/{name}")
+
+    @asynccontextmanager
+    async def events(
+        self, filters: Optional[dict[str, list[str]]] = None
+    ) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        """
+        Subscribes to the engine's event stream.
+
+        The connection is open (so no event can be missed) once the context is
+        entered; the yielded iterator then decodes events until the stream
+        ends or the context exits.
+
+        Args:
+            filters (Optional[dict[str, list[str]]]): Engine API event filters,
+                e.g. {"type": ["container"]}.
+
+        Yields:
+            AsyncIterator[dict[str, Any]]: The decoded events.
+
+        Raises:
+            EngineError: If the stream could not be opened, or broke.
+        """
+        async with self._stream(
+            "events", "/events", {"filters": json.dumps(filters or {})}
+        ) as res:
+            yield self._decode_events(res)
+
+    @asynccontextmanager
+    async def _stream(
+        self, operation: str, path: str, params: dict[str, Any]
+    ) -> AsyncIterator[ClientResponse]:
+        """
+        Opens a long-lived GET response, with no read timeout.
+
+        Args:
+            operation (str): The name errors are reported under.
+            path (str): The API path.
+            params (dict[str, Any]): Query parameters.
+
+        Yields:
+            ClientResponse: The open response.
+
+        Raises:
+            EngineError: If the stream could not be opened.
+        """
+        try:
+            res = await self._get_session().get(
+                f"{self.base_url}{path}",
+                params={k: str(v) for k, v in params.items()},
+                timeout=ClientTimeout(total=None, sock_connect=self.timeout),
+            )
+        except (ClientError, asyncio.TimeoutError) as e:
+            metrics.incr("docker.error")
+            raise EngineError(0, f"{operation}: {e!r}") from e
+
+        try:
+            if res.status >= 400:
+                self._raise_for_status(res, await res.read())
+            yield res
+        finally:
+            res.release()
+
+    @staticmethod
+    async def _decode_events(res: ClientResponse) -> AsyncIterator[dict[str, Any]]:
+        try:
+            async for line in res.content:
+                if line.strip():
+                    yield json.loads(line)
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise EngineError(0, f"events: {e!r}") from e
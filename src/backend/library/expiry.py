@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from time import time
+from datetime import UTC, datetime
+
+from backend.utils.models import User
+from backend.library.metrics import metrics
+
+if TYPE_CHECKING:
+    from backend.library.docker import Docker
+
+EXPIRY_KEY = "wallet-expiry"
+REAP_BATCH = 100
+RETRY_DELAY = 60
+
+
+class WalletExpiry:
+    """
+    A schedule of wallet session expiries, kept in a Redis sorted set of
+    usernames scored by the Unix time their session expires.
+
+    /connect and /keepalive (re)schedule a session; the reaper only looks at
+    entries that are due, so reaping costs scale with expiring wallets rather
+    than with every registered user, and a container is stopped within one
+    reaper tick of its expiry.
+    """
+
+    def __init__(self, docker: Docker, lifetime: int) -> None:
+        """
+        Initializes the schedule.
+
+        Args:
+            docker (Docker): The Docker manager that stops the containers.
+            lifetime (int): The wallet session lifetime, in seconds.
+        """
+        self.docker = docker
+        self.lifetime: int = lifetime
+
+    def expires_at(self, started_at: datetime) -> float:
+        """
+        Returns the Unix time a session started at started_at expires.
+
+        Args:
+            started_at (datetime): When the session was started or last kept
+                alive.
+
+        Returns:
+            float: The expiry time, in seconds since the epoch.
+        """
+        if started_at.tzinfo is None:
+            started_at = started_at.replace(tzinfo=UTC)
+        return started_at.timestamp() + self.lifetime
+
+    async def schedule(self, username: str, started_at: datetime) -> None:
+        """
+        Schedules (or pushes back) the expiry of a user's wallet session.
+
+        Args:
+            username (str): The username of the session owner.
+            started_at (datetime): When the session was started or last kept
+                alive.
+        """
+        from backend.factory import cache
+
+        await cache.redis.zadd(EXPIRY_KEY, {username: self.expires_at(started_at)})
+
+    async def rebuild(self) -> int:
+        """
+        Schedules every session recorded in the database, e.g. sessions started
+        before the schedule existed. Safe to run on every worker at startup.
+
+        Returns:
+            int: The number of sessions scheduled.
+        """
+        from backend.factory import cache
+
+        schedule: dict[str, float] = {}
+        async for u in User.get_active_sessions():
+            started = u.get("wallet_started_at")
+            # A session with no start time can't expire; schedule it now so
+            # the reaper still checks that its container is alive.
+            schedule[u["username"]] = self.expires_at(started) if started else 0
+
+        if schedule:
+            await cache.redis.zadd(EXPIRY_KEY, schedule)
+        return len(schedule)
+
+    async def reap(self) -> int:
+        """
+        Stops the wallet containers whose sessions are due and clears their
+        session data.
+
+        Returns:
+            int: The number of sessions reaped.
+        """
+        from backend.factory import cache
+
+        due = await cache.redis.zrangebyscore(
+            EXPIRY_KEY, "-inf", time(), start=0, num=REAP_BATCH
+        )
+
+        reaped = 0
+        for raw in due:
+            username = raw.decode()
+            # ZREM is the claim: only the worker that removes the entry reaps
+            # it. A keepalive racing this is caught by the check against the
+            # database below, which reschedules the session.
+            if not await cache.redis.zrem(EXPIRY_KEY, username):
+                continue
+
+            try:
+                if await self._reap_one(username):
+                    reaped += 1
+            except Exception as e:
+                print(f"Reaping failed for {username}: {e}")
+                await cache.redis.zadd(EXPIRY_KEY, {username: time() + RETRY_DELAY})
+
+        metrics.incr("expiry.reaped", reaped)
+        return reaped
+
+    async def _reap_one(self, username: str) -> bool:
+        """
+        Reaps one user's session if it really is due.
+
+        Args:
+            username (str): The username of the session owner.
+
+        Returns:
+            bool: True if a session was reaped.
+        """
+        try:
+            u = await User.get(username, User.WALLET_FIELDS)
+        except ValueError:
+            return False
+
+        if not u.wallet_container:
+            return False
+
+        if u.wallet_started_at:
+            expires_at = self.expires_at(u.wallet_started_at)
+            if expires_at > time():
+                await self.schedule(username, u.wallet_started_at)
+                return False
+
+            print(f"Found expired container for {u}. Hibernating...")
+            # A failed pause raises before the DB is cleared, which would
+            # otherwise orphan the still-running container.
+            await self.docker.hibernation.hibernate(username, u.wallet_container)
+            await u.clear_wallet_data(expected_container=u.wallet_container)
+            return True
+
+        if not await self.docker.container_exists(u.wallet_container):
+            print(f"Found stale data for {u}. Deleting...")
+            await u.clear_wallet_data(expected_container=u.wallet_container)
+            return True
+
+        # A live session with no start time is treated as starting now, so it
+        # stays on the schedule until its data is cleared.
+        await self.schedule(username, datetime.now(UTC))
+        return False
@@ -3,11 +3,15 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 import hmac
+from urllib.parse import quote
 
 from redis.exceptions import RedisError
 
-from backend.factory import cache, bcrypt
+from backend import config
+from backend.factory import http, cache
+from backend.library.http import HTTPError
 from backend.utils.models import Event
+from backend.library.hashing import hasher
 
 if TYPE_CHECKING:
     from backend.utils.models import User
@@ -21,6 +25,33 @@ async def capture_event(username: str, category: str) -> None:
     await event.save()
 
 
+async def is_temporary_email(email: str) -> bool:
+    """
+    Checks an email address against the disposable-email blocklist service.
+    Fails open (returns False) when the service is unreachable or slow, so an
+    outage there does not block registrations.
+
+    Args:
+        email (str): The email address to check.
+
+    Returns:
+        bool: True if the address is a known temporary one.
+    """
+    try:
+        status, res_json = await http.get_json(
+            "temp_mail",
+            f"https://block-temporary-email.com/check/email/{quote(email, safe='')}",
+            headers={
+                "x-api-key": str(getattr(config, "TEMP_MAIL_BLOCK_API_KEY", ""))
+            },
+            timeout=5,
+        )
+    except HTTPError:
+        return False
+
+    return status == 200 and bool((res_json or {}).get("temporary"))
+
+
 async def on_maintenance() -> bool:
     """
     Checks if the system is in maintenance mode. Fails open (returns False) when
@@ -31,7 +62,7 @@ async def on_maintenance() -> bool:
         bool: True if in maintenance mode, False otherwise.
     """
     try:
-        return bool(await cache.redis.exists("maintenance"))
+        return bool(await cache.get_local("maintenance"))
     except RedisError:
         return False
 
@@ -44,9 +75,9 @@ async def set_maintenance(enable: bool = False) -> None:
         enable (bool): Whether to enable maintenance mode. Default is False.
     """
     if enable:
-        await cache.redis.set("maintenance", 1)
+        await cache.set_local("maintenance", "1")
     else:
-        await cache.redis.delete("maintenance")
+        await cache.delete_local("maintenance")
 
 
 async def verify_2fa_code(user: User, code: str) -> bool:
@@ -110,4 +141,4 @@ async def verify_step_up(user: User, code: str, password: str) -> bool:
     if user.two_factor_method is not None:
         return await verify_2fa_code(user, code)
 
-    return bool(password) and bcrypt.check_password_hash(user.password, password)
+    return bool(password) and await hasher.check(user.password, password)
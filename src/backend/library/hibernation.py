@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+from time import time
+
+from backend.library.engine import EngineError, EngineNotFound
+from backend.library.metrics import metrics
+from backend.library.reconcile import LABEL_ROLE
+
+if TYPE_CHECKING:
+    from backend.library.docker import Docker
+
+HIBERNATION_KEY = "wallet-hibernation"
+CONTAINERS_KEY = "wallet-hibernation:containers"
+REAP_BATCH = 100
+RETRY_DELAY = 60
+
+
+class WalletHibernation:
+    """
+    A tier between a live session and a stopped container: an idle wallet RPC
+    container is paused (its processes frozen, so it uses no CPU, but its
+    memory, open wallet and refresh state are kept) and only stopped once it
+    has stayed paused for lifetime seconds, or sooner when more than
+    max_paused containers are paused.
+
+    A /connect that finds a paused container unpauses it instead of paying for
+    a container start, wallet open and catch-up refresh. Paused containers are
+    kept in a Redis sorted set of usernames scored by when they are due to be
+    stopped (oldest first, which is also the eviction order), next to a hash
+    of username to container ID.
+    """
+
+    def __init__(self, docker: Docker, lifetime: int, max_paused: int) -> None:
+        """
+        Initializes the hibernation tier.
+
+        Args:
+            docker (Docker): The Docker manager that owns the containers.
+            lifetime (int): Seconds a container stays paused before it is
+                stopped; 0 stops containers straight away.
+            max_paused (int): The most containers paused at once, across all
+                nodes; the oldest are stopped first beyond that.
+        """
+        self.docker = docker
+        self.lifetime: int = lifetime
+        self.max_paused: int = max_paused
+
+    async def hibernate(self, username: str, container_id: Optional[str]) -> None:
+        """
+        Pauses a user's idle wallet RPC container. Pooled containers go back
+        to the warm pool and, with hibernation disabled, containers are
+        stopped, both as by Docker.stop_container.
+
+        Args:
+            username (str): The username of the container owner.
+            container_id (Optional[str]): The ID of the container.
+        """
+        from backend.factory import cache
+
+        if not container_id:
+            return
+        if self.lifetime <= 0 or self.max_paused <= 0:
+            await self.docker.stop_container(container_id)
+            return
+
+        node = await self.docker.node_of(container_id)
+        try:
+            info = await node.engine.inspect_container(container_id)
+        except EngineNotFound:
+            return
+        if (info["Config"].get("Labels") or {}).get(LABEL_ROLE) != "rpc":
+            await self.docker.stop_container(container_id)
+            return
+
+        try:
+            await node.engine.pause_container(container_id)
+        except EngineError as e:
+            # 409: already paused, e.g. by a logout racing the reaper.
+            if e.status != 409:
+                raise
+
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(CONTAINERS_KEY, username, container_id[:12])
+            pipe.zadd(HIBERNATION_KEY, {username: time() + self.lifetime})
+            await pipe.execute()
+        metrics.incr("hibernation.paused")
+
+    async def resume(self, username: str) -> Optional[str]:
+        """
+        Unpauses a user's hibernated container, if there is one.
+
+        Args:
+            username (str): The username of the container owner.
+
+        Returns:
+            Optional[str]: The short ID of the resumed container, or None if
+            the user has none (or it could not be resumed).
+        """
+        container_id = await self._claim(username)
+        if container_id is None:
+            return None
+
+        with metrics.timer("hibernation.resume"):
+            node = await self.docker.node_of(container_id)
+            try:
+                await node.engine.unpause_container(container_id)
+            except EngineNotFound:
+                return None
+            except EngineError as e:
+                # 409: not paused, i.e. it is already running.
+                if e.status != 409:
+                    print(f"Failed to resume {container_id} for {username}: {e}")
+                    metrics.incr("hibernation.resume_failed")
+                    await self._stop(container_id)
+                    return None
+
+        metrics.incr("hibernation.resumed")
+        return container_id
+
+    async def discard(self, username: str) -> None:
+        """
+        Stops a user's hibernated container, if there is one, e.g. before
+        their wallet volume is deleted.
+
+        Args:
+            username (str): The username of the container owner.
+        """
+        container_id = await self._claim(username)
+        if container_id is not None:
+            await self._stop(container_id)
+
+    async def reap(self) -> int:
+        """
+        Stops the hibernated containers that are due, plus the oldest ones
+        beyond max_paused.
+
+        Returns:
+            int: The number of containers stopped.
+        """
+        from backend.factory import cache
+
+        due = await cache.redis.zcount(HIBERNATION_KEY, "-inf", time())
+        excess = await cache.redis.zcard(HIBERNATION_KEY) - self.max_paused
+        batch = min(max(due, excess), REAP_BATCH)
+        if batch <= 0:
+            return 0
+
+        stopped = 0
+        for raw in await cache.redis.zrange(HIBERNATION_KEY, 0, batch - 1):
+            username = raw.decode()
+            # ZREM is the claim, as in WalletExpiry.reap: a /connect resuming
+            # the container at the same time gets it only if it wins.
+            if not await cache.redis.zrem(HIBERNATION_KEY, username):
+                continue
+
+            container_id = await cache.redis.hget(CONTAINERS_KEY, username)  # type: ignore[misc]
+            try:
+                if container_id is not None:
+                    await self._stop(container_id.decode())
+            except Exception as e:
+                print(f"Stopping hibernated wallet failed for {username}: {e}")
+                await cache.redis.zadd(
+                    HIBERNATION_KEY, {username: time() + RETRY_DELAY}
+                )
+                continue
+
+            await cache.redis.hdel(CONTAINERS_KEY, username)  # type: ignore[misc]
+            stopped += 1
+
+        metrics.incr("hibernation.stopped", stopped)
+        metrics.incr("hibernation.evicted", max(0, min(stopped, excess - due)))
+        return stopped
+
+    async def count(self) -> int:
+        """
+        Returns the number of hibernated containers.
+
+        Returns:
+            int: The number of paused containers.
+        """
+        from backend.factory import cache
+
+        return int(await cache.redis.zcard(HIBERNATION_KEY))
+
+    async def containers(self) -> set[str]:
+        """
+        Returns the short IDs of the hibernated containers, which belong to no
+        live session but must not be treated as orphans.
+
+        Returns:
+            set[str]: The container IDs.
+        """
+        from backend.factory import cache
+
+        values = await cache.redis.hvals(CONTAINERS_KEY)  # type: ignore[misc]
+        return {v.decode() for v in values}
+
+    async def _claim(self, username: str) -> Optional[str]:
+        """
+        Takes a user's container out of the hibernation tier.
+
+        Args:
+            username (str): The username of the container owner.
+
+        Returns:
+            Optional[str]: The container ID, or None if it was not hibernated
+            (or another worker claimed it first).
+        """
+        from backend.factory import cache
+
+        if not await cache.redis.zrem(HIBERNATION_KEY, username):
+            return None
+
+        container_id = await cache.redis.hget(CONTAINERS_KEY, username)  # type: ignore[misc]
+        await cache.redis.hdel(CONTAINERS_KEY, username)  # type: ignore[misc]
+        return container_id.decode() if container_id is not None else None
+
+    async def _stop(self, container_id: str) -> None:
+        """
+        Stops a hibernated container. It is unpaused first so wallet-rpc gets
+        the stop signal and saves the wallet cache before exiting.
+
+        Args:
+            container_id (str): The ID of the container.
+        """
+        node = await self.docker.node_of(container_id)
+        try:
+            await node.engine.unpause_container(container_id)
+        except EngineNotFound:
+            return
+        except EngineError:
+            pass
+        await self.docker.stop_container(container_id)
@@ -0,0 +1,467 @@
+from typing import Any, Optional
+
+from time import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from pymongo import UpdateOne
+
+from backend.library.rpc import Wallet
+from backend.library.utils import FAILED_GRACE_SECONDS
+from backend.library.metrics import metrics
+
+# Blocks an output stays locked after its block before it becomes spendable.
+SPENDABLE_AGE = 10
+# Confirmed transfers this close below the high-water height are fetched
+# again on every sync, in case a reorg replaced their blocks.
+REORG_DEPTH = 10
+# The wallet-rpc buckets that are never stored: they are small and change
+# between calls.
+UNCONFIRMED = ("pending", "pool", "failed")
+
+ASC = [("timestamp", 1), ("key", 1)]
+DESC = [("timestamp", -1), ("key", -1)]
+
+
+def _position(entry: dict[str, Any]) -> tuple[int, str]:
+    return int(entry["timestamp"]), str(entry["key"])
+
+
+def encode_cursor(position: tuple[int, str]) -> str:
+    """
+    Encodes a history position as an opaque page cursor.
+
+    Args:
+        position (tuple[int, str]): The (timestamp, key) position.
+
+    Returns:
+        str: The cursor.
+    """
+    timestamp, key = position
+    return urlsafe_b64encode(f"{timestamp}:{key}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, str]:
+    """
+    Decodes a page cursor made by encode_cursor.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        tuple[int, str]: The (timestamp, key) position.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    # binascii.Error and UnicodeDecodeError are both ValueErrors.
+    timestamp, _, key = urlsafe_b64decode(cursor.encode()).decode().partition(":")
+    return int(timestamp), key
+
+
+def _before(position: tuple[int, str]) -> dict[str, Any]:
+    timestamp, key = position
+    return {
+        "$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "key": {"$lt": key}},
+        ]
+    }
+
+
+def _from(position: tuple[int, str]) -> dict[str, Any]:
+    timestamp, key = position
+    return {
+        "$or": [
+            {"timestamp": {"$gt": timestamp}},
+            {"timestamp": timestamp, "key": {"$gte": key}},
+        ]
+    }
+
+
+class TransferFilters:
+    """
+    Restricts the transfers a history page lists.
+
+    Attributes:
+        types (Optional[list[str]]): The transfer types to list.
+        since (Optional[int]): The earliest timestamp, inclusive.
+        until (Optional[int]): The latest timestamp, exclusive.
+        min_amount (Optional[int]): The smallest amount, in atomic units.
+        max_amount (Optional[int]): The largest amount, in atomic units.
+    """
+
+    def __init__(
+        self,
+        types: Optional[list[str]] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        min_amount: Optional[int] = None,
+        max_amount: Optional[int] = None,
+    ) -> None:
+        self.types: Optional[list[str]] = types
+        self.since: Optional[int] = since
+        self.until: Optional[int] = until
+        self.min_amount: Optional[int] = min_amount
+        self.max_amount: Optional[int] = max_amount
+
+    def query(self) -> dict[str, Any]:
+        """
+        Returns the filters as a Mongo query on stored entries.
+
+        Returns:
+            dict[str, Any]: The query.
+        """
+        query: dict[str, Any] = {}
+        if self.types is not None:
+            query["type"] = {"$in": self.types}
+        timestamp: dict[str, int] = {}
+        if self.since is not None:
+            timestamp["$gte"] = self.since
+        if self.until is not None:
+            timestamp["$lt"] = self.until
+        if timestamp:
+            query["timestamp"] = timestamp
+        amount: dict[str, int] = {}
+        if self.min_amount is not None:
+            amount["$gte"] = self.min_amount
+        if self.max_amount is not None:
+            amount["$lte"] = self.max_amount
+        if amount:
+            query["amount"] = amount
+        return query
+
+    def match(self, entry: dict[str, Any]) -> bool:
+        """
+        Checks an unconfirmed entry against the filters.
+
+        Args:
+            entry (dict[str, Any]): The entry.
+
+        Returns:
+            bool: True if the entry is listed.
+        """
+        return (
+            (self.types is None or entry["type"] in self.types)
+            and (self.since is None or entry["timestamp"] >= self.since)
+            and (self.until is None or entry["timestamp"] < self.until)
+            and (self.min_amount is None or entry["amount"] >= self.min_amount)
+            and (self.max_amount is None or entry["amount"] <= self.max_amount)
+        )
+
+
+class TransferHistory:
+    """
+    A persisted per-user index of confirmed wallet transfers, each stored with
+    the running total up to it, plus a high-water block height per user.
+
+    A sync only asks the wallet-rpc for confirmed transfers above the
+    high-water height (less REORG_DEPTH) and for the small unconfirmed
+    buckets, and only re-totals the stored entries from the earliest one that
+    changed, so reading a long history no longer means fetching and re-sorting
+    all of it. Entries are ordered by (timestamp, key), the key being
+    "txid:type" so both legs of a self-send are kept.
+    """
+
+    @staticmethod
+    def _entries() -> Any:
+        from backend.factory import db
+
+        return db.get_collection("transfers")
+
+    @staticmethod
+    def _heights() -> Any:
+        from backend.factory import db
+
+        return db.get_collection("transfer_heights")
+
+    async def ensure_indexes(self) -> None:
+        """
+        Creates the indexes the history queries rely on.
+        """
+        await self._entries().create_index(
+            [("username", 1), ("key", 1)], unique=True
+        )
+        await self._entries().create_index([("username", 1), *ASC])
+        await self._heights().create_index("username", unique=True)
+
+    async def clear(self, username: str) -> None:
+        """
+        Forgets a user's history, e.g. when their wallet is deleted or
+        replaced.
+
+        Args:
+            username (str): The username of the wallet owner.
+        """
+        await self._entries().delete_many({"username": username})
+        await self._heights().delete_one({"username": username})
+
+    async def sync(self, username: str, wallet: Wallet) -> dict[str, list[Any]]:
+        """
+        Brings a user's stored history up to date with their wallet.
+
+        Args:
+            username (str): The username of the wallet owner.
+            wallet (Wallet): The client for the user's wallet RPC.
+
+        Returns:
+            dict[str, list[Any]]: The unconfirmed (pending, pool and failed)
+            buckets as returned by the wallet-rpc, which are not stored.
+        """
+        entries = self._entries()
+        state = await self._heights().find_one({"username": username})
+        high = int(state["height"]) if state else 0
+        min_height = max(0, high - REORG_DEPTH) if state else None
+
+        transfers = await wallet.get_transfers(min_height=min_height)
+        confirmed = [
+            self._document(username, t, tx_type)
+            for tx_type in ("in", "out")
+            for t in transfers.get(tx_type, [])
+        ]
+        metrics.incr("history.fetched", len(confirmed))
+
+        # The earliest position whose running total may have changed.
+        changed = [_position(d) for d in confirmed]
+        if min_height is not None:
+            tail = {"username": username, "height": {"$gt": min_height}}
+            first = await entries.find_one(tail, sort=ASC)
+            if first is not None:
+                changed.append(_position(first))
+            # Whatever a reorg dropped from the re-fetched range.
+            await entries.delete_many(
+                {**tail, "key": {"$nin": [d["key"] for d in confirmed]}}
+            )
+
+        if confirmed:
+            await entries.bulk_write(
+                [
+                    UpdateOne(
+                        {"username": username, "key": d["key"]},
+                        {"$set": d},
+                        upsert=True,
+                    )
+                    for d in confirmed
+                ],
+                ordered=False,
+            )
+        if changed:
+            await self._retotal(username, min(changed))
+
+        height = max([high, *(d["height"] for d in confirmed)])
+        await self._heights().update_one(
+            {"username": username}, {"$max": {"height": height}}, upsert=True
+        )
+        return {k: transfers.get(k, []) for k in UNCONFIRMED}
+
+    async def page(
+        self,
+        username: str,
+        unconfirmed: dict[str, list[Any]],
+        limit: int,
+        cursor: Optional[tuple[int, str]] = None,
+        filters: Optional[TransferFilters] = None,
+    ) -> tuple[dict[str, dict[str, Any]], Optional[tuple[int, str]]]:
+        """
+        Returns one page of a user's history, newest first, with running
+        totals. Stored entries carry their own total, so any page costs one
+        indexed query rather than a pass over the whole history.
+
+        Args:
+            username (str): The username of the wallet owner.
+            unconfirmed (dict[str, list[Any]]): The buckets sync() returned.
+            limit (int): The most transfers on the page.
+            cursor (Optional[tuple[int, str]]): The (timestamp, key) position
+                of the last transfer of the previous page, if any.
+            filters (Optional[TransferFilters]): Restricts the transfers
+                listed; totals still count every transfer.
+
+        Returns:
+            tuple[dict[str, dict[str, Any]], Optional[tuple[int, str]]]: The
+            transfers by "txid:type" key, each with its txid, type, amount,
+            timestamp and running total, and the cursor of the next page (None
+            on the last one).
+        """
+        filters = filters or TransferFilters()
+        query: dict[str, Any] = {"username": username, **filters.query()}
+        if cursor is not None:
+            query.update(_before(cursor))
+
+        stored = [
+            d async for d in self._entries().find(query, sort=DESC, limit=limit + 1)
+        ]
+        pending = [
+            e
+            for e in reversed(await self.unconfirmed_entries(username, unconfirmed))
+            if filters.match(e) and (cursor is None or _position(e) < cursor)
+        ]
+
+        merged = sorted(stored + pending, key=_position, reverse=True)
+        more = len(merged) > limit
+        merged = merged[:limit]
+
+        result: dict[str, dict[str, Any]] = {}
+        for entry in merged:
+            if "total" in entry:
+                total = str(entry["total"])
+            else:
+                # An unconfirmed transfer doesn't move the total: it shows the
+                # total of the last confirmed one before it.
+                previous = await self._entries().find_one(
+                    {"username": username, **_before(_position(entry))}, sort=DESC
+                )
+                total = str(previous["total"]) if previous is not None else "0"
+            result[entry["key"]] = self._output(entry, total)
+
+        return result, (_position(merged[-1]) if more else None)
+
+    async def unconfirmed_entries(
+        self, username: str, unconfirmed: dict[str, list[Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        Turns the unconfirmed buckets into history entries, in order. A
+        "failed" transfer that is also confirmed or still pending is wallet2's
+        pool-poll race rather than a failure, and a young one is shown as
+        pending until it outlives the race window.
+
+        Args:
+            username (str): The username of the wallet owner.
+            unconfirmed (dict[str, list[Any]]): The buckets sync() returned.
+
+        Returns:
+            list[dict[str, Any]]: The entries, ordered like stored ones.
+        """
+        failed = unconfirmed.get("failed", [])
+        live = {
+            t["txid"] for k in ("pending", "pool") for t in unconfirmed.get(k, [])
+        }
+        if failed:
+            async for d in self._entries().find(
+                {"username": username, "txid": {"$in": [t["txid"] for t in failed]}},
+                {"txid": 1},
+            ):
+                live.add(d["txid"])
+
+        now = time()
+        entries: dict[str, dict[str, Any]] = {}
+        for tx_type in UNCONFIRMED:
+            for t in unconfirmed.get(tx_type, []):
+                entry_type = tx_type
+                if tx_type == "failed":
+                    if t["txid"] in live:
+                        continue
+                    if now - t["timestamp"] < FAILED_GRACE_SECONDS:
+                        entry_type = "pending"
+                key = f"{t['txid']}:{entry_type}"
+                entries[key] = {
+                    "key": key,
+                    "txid": t["txid"],
+                    "type": entry_type,
+                    "amount": int(t["amount"]),
+                    "fee": int(t.get("fee") or 0),
+                    "timestamp": int(t["timestamp"]),
+                    "locked": bool(t.get("locked")),
+                    "unlock_time": int(t.get("unlock_time") or 0),
+                }
+        return sorted(entries.values(), key=_position)
+
+    async def blocks_to_unlock(
+        self, username: str, wallet_height: int, unconfirmed: dict[str, list[Any]]
+    ) -> int:
+        """
+        Returns how many blocks until every locked output is spendable. A
+        locked output unlocks SPENDABLE_AGE blocks after its block, unless a
+        longer custom unlock height is set; unconfirmed transfers have no block
+        yet, so their lock is estimated from the current tip.
+
+        Args:
+            username (str): The username of the wallet owner.
+            wallet_height (int): The wallet's current height.
+            unconfirmed (dict[str, list[Any]]): The buckets sync() returned.
+
+        Returns:
+            int: The blocks to wait, or 0 if nothing known is locked.
+        """
+        unlock_height = 0
+        latest = await self._entries().find_one(
+            {"username": username, "unlock_height": {"$gt": wallet_height}},
+            sort=[("unlock_height", -1)],
+        )
+        if latest is not None:
+            unlock_height = int(latest["unlock_height"])
+
+        for tx_type in ("pending", "pool"):
+            for t in unconfirmed.get(tx_type, []):
+                if t.get("locked"):
+                    unlock_height = max(
+                        unlock_height, self._unlock_height(t, wallet_height)
+                    )
+        return max(0, unlock_height - wallet_height)
+
+    async def _retotal(self, username: str, start: tuple[int, str]) -> None:
+        """
+        Recomputes the running totals of a user's entries from a position on.
+
+        Args:
+            username (str): The username of the wallet owner.
+            start (tuple[int, str]): The (timestamp, key) to start from.
+        """
+        entries = self._entries()
+        previous = await entries.find_one(
+            {"username": username, **_before(start)}, sort=DESC
+        )
+        total = int(previous["total"]) if previous is not None else 0
+
+        ops: list[UpdateOne] = []
+        async for d in entries.find(
+            {"username": username, **_from(start)}, sort=ASC
+        ):
+            if d["type"] == "in":
+                total += int(d["amount"])
+            else:
+                total -= int(d["amount"]) + int(d["fee"])
+            if d.get("total") != str(total):
+                ops.append(
+                    UpdateOne({"_id": d["_id"]}, {"$set": {"total": str(total)}})
+                )
+        if ops:
+            await entries.bulk_write(ops, ordered=False)
+        metrics.incr("history.retotalled", len(ops))
+
+    @staticmethod
+    def _unlock_height(t: dict[str, Any], default_height: int) -> int:
+        unlock_height = (int(t.get("height") or 0) or default_height) + SPENDABLE_AGE
+        unlock_time = int(t.get("unlock_time") or 0)
+        if 0 < unlock_time < 500_000_000:
+            unlock_height = max(unlock_height, unlock_time)
+        return unlock_height
+
+    def _document(
+        self, username: str, t: dict[str, Any], tx_type: str
+    ) -> dict[str, Any]:
+        # Totals are kept as strings: a running total in atomic units can
+        # outgrow a 64-bit Mongo integer.
+        height = int(t.get("height") or 0)
+        return {
+            "username": username,
+            "key": f"{t['txid']}:{tx_type}",
+            "txid": t["txid"],
+            "type": tx_type,
+            "amount": int(t["amount"]),
+            "fee": int(t.get("fee") or 0),
+            "timestamp": int(t["timestamp"]),
+            "height": height,
+            "unlock_height": self._unlock_height(t, height),
+        }
+
+    @staticmethod
+    def _output(entry: dict[str, Any], total: str) -> dict[str, Any]:
+        return {
+            "txid": entry["txid"],
+            "type": entry["type"],
+            "amount": str(entry["amount"]),
+            "timestamp": entry["timestamp"],
+            "total": total,
+        }
+
+
+transfer_history = TransferHistory()
@@ -0,0 +1,118 @@
+from typing import Any, Optional
+
+import asyncio
+
+from aiohttp import ClientError, TCPConnector, ClientSession, ClientTimeout
+
+from backend.library.metrics import metrics
+
+
+class HTTPError(Exception):
+    """
+    A failed outbound request: a transport failure, a timeout or a body that
+    isn't JSON.
+    """
+
+
+class HTTPClient:
+    """
+    The application's pooled client for outbound HTTP (CoinGecko, the
+    temporary-email check, ...).
+
+    Calls share one aiohttp session, so keep-alive connections, TLS sessions
+    and DNS lookups are reused instead of paid for on every request, with a
+    connection limit per upstream host. Every call names its upstream and
+    records its latency under "http.<upstream>" and failures under
+    "http.<upstream>.error".
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        pool_size: int = 100,
+        per_host: int = 10,
+        dns_ttl: int = 300,
+    ) -> None:
+        """
+        Initializes the client. The HTTP session is created lazily, inside the
+        event loop that first uses it.
+
+        Args:
+            timeout (float, optional): The default per-call timeout, in seconds.
+                Defaults to 10.
+            pool_size (int, optional): The most simultaneous connections.
+                Defaults to 100.
+            per_host (int, optional): The most simultaneous connections to one
+                host. Defaults to 10.
+            dns_ttl (int, optional): Seconds DNS lookups are cached for.
+                Defaults to 300.
+        """
+        self.timeout: float = timeout
+        self.pool_size: int = pool_size
+        self.per_host: int = per_host
+        self.dns_ttl: int = dns_ttl
+        self._session: Optional[ClientSession] = None
+
+    def _get_session(self) -> ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self.pool_size,
+                    limit_per_host=self.per_host,
+                    ttl_dns_cache=self.dns_ttl,
+                    keepalive_timeout=30,
+                )
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Closes the pooled connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_json(
+        self,
+        upstream: str,
+        url: str,
+        *,
+        params: Optional[dict[str, str]] = None,
+        headers: Optional[dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> tuple[int, Any]:
+        """
+        Sends a GET request and decodes its JSON response.
+
+        Args:
+            upstream (str): The upstream name metrics are recorded under, e.g.
+                "coingecko".
+            url (str): The URL.
+            params (Optional[dict[str, str]]): Query parameters.
+            headers (Optional[dict[str, str]]): Request headers.
+            timeout (Optional[float]): Overrides the default timeout.
+
+        Returns:
+            tuple[int, Any]: The status code, and the decoded body (None if the
+            status is not 200).
+
+        Raises:
+            HTTPError: On a transport failure, a timeout, or a 200 response
+                that isn't JSON.
+        """
+        with metrics.timer(f"http.{upstream}"):
+            try:
+                async with self._get_session().get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=ClientTimeout(total=timeout or self.timeout),
+                ) as res:
+                    if res.status != 200:
+                        metrics.incr(f"http.{upstream}.error")
+                        return res.status, None
+                    return res.status, await res.json(content_type=None)
+            except (ClientError, asyncio.TimeoutError, ValueError) as e:
+                metrics.incr(f"http.{upstream}.error")
+                raise HTTPError(f"{upstream}: {e!r}") from e
@@ -0,0 +1,222 @@
+from typing import Any, Optional
+
+import re
+import asyncio
+
+from backend.library.engine import EngineError, DockerEngine
+from backend.library.metrics import metrics
+
+CONTAINER_PREFIXES = (
+    "rpc_wallet_",
+    "init_wallet_",
+    "pool_wallet_",
+    "presync_wallet_",
+)
+VOLUME_PATTERN = re.compile(r"^user_.+_wallet$")
+CONTAINER_ID = re.compile(r"^[0-9a-f]{12,64}$")
+SHORT_ID = 12
+RECONNECT_DELAY = 5
+
+
+class DockerIndex:
+    """
+    An in-process index of the wallet containers and volumes, kept current by
+    the Docker events stream.
+
+    The dashboard polls existence checks on every refresh; answering them from
+    memory means routine polling makes no Docker API calls. The index is only
+    trusted while its stream is connected: on every (re)connect it resyncs
+    from a full listing, and until then lookups return None so callers fall
+    back to asking the engine.
+    """
+
+    def __init__(self) -> None:
+        self.ready: bool = False
+        self.containers: dict[str, str] = {}  # short ID -> name
+        self.names: dict[str, str] = {}  # name -> short ID
+        self.volumes: set[str] = set()
+
+    @staticmethod
+    def tracks_container(name: str) -> bool:
+        """
+        Checks if a container name belongs to the index.
+
+        Args:
+            name (str): The container name, with or without the leading "/".
+
+        Returns:
+            bool: True for wallet, init, pooled and pre-sync wallet containers.
+        """
+        return name.lstrip("/").startswith(CONTAINER_PREFIXES)
+
+    @staticmethod
+    def tracks_volume(name: str) -> bool:
+        """
+        Checks if a volume name belongs to the index.
+
+        Args:
+            name (str): The volume name.
+
+        Returns:
+            bool: True for user wallet volumes.
+        """
+        return VOLUME_PATTERN.match(name) is not None
+
+    def container_exists(self, container_id: str) -> Optional[bool]:
+        """
+        Answers a container existence check from memory.
+
+        Args:
+            container_id (str): A tracked container's name or (short) ID.
+
+        Returns:
+            Optional[bool]: Whether it exists, or None if the index can't say
+            (not synced, or not a tracked container name).
+        """
+        if not self.ready:
+            return None
+
+        if container_id in self.names:
+            metrics.incr("docker.index.hit")
+            return True
+        if self.tracks_container(container_id):
+            metrics.incr("docker.index.hit")
+            return False
+        if CONTAINER_ID.match(container_id):
+            # Any ID handed out by the app belongs to a tracked container.
+            metrics.incr("docker.index.hit")
+            return container_id[:SHORT_ID] in self.containers
+        return None
+
+    def volume_exists(self, name: str) -> Optional[bool]:
+        """
+        Answers a volume existence check from memory.
+
+        Args:
+            name (str): The volume name.
+
+        Returns:
+            Optional[bool]: Whether it exists, or None if the index can't say.
+        """
+        if not self.ready or not self.tracks_volume(name):
+            return None
+
+        metrics.incr("docker.index.hit")
+        return name in self.volumes
+
+    def add_container(self, container_id: str, name: str) -> None:
+        """
+        Records a created (or renamed) container.
+
+        Args:
+            container_id (str): The container ID.
+            name (str): The container name.
+        """
+        self.remove_container(container_id)
+        name = name.lstrip("/")
+        if self.tracks_container(name):
+            self.containers[container_id[:SHORT_ID]] = name
+            self.names[name] = container_id[:SHORT_ID]
+
+    def remove_container(self, container_id: str) -> None:
+        """
+        Forgets a destroyed container.
+
+        Args:
+            container_id (str): The container ID.
+        """
+        name = self.containers.pop(container_id[:SHORT_ID], None)
+        if name is not None:
+            self.names.pop(name, None)
+
+    def add_volume(self, name: str) -> None:
+        """
+        Records a created volume.
+
+        Args:
+            name (str): The volume name.
+        """
+        if self.tracks_volume(name):
+            self.volumes.add(name)
+
+    def remove_volume(self, name: str) -> None:
+        """
+        Forgets a removed volume.
+
+        Args:
+            name (str): The volume name.
+        """
+        self.volumes.discard(name)
+
+    async def follow(self, engine: DockerEngine) -> None:
+        """
+        Follows the events stream forever, resyncing on every reconnect.
+
+        Args:
+            engine (DockerEngine): The engine to subscribe to.
+        """
+        while True:
+            try:
+                async with engine.events(
+                    {
+                        "type": ["container", "volume"],
+                        "event": ["create", "destroy", "rename"],
+                    }
+                ) as events:
+                    # The stream is already open, so anything that changes
+                    # during the listing is replayed afterwards; applying an
+                    # event the listing already reflects is a no-op.
+                    await self.resync(engine)
+                    async for event in events:
+                        self.apply(event)
+                print("Docker events stream ended, reconnecting...")
+            except (EngineError, ValueError) as e:
+                print(f"Docker events stream failed: {e}")
+            finally:
+                self.ready = False
+
+            metrics.incr("docker.index.reconnect")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def resync(self, engine: DockerEngine) -> None:
+        """
+        Rebuilds the index from a full listing of containers and volumes.
+
+        Args:
+            engine (DockerEngine): The engine to list from.
+        """
+        containers = await engine.list_containers({"name": list(CONTAINER_PREFIXES)})
+        volumes = await engine.list_volumes({"name": ["_wallet"]})
+
+        self.containers.clear()
+        self.names.clear()
+        for c in containers:
+            for name in c.get("Names") or []:
+                self.add_container(c["Id"], name)
+        self.volumes = {v["Name"] for v in volumes if self.tracks_volume(v["Name"])}
+        self.ready = True
+
+    def apply(self, event: dict[str, Any]) -> None:
+        """
+        Applies one engine event to the index.
+
+        Args:
+            event (dict[str, Any]): The decoded event.
+        """
+        actor = event.get("Actor") or {}
+        actor_id: str = actor.get("ID", "")
+        action = event.get("Action")
+
+        if event.get("Type") == "volume":
+            if action == "create":
+                self.add_volume(actor_id)
+            elif action == "destroy":
+                self.remove_volume(actor_id)
+            return
+
+        if action in ("create", "rename"):
+            self.add_container(
+                actor_id, (actor.get("Attributes") or {}).get("name", "")
+            )
+        elif action == "destroy":
+            self.remove_container(actor_id)
@@ -0,0 +1,80 @@
+from typing import Any, Iterator
+
+from time import perf_counter
+from contextlib import contextmanager
+from collections import defaultdict
+
+
+class Metrics:
+    """
+    A process-local registry of counters and latency summaries.
+
+    Values are kept per worker process and reported as-is by /v1/meta/metrics;
+    they are operational signals (hit rates, latencies), not billing data, so
+    nothing is persisted or aggregated across workers.
+    """
+
+    def __init__(self) -> None:
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.timings: dict[str, dict[str, float]] = {}
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The counter name, dotted by subsystem (e.g. "pool.hit").
+            amount (int, optional): The amount to add. Defaults to 1.
+        """
+        self.counters[name] += amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Records one latency sample.
+
+        Args:
+            name (str): The timing name, dotted by subsystem.
+            seconds (float): The observed duration, in seconds.
+        """
+        timing = self.timings.setdefault(
+            name, {"count": 0, "total": 0.0, "max": 0.0}
+        )
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Times the wrapped block, recording the sample even when it raises.
+
+        Args:
+            name (str): The timing name, dotted by subsystem.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns the current counters and timings, with mean latencies in ms.
+
+        Returns:
+            dict[str, Any]: {"counters": {...}, "timings": {...}}.
+        """
+        timings = {
+            name: {
+                "count": int(t["count"]),
+                "avg_ms": round(t["total"] / t["count"] * 1000, 3)
+                if t["count"]
+                else 0.0,
+                "max_ms": round(t["max"] * 1000, 3),
+            }
+            for name, t in sorted(self.timings.items())
+        }
+        return {"counters": dict(sorted(self.counters.items())), "timings": timings}
+
+
+metrics = Metrics()
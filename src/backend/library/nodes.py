@@ -0,0 +1,98 @@
+from typing import Optional
+
+import asyncio
+
+from backend.library.index import DockerIndex
+from backend.library.engine import EngineError, DockerEngine
+from backend.library.metrics import metrics
+
+
+class Node:
+    """
+    One Docker endpoint wallet containers can be placed on.
+
+    Attributes:
+        name (str): The node name stored as a user's placement.
+        engine (DockerEngine): The Engine API client for the endpoint.
+        index (DockerIndex): The node's events-driven container index.
+        weight (float): The node's capacity relative to the others.
+        address (str): The address the app reaches published wallet RPC ports
+            on; published ports are bound to it.
+        max_wallets (int): The most running containers, or 0 for no limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        engine: DockerEngine,
+        weight: float = 1.0,
+        address: str = "127.0.0.1",
+        max_wallets: int = 0,
+    ) -> None:
+        self.name: str = name
+        self.engine: DockerEngine = engine
+        self.index: DockerIndex = DockerIndex()
+        self.weight: float = weight
+        self.address: str = address
+        self.max_wallets: int = max_wallets
+
+    async def headroom(self) -> Optional[float]:
+        """
+        Scores how much room the node has for another wallet: its weighted
+        memory per running container (counting the new one).
+
+        Returns:
+            Optional[float]: The score (higher is emptier), or None if the node
+            is at max_wallets.
+        """
+        info = await self.engine.info()
+        running = int(info.get("ContainersRunning", 0))
+        if self.max_wallets and running >= self.max_wallets:
+            return None
+
+        memory_gib = int(info.get("MemTotal", 0)) / 2**30
+        return self.weight * memory_gib / (running + 1)
+
+
+class Scheduler:
+    """
+    Places new wallets on the node with the most headroom.
+    """
+
+    def __init__(self, nodes: list[Node]) -> None:
+        """
+        Initializes the scheduler.
+
+        Args:
+            nodes (list[Node]): The nodes wallets can be placed on.
+        """
+        self.nodes: list[Node] = nodes
+
+    async def place(self) -> Node:
+        """
+        Picks the node for a new wallet. Unreachable nodes and nodes at their
+        limit are skipped.
+
+        Returns:
+            Node: The chosen node.
+
+        Raises:
+            EngineError: If no node can take another wallet.
+        """
+        if len(self.nodes) == 1:
+            return self.nodes[0]
+
+        scores = await asyncio.gather(
+            *(n.headroom() for n in self.nodes), return_exceptions=True
+        )
+        candidates = [
+            (score, node)
+            for score, node in zip(scores, self.nodes)
+            if isinstance(score, float)
+        ]
+        if not candidates:
+            raise EngineError(503, "No Docker node has room for another wallet")
+
+        node = max(candidates, key=lambda c: c[0])[1]
+        metrics.incr(f"nodes.placed.{node.name}")
+        return node
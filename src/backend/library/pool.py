@@ -0,0 +1,503 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+import asyncio
+from time import time
+from secrets import token_hex
+
+from backend.library.rpc import Wallet
+from backend.library.engine import EngineError, EngineNotFound
+from backend.library.metrics import metrics
+
+if TYPE_CHECKING:
+    from backend.utils.models import User
+    from backend.library.docker import Docker
+
+POOL_DIR = "/pool"
+POOL_RPC_USER = "pool"
+IDLE_KEY = "wallet-pool:idle"
+REFILL_LOCK = "wallet-pool:refill"
+PENDING_KEY = "wallet-pool:pending"
+RETRY_DELAY = 60
+RETRY_BATCH = 100
+READY_ATTEMPTS = 40
+READY_INTERVAL = 0.5
+
+
+def _slot_key(container_id: str) -> str:
+    return f"wallet-pool:slot:{container_id}"
+
+
+class WalletPool:
+    """
+    A warm pool of idle wallet RPC containers for near-instant /connect.
+
+    Pooled containers run nerva-wallet-rpc with --wallet-dir on a private tmpfs
+    and no wallet open. Docker cannot attach a volume to a running container,
+    so claiming one copies the user's wallet files in through the archive API,
+    renames it to rpc_wallet_<user> and opens the wallet; releasing it stores
+    the wallet and copies the cache file back to the user's volume. The cache
+    is also copied back after every relayed transfer, so the tx keys of a
+    send survive a crash. A container whose copy-back fails is kept claimed
+    and running, in a Redis sorted set scored by its next retry, until a
+    retry saves it or its owner reconnects to it.
+
+    The idle list and per-container metadata live in Redis, so every worker
+    claims from the same pool and a refill runs on one worker at a time.
+    """
+
+    def __init__(
+        self, docker: Docker, size: int, refill_rate: int, max_reuse: int
+    ) -> None:
+        """
+        Initializes the pool.
+
+        Args:
+            docker (Docker): The Docker manager that owns the containers.
+            size (int): The number of idle containers to keep running.
+            refill_rate (int): The most containers started per refill tick.
+            max_reuse (int): The sessions a container serves before it is
+                retired instead of returned to the pool.
+        """
+        self.docker = docker
+        self.size: int = size
+        self.refill_rate: int = max(1, refill_rate)
+        self.max_reuse: int = max(1, max_reuse)
+
+    async def refill(self) -> int:
+        """
+        Tops the idle list up towards the target size, starting at most
+        refill_rate containers, and retires any surplus.
+
+        Returns:
+            int: The number of containers added to the pool.
+        """
+        from backend.factory import cache
+
+        lock = cache.redis.lock(REFILL_LOCK, timeout=120, blocking=False)
+        if not await lock.acquire():
+            return 0
+
+        try:
+            idle = int(await cache.redis.llen(IDLE_KEY))  # type: ignore[misc]
+            while idle > self.size:
+                raw = await cache.redis.rpop(IDLE_KEY)  # type: ignore[misc]
+                if raw is None:
+                    break
+                await self.retire(raw.decode())
+                idle -= 1
+
+            wanted = min(self.size - idle, self.refill_rate)
+            started = await asyncio.gather(
+                *(self._spawn() for _ in range(max(0, wanted)))
+            )
+            return sum(started)
+        finally:
+            await lock.release()
+
+    async def claim(self, user: User) -> Optional[str]:
+        """
+        Hands an idle container to a user, with their wallet open in it.
+
+        Args:
+            user (User): The loaded user to claim a container for.
+
+        Returns:
+            Optional[str]: The short ID of the claimed container, or None on a
+            pool miss (the caller falls back to a cold start).
+        """
+        from backend.factory import cache
+
+        while (raw := await cache.redis.lpop(IDLE_KEY)) is not None:  # type: ignore[misc]
+            container_id = str(raw.decode())
+            login = await cache.redis.hget(_slot_key(container_id), "login")  # type: ignore[misc]
+            if not await self.docker.container_exists(container_id):
+                await cache.redis.delete(_slot_key(container_id))
+                continue
+
+            if login is None:
+                await self.retire(container_id)
+                continue
+
+            try:
+                await self._load(container_id, user, login.decode())
+            except Exception as e:
+                print(f"Pool claim failed for {user}: {e}")
+                await self.retire(container_id)
+                continue
+
+            await cache.redis.hset(_slot_key(container_id), "owner", user.username)  # type: ignore[misc]
+            user.wallet_rpc_login = login.decode()
+            await user.save(["wallet_rpc_login"])
+
+            metrics.incr("pool.hit")
+            return container_id
+
+        metrics.incr("pool.miss")
+        return None
+
+    async def release(self, container_id: str) -> bool:
+        """
+        Stores the claimed user's wallet, copies its cache back to their volume
+        and either returns the container to the pool or retires it. If the
+        copy-back fails, the container stays claimed and running, and
+        retry_releases() tries again later.
+
+        Args:
+            container_id (str): The ID of a pooled container, claimed or idle.
+
+        Returns:
+            bool: True if the caller must leave the container running (it was
+            returned to the pool or is kept until its wallet is saved), False
+            if the caller should stop it.
+        """
+        from backend.factory import cache
+
+        slot = await self._slot(container_id)
+        owner = slot.get("owner")
+        if not owner or "login" not in slot:
+            await cache.redis.delete(_slot_key(container_id))
+            return False
+
+        wallet = await self._rpc(container_id, slot["login"], f"rpc_wallet_{owner}")
+        try:
+            await self._save(container_id, owner, wallet)
+            await wallet.close()
+        except Exception as e:
+            print(f"Pool release failed for {owner}, retrying later: {e}")
+            await cache.redis.zadd(PENDING_KEY, {container_id: time() + RETRY_DELAY})
+            metrics.incr("pool.release_failed")
+            return True
+
+        uses = int(await cache.redis.hincrby(_slot_key(container_id), "uses", 1))  # type: ignore[misc]
+        if (
+            uses >= self.max_reuse
+            or int(await cache.redis.llen(IDLE_KEY)) >= self.size  # type: ignore[misc]
+        ):
+            await cache.redis.delete(_slot_key(container_id))
+            return False
+
+        filename = f"{owner}.wallet"
+        try:
+            # Without exec access the files can't be deleted, so blank them
+            # before another user's wallet shares this tmpfs.
+            await self.docker.engine.put_archive(
+                container_id,
+                POOL_DIR,
+                self.docker.empty_archive([filename, f"{filename}.keys"]),
+            )
+            name = f"pool_wallet_{token_hex(6)}"
+            await self.docker.engine.rename_container(container_id, name)
+            self.docker.index.add_container(container_id, name)
+        except EngineError as e:
+            print(f"Pool recycle failed for {owner}: {e}")
+            await cache.redis.delete(_slot_key(container_id))
+            return False
+
+        await cache.redis.hdel(_slot_key(container_id), "owner")  # type: ignore[misc]
+        await cache.redis.rpush(IDLE_KEY, container_id)  # type: ignore[misc]
+        return True
+
+    async def checkpoint(self, container_id: Optional[str]) -> None:
+        """
+        Copies a claimed container's wallet cache back to its owner's volume
+        while the session goes on, e.g. right after a transfer is relayed.
+        Does nothing for a container that is not a claimed pooled one.
+
+        Args:
+            container_id (Optional[str]): The ID of the user's wallet container.
+        """
+        if not container_id:
+            return
+
+        slot = await self._slot(container_id)
+        owner = slot.get("owner")
+        if not owner or "login" not in slot:
+            return
+
+        wallet = await self._rpc(container_id, slot["login"], f"rpc_wallet_{owner}")
+        try:
+            await self._save(container_id, owner, wallet)
+        except Exception as e:
+            # The release at the end of the session copies it back again.
+            print(f"Pool checkpoint failed for {owner}: {e}")
+            metrics.incr("pool.checkpoint_failed")
+
+    async def retry_releases(self) -> int:
+        """
+        Retries the releases whose copy-back failed and are due, stopping each
+        container once its wallet is saved.
+
+        Returns:
+            int: The number of containers released.
+        """
+        from backend.factory import cache
+
+        due = await cache.redis.zrangebyscore(
+            PENDING_KEY, "-inf", time(), start=0, num=RETRY_BATCH
+        )
+
+        released = 0
+        for raw in due:
+            container_id = raw.decode()
+            # ZREM is the claim, as in WalletExpiry.reap: a reconnect taking
+            # the container back at the same time gets it only if it wins.
+            if not await cache.redis.zrem(PENDING_KEY, container_id):
+                continue
+
+            if not await self.docker.container_exists(container_id):
+                await cache.redis.delete(_slot_key(container_id))
+                continue
+
+            if not await self.release(container_id):
+                try:
+                    await self.docker.engine.stop_container(container_id)
+                except EngineNotFound:
+                    pass
+            elif await cache.redis.zscore(PENDING_KEY, container_id) is not None:
+                # Failed again, and rescheduled by release().
+                continue
+            released += 1
+
+        return released
+
+    async def reclaim(self, user: User) -> Optional[str]:
+        """
+        Hands a user back their container whose release is still pending: its
+        wallet is still open, and newer than the copy on their volume.
+
+        Args:
+            user (User): The loaded user reconnecting.
+
+        Returns:
+            Optional[str]: The short ID of the container, or None if the user
+            has no release pending.
+        """
+        from backend.factory import cache
+
+        container_id = await self._pending_of(user.username)
+        if container_id is None or not await cache.redis.zrem(
+            PENDING_KEY, container_id
+        ):
+            return None
+
+        login = (await self._slot(container_id)).get("login")
+        if login is None:
+            await self.retire(container_id)
+            return None
+
+        user.wallet_rpc_login = login
+        await user.save(["wallet_rpc_login"])
+        metrics.incr("pool.reclaimed")
+        return container_id
+
+    async def discard(self, username: str) -> None:
+        """
+        Removes a user's container whose release is still pending, e.g. before
+        their wallet volume is deleted.
+
+        Args:
+            username (str): The username of the container owner.
+        """
+        from backend.factory import cache
+
+        container_id = await self._pending_of(username)
+        if container_id is not None and await cache.redis.zrem(
+            PENDING_KEY, container_id
+        ):
+            await self.retire(container_id)
+
+    async def owner(self, container_id: str) -> Optional[str]:
+        """
+        Returns the user a pooled container is claimed by.
+
+        Args:
+            container_id (str): The ID of the pooled container.
+
+        Returns:
+            Optional[str]: The owning username, or None while idle or mid-claim.
+        """
+        from backend.factory import cache
+
+        owner = await cache.redis.hget(_slot_key(container_id), "owner")  # type: ignore[misc]
+        return str(owner.decode()) if owner is not None else None
+
+    async def is_pending(self, container_id: str) -> bool:
+        """
+        Returns whether a pooled container is kept running until its release
+        can copy the wallet back.
+
+        Args:
+            container_id (str): The ID of the pooled container.
+
+        Returns:
+            bool: True while its release is pending.
+        """
+        from backend.factory import cache
+
+        return await cache.redis.zscore(PENDING_KEY, container_id) is not None
+
+    async def stats(self) -> dict[str, int]:
+        """
+        Returns the pool configuration and current idle count.
+
+        Returns:
+            dict[str, int]: The target size, idle count and reuse limit.
+        """
+        from backend.factory import cache
+
+        return {
+            "size": self.size,
+            "idle": int(await cache.redis.llen(IDLE_KEY)),  # type: ignore[misc]
+            "pending": int(await cache.redis.zcard(PENDING_KEY)),
+            "max_reuse": self.max_reuse,
+        }
+
+    async def _spawn(self) -> int:
+        """
+        Starts one pooled container and adds it to the idle list once its RPC
+        server answers.
+
+        Returns:
+            int: 1 if the container joined the pool, else 0.
+        """
+        from backend.factory import cache
+
+        name = f"pool_wallet_{token_hex(6)}"
+        login = f"{POOL_RPC_USER}:{token_hex(16)}"
+        try:
+            container_id = await self.docker.start_pooled(name, login)
+        except EngineError as e:
+            print(f"Failed to start a pooled wallet container: {e}")
+            return 0
+
+        wallet = await self._rpc(container_id, login, name)
+        for _ in range(READY_ATTEMPTS):
+            if await wallet.responsive():
+                break
+            await asyncio.sleep(READY_INTERVAL)
+        else:
+            await self.retire(container_id)
+            return 0
+
+        await cache.redis.hset(  # type: ignore[misc]
+            _slot_key(container_id), mapping={"login": login, "uses": 0}
+        )
+        await cache.redis.rpush(IDLE_KEY, container_id)  # type: ignore[misc]
+        return 1
+
+    async def _slot(self, container_id: str) -> dict[str, str]:
+        """
+        Returns a pooled container's metadata.
+
+        Args:
+            container_id (str): The ID of the pooled container.
+
+        Returns:
+            dict[str, str]: Its "login", "uses" and, while claimed, "owner".
+        """
+        from backend.factory import cache
+
+        return {
+            k.decode(): v.decode()
+            for k, v in (await cache.redis.hgetall(_slot_key(container_id))).items()  # type: ignore[misc]
+        }
+
+    async def _pending_of(self, username: str) -> Optional[str]:
+        """
+        Returns the container of a user's pending release.
+
+        Args:
+            username (str): The username of the container owner.
+
+        Returns:
+            Optional[str]: The container's short ID, or None if there is none.
+        """
+
+        try:
+            info = await self.docker.engine.inspect_container(
+                f"rpc_wallet_{username}"
+            )
+        except EngineNotFound:
+            return None
+
+        container_id = str(info["Id"])[:12]
+        return container_id if await self.is_pending(container_id) else None
+
+    async def _save(self, container_id: str, owner: str, wallet: Wallet) -> None:
+        """
+        Stores an open wallet and copies its cache file back to the owner's
+        volume.
+
+        Args:
+            container_id (str): The ID of the claimed pooled container.
+            owner (str): The username of the claiming user.
+            wallet (Wallet): The RPC client for the container.
+        """
+        await wallet.store()
+        archive = await self.docker.engine.get_archive(
+            container_id, f"{POOL_DIR}/{owner}.wallet"
+        )
+        await self.docker.write_wallet_files(owner, [archive])
+
+    async def _load(self, container_id: str, user: User, login: str) -> None:
+        """
+        Copies a user's wallet into a pooled container and opens it.
+
+        Args:
+            container_id (str): The ID of the idle pooled container.
+            user (User): The user whose wallet is being loaded.
+            login (str): The container's "user:password" RPC login.
+        """
+        filename = f"{user.username}.wallet"
+        for archive in await self.docker.read_wallet_files(
+            user.username, [filename, f"{filename}.keys"]
+        ):
+            await self.docker.engine.put_archive(container_id, POOL_DIR, archive)
+
+        name = f"rpc_wallet_{user.username}"
+        await self.docker.engine.rename_container(container_id, name)
+        self.docker.index.add_container(container_id, name)
+
+        wallet = await self._rpc(container_id, login, name)
+        await wallet.open(filename, user.wallet_password or "")
+
+    async def _rpc(self, container_id: str, login: str, name: str) -> Wallet:
+        """
+        Builds a Wallet RPC client for a pooled container.
+
+        Args:
+            container_id (str): The ID of the pooled container.
+            login (str): The container's "user:password" RPC login.
+            name (str): The container's current name.
+
+        Returns:
+            Wallet: The RPC client.
+        """
+        username, _, password = login.partition(":")
+        return Wallet(
+            # Pooled containers publish their port on the default node.
+            host=name if self.docker.wallet_network else self.docker.default.address,
+            port=await self.docker.rpc_port(container_id),
+            ssl=False,
+            username=username,
+            password=password,
+        )
+
+    async def retire(self, container_id: str) -> None:
+        """
+        Removes a pooled container and forgets its metadata.
+
+        Args:
+            container_id (str): The ID of the pooled container.
+        """
+        from backend.factory import cache
+
+        await cache.redis.delete(_slot_key(container_id))
+        await cache.redis.zrem(PENDING_KEY, container_id)
+        try:
+            await self.docker.engine.remove_container(container_id)
+        except EngineNotFound:
+            pass
+        self.docker.index.remove_container(container_id)
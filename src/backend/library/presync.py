@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+import asyncio
+from time import time
+from datetime import UTC, datetime
+
+from redis.exceptions import LockError
+
+from backend.utils.models import User
+from backend.library.chain import chain
+from backend.library.engine import EngineError, EngineNotFound
+from backend.library.metrics import metrics
+
+if TYPE_CHECKING:
+    from backend.library.nodes import Node
+    from backend.library.docker import Docker
+
+ACTIVITY_KEY = "wallet-activity"
+PRESYNCED_KEY = "wallet-presynced"
+PRESYNC_LOCK = "wallet-presync"
+# Nerva's target block time, used to estimate how far behind a wallet is.
+BLOCK_TIME = 60
+# Wallets fewer blocks behind than this are left for the next login.
+MIN_BLOCKS = 60
+
+
+class WalletPresync:
+    """
+    Catches idle wallets up with the chain off-peak, so the next /connect only
+    scans the blocks mined since.
+
+    /connect and /keepalive record when each user was last active. During the
+    off-peak hours, users active within active_for seconds whose wallet is not
+    running get a short-lived, low-CPU-priority refresh-only container that
+    scans into the wallet cache on their volume and exits. A run starts at
+    most concurrency of them at once, stops once the estimated blocks to scan
+    reach block_budget, and is skipped while the daemon is itself syncing.
+    """
+
+    def __init__(
+        self,
+        docker: Docker,
+        concurrency: int,
+        block_budget: int,
+        active_for: int,
+        hours: tuple[int, int],
+        timeout: int,
+    ) -> None:
+        """
+        Initializes the pre-sync job.
+
+        Args:
+            docker (Docker): The Docker manager that runs the containers.
+            concurrency (int): The most pre-sync containers running at once;
+                0 disables pre-syncing.
+            block_budget (int): The most blocks (estimated) one run may have
+                wallets scan, bounding the load put on the daemon.
+            active_for (int): Seconds since their last session within which a
+                user is still considered active.
+            hours (tuple[int, int]): The UTC hours [start, end) runs may start
+                in; the range may wrap past midnight.
+            timeout (int): Seconds a pre-sync container may run before it is
+                stopped.
+        """
+        self.docker = docker
+        self.concurrency: int = concurrency
+        self.block_budget: int = block_budget
+        self.active_for: int = active_for
+        self.hours: tuple[int, int] = hours
+        self.timeout: int = timeout
+
+    async def seen(self, username: str) -> None:
+        """
+        Records that a user's wallet session is active.
+
+        Args:
+            username (str): The username of the user.
+        """
+        from backend.factory import cache
+
+        await cache.redis.zadd(ACTIVITY_KEY, {username: time()})
+
+    def off_peak(self) -> bool:
+        """
+        Checks if the current UTC hour is in the pre-sync window.
+
+        Returns:
+            bool: True if a run may start now.
+        """
+        hour = datetime.now(UTC).hour
+        start, end = self.hours
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    async def run(self) -> Optional[int]:
+        """
+        Pre-syncs the idle wallets of recently active users, unless it is
+        outside the off-peak window or another worker is already running.
+
+        Returns:
+            Optional[int]: The number of wallets pre-synced, or None if the run
+            was skipped.
+        """
+        from backend.factory import cache
+
+        if self.concurrency <= 0 or not self.off_peak():
+            return None
+
+        info = await chain.get_info()
+        if info.get("busy_syncing") or not info.get("synchronized", True):
+            metrics.incr("presync.daemon_busy")
+            return None
+
+        lock = cache.redis.lock(
+            PRESYNC_LOCK, timeout=self.timeout + 60, blocking=False
+        )
+        if not await lock.acquire():
+            return None
+
+        try:
+            candidates = await self._candidates()
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def presync(username: str) -> bool:
+                async with semaphore:
+                    try:
+                        return await self._presync_one(username)
+                    finally:
+                        await lock.reacquire()
+
+            results = await asyncio.gather(
+                *(presync(u) for u in candidates), return_exceptions=True
+            )
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass
+
+        for username, result in zip(candidates, results):
+            if isinstance(result, BaseException):
+                print(f"Pre-sync failed for {username}: {result}")
+        synced = sum(1 for r in results if r is True)
+        metrics.incr("presync.synced", synced)
+        return synced
+
+    async def _candidates(self) -> list[str]:
+        """
+        Picks the users to pre-sync this run: the most recently active first,
+        skipping wallets that are barely behind, until the block budget is
+        spent.
+
+        Returns:
+            list[str]: The usernames.
+        """
+        from backend.factory import cache
+
+        now = time()
+        await cache.redis.zremrangebyscore(
+            ACTIVITY_KEY, "-inf", now - self.active_for
+        )
+        active = await cache.redis.zrevrangebyscore(
+            ACTIVITY_KEY, now, now - self.active_for, withscores=True
+        )
+        if not active:
+            return []
+
+        usernames = [raw.decode() for raw, _ in active]
+        synced_at = await cache.redis.zmscore(PRESYNCED_KEY, usernames)
+
+        candidates: list[str] = []
+        spent = 0
+        for username, (_, seen_at), presynced_at in zip(
+            usernames, active, synced_at
+        ):
+            behind = int((now - max(seen_at, presynced_at or 0)) // BLOCK_TIME)
+            if behind < MIN_BLOCKS or spent + behind > self.block_budget:
+                continue
+            candidates.append(username)
+            spent += behind
+        return candidates
+
+    async def _presync_one(self, username: str) -> bool:
+        """
+        Runs one user's pre-sync container to completion, unless their wallet
+        is in use.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            bool: True if a pre-sync ran.
+        """
+        from backend.factory import cache
+
+        try:
+            u = await User.get(username, User.WALLET_FIELDS)
+        except ValueError:
+            return False
+        if not u.wallet_created or not u.wallet_password or u.wallet_container:
+            return False
+
+        # Taken like a /connect would, so the two never open the wallet file
+        # at the same time; a /connect after this stops the pre-sync first.
+        wallet_lock = cache.redis.lock(
+            f"wallet-lock:{username}", timeout=60, blocking=False
+        )
+        if not await wallet_lock.acquire():
+            return False
+        try:
+            for name in (f"rpc_wallet_{username}", f"init_wallet_{username}"):
+                if await self.docker.container_exists(name):
+                    return False
+            node, container_id = await self.docker.start_presync(u)
+        finally:
+            try:
+                await wallet_lock.release()
+            except LockError:
+                pass
+
+        metrics.incr("presync.started")
+        with metrics.timer("presync.run"):
+            await self._wait(node, container_id)
+        await cache.redis.zadd(PRESYNCED_KEY, {username: time()})
+        return True
+
+    async def _wait(self, node: Node, container_id: str) -> None:
+        """
+        Waits for a pre-sync container to exit, stopping it after the timeout.
+
+        Args:
+            node (Node): The node the container runs on.
+            container_id (str): The ID of the container.
+        """
+        try:
+            await node.engine.wait_container(container_id, self.timeout)
+        except EngineNotFound:
+            # It already exited and was removed.
+            return
+        except EngineError:
+            metrics.incr("presync.timeout")
+            try:
+                await node.engine.stop_container(container_id)
+            except EngineNotFound:
+                pass
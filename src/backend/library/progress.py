@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+import re
+import json
+import asyncio
+from time import monotonic
+
+from backend.library.engine import EngineError
+from backend.library.metrics import metrics
+
+if TYPE_CHECKING:
+    from backend.library.docker import Docker
+
+# The lookahead skips a match cut off mid-number at the end of a chunk.
+PROGRESS_PATTERN = re.compile(rb"Height (\d+) / (\d+)(?=\D)")
+PROGRESS_TTL = 120
+PUBLISH_INTERVAL = 0.5
+# Enough trailing bytes to hold a progress line split across two chunks.
+CARRY_BYTES = 64
+
+
+def _progress_key(username: str) -> str:
+    return f"restore-progress:{username}"
+
+
+def _follower_key(username: str) -> str:
+    return f"restore-progress:follower:{username}"
+
+
+class RestoreProgress:
+    """
+    Follows the log of each seed-restore (init_wallet_*) container and
+    publishes its scan progress to Redis.
+
+    One worker holds a follower per restore (claimed with a Redis NX key) and
+    parses the stream incrementally, so /status reads the latest value with a
+    single GET instead of tailing the container log on every poll. Each update
+    is also published on the restore-progress:<username> channel.
+    """
+
+    def __init__(self, docker: Docker) -> None:
+        """
+        Initializes the follower registry.
+
+        Args:
+            docker (Docker): The Docker manager whose engine is followed.
+        """
+        self.docker = docker
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def get(self, username: str) -> Optional[dict[str, int]]:
+        """
+        Returns the latest published progress of a user's restore, starting a
+        follower if no worker is following it yet.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            Optional[dict[str, int]]: The scanned and target block heights, or
+            None when nothing has been published yet.
+        """
+        from backend.factory import cache
+
+        raw = await cache.redis.get(_progress_key(username))
+        await self.watch(username)
+        if raw is None:
+            return None
+        return dict(json.loads(raw))
+
+    async def watch(self, username: str) -> None:
+        """
+        Starts following a user's init container unless a follower (in any
+        worker) already is.
+
+        Args:
+            username (str): The username of the user.
+        """
+        from backend.factory import cache
+
+        if not await cache.redis.set(
+            _follower_key(username), "1", nx=True, ex=PROGRESS_TTL
+        ):
+            return
+
+        task = asyncio.create_task(self._follow(username))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _follow(self, username: str) -> None:
+        """
+        Streams a user's init container log until it exits, publishing the
+        progress at most every PUBLISH_INTERVAL seconds.
+
+        Args:
+            username (str): The username of the user.
+        """
+        from backend.factory import cache
+
+        name = f"init_wallet_{username}"
+        carry = b""
+        published_at = 0.0
+        try:
+            node = await self.docker.node_of(name)
+            async with node.engine.follow_logs(name) as chunks:
+                async for chunk in chunks:
+                    text = carry + chunk
+                    carry = text[-CARRY_BYTES:]
+                    matches = PROGRESS_PATTERN.findall(text)
+                    if not matches:
+                        continue
+
+                    current, total = (int(v) for v in matches[-1])
+                    if total <= 0:
+                        continue
+                    if monotonic() - published_at >= PUBLISH_INTERVAL:
+                        await self._publish(
+                            username,
+                            {"current": min(current, total), "total": total},
+                        )
+                        published_at = monotonic()
+        except EngineError as e:
+            print(f"Restore progress follower failed for {username}: {e}")
+        finally:
+            # The container is gone (or the stream broke, in which case the
+            # next /status poll starts a new follower from the latest line).
+            await cache.redis.delete(
+                _progress_key(username), _follower_key(username)
+            )
+
+    @staticmethod
+    async def _publish(username: str, progress: dict[str, int]) -> None:
+        """
+        Stores and broadcasts a progress update, renewing the follower claim.
+
+        Args:
+            username (str): The username of the user.
+            progress (dict[str, int]): The scanned and target block heights.
+        """
+        from backend.factory import cache
+
+        payload = json.dumps(progress)
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            pipe.set(_progress_key(username), payload, ex=PROGRESS_TTL)
+            pipe.expire(_follower_key(username), PROGRESS_TTL)
+            pipe.publish(_progress_key(username), payload)
+            await pipe.execute()
+        metrics.incr("restore.progress_published")
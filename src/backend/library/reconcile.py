@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+import re
+from datetime import UTC, datetime
+
+from pymongo import UpdateOne
+
+from backend.utils.models import User
+from backend.library.index import CONTAINER_PREFIXES
+from backend.library.engine import EngineNotFound
+from backend.library.metrics import metrics
+from backend.library.sessions import wallet_sessions
+
+if TYPE_CHECKING:
+    from backend.library.nodes import Node
+    from backend.library.docker import Docker
+
+LABEL_OWNER = "nervault.owner"
+LABEL_ROLE = "nervault.role"
+LABEL_CREATED = "nervault.created-at"
+RECONCILE_LOCK = "wallet-reconcile"
+VOLUME_OWNER = re.compile(r"^user_(.+)_wallet$")
+
+
+class Reconciler:
+    """
+    Brings the database and Docker back in line with each other.
+
+    Every container and volume NerVault creates is labelled with its role,
+    owner and creation time, so one cycle costs two filtered container lists
+    (by label, and by name for containers that predate the labels) and one
+    volume list per Docker node, and one projected user query, however many
+    users there are. A node that can't be listed fails the whole cycle,
+    since its containers would otherwise look gone. Drift is fixed in both
+    directions:
+
+    - a user whose wallet_container is gone has their session cleared (one
+      bulk_write for all of them, then their cached snapshots are dropped);
+    - a wallet container its owner's record doesn't point at, an init
+      container whose owner no longer exists, and a leftover carrier are
+      removed, once older than the grace period (so a /connect that has
+      started its container but not yet saved it is left alone).
+
+    Wallet volumes without a registered owner are only reported: they hold
+    wallet keys, so deleting them stays a manual decision.
+    """
+
+    def __init__(self, docker: Docker, grace: int) -> None:
+        """
+        Initializes the reconciler.
+
+        Args:
+            docker (Docker): The Docker manager that owns the resources.
+            grace (int): Seconds a container may exist before it can be
+                treated as an orphan.
+        """
+        self.docker = docker
+        self.grace: int = grace
+
+    async def run(self) -> Optional[dict[str, int]]:
+        """
+        Runs one reconciliation cycle, unless another worker is running one.
+
+        Returns:
+            Optional[dict[str, int]]: The number of stale sessions cleared,
+            orphan containers removed and orphan volumes found, or None if the
+            cycle was skipped.
+        """
+        from backend.factory import cache
+
+        lock = cache.redis.lock(RECONCILE_LOCK, timeout=300, blocking=False)
+        if not await lock.acquire():
+            return None
+
+        try:
+            result = await self._reconcile()
+        finally:
+            await lock.release()
+
+        for name, count in result.items():
+            metrics.incr(f"reconcile.{name}", count)
+        return result
+
+    async def _reconcile(self) -> dict[str, int]:
+        """
+        Diffs the labelled Docker resources against the database and fixes the
+        drift.
+
+        Returns:
+            dict[str, int]: The counts, as returned by run().
+        """
+        # A session saved after this instant may point at a container the
+        # listing below missed, so only older sessions can be cleared.
+        listed_at = datetime.now(UTC)
+        placed: list[tuple[Node, dict[str, Any]]] = []
+        volumes: list[dict[str, Any]] = []
+        # Containers started before the labels existed are only found by name;
+        # they still count as live, so their sessions are not cleared.
+        named: list[dict[str, Any]] = []
+        for node in self.docker.nodes.values():
+            listed = await node.engine.list_containers({"label": [LABEL_ROLE]})
+            placed.extend((node, c) for c in listed)
+            named.extend(
+                await node.engine.list_containers({"name": list(CONTAINER_PREFIXES)})
+            )
+            volumes.extend(await node.engine.list_volumes({"name": ["_wallet"]}))
+        containers = [c for _, c in placed]
+
+        volume_owners: set[str] = set()
+        for v in volumes:
+            match = VOLUME_OWNER.match(v["Name"])
+            if match:
+                volume_owners.add(match.group(1))
+
+        owners = {o for c in containers if (o := self._owner(c)) is not None}
+        users: dict[str, Optional[str]] = {
+            u["username"]: u.get("wallet_container")
+            async for u in User.get_wallet_state(sorted(volume_owners | owners))
+        }
+
+        live = {c["Id"][:12] for c in containers + named}
+        stale = [
+            UpdateOne(
+                {
+                    "username": username,
+                    "wallet_container": container_id,
+                    "$or": [
+                        {"wallet_started_at": {"$lt": listed_at}},
+                        {"wallet_started_at": None},
+                    ],
+                },
+                {"$set": User.CLEARED_SESSION},
+            )
+            for username, container_id in users.items()
+            if container_id and container_id[:12] not in live
+        ]
+        cleared = 0
+        if stale:
+            cleared = (
+                await User.collection.bulk_write(stale, ordered=False)
+            ).modified_count
+            for username, container_id in users.items():
+                if container_id and container_id[:12] not in live:
+                    await wallet_sessions.end(username, container_id)
+                    await User.invalidate_snapshot(username)
+
+        # A hibernated container belongs to no session but is kept on purpose.
+        hibernated = await self.docker.hibernation.containers()
+        removed = 0
+        for node, c in placed:
+            if c["Id"][:12] in hibernated:
+                continue
+            if await self._is_orphan(c, users) and await self._remove(node, c):
+                removed += 1
+
+        orphan_volumes = sorted(volume_owners - users.keys())
+        for owner in orphan_volumes:
+            print(f"Found wallet volume with no registered owner: {owner}")
+
+        return {
+            "stale_sessions": cleared,
+            "orphan_containers": removed,
+            "orphan_volumes": len(orphan_volumes),
+        }
+
+    @staticmethod
+    def _owner(container: dict[str, Any]) -> Optional[str]:
+        """
+        Returns the user a container belongs to. Pooled containers carry no
+        owner label, so a claimed one is attributed by its rpc_wallet_ name.
+
+        Args:
+            container (dict[str, Any]): An Engine API container summary.
+
+        Returns:
+            Optional[str]: The owning username, or None.
+        """
+        labels = container.get("Labels") or {}
+        if labels.get(LABEL_OWNER):
+            return str(labels[LABEL_OWNER])
+
+        for name in container.get("Names") or []:
+            if name.startswith("/rpc_wallet_"):
+                return str(name.removeprefix("/rpc_wallet_"))
+        return None
+
+    async def _is_orphan(
+        self, container: dict[str, Any], users: dict[str, Optional[str]]
+    ) -> bool:
+        """
+        Checks if a labelled container has outlived any claim to it.
+
+        Args:
+            container (dict[str, Any]): An Engine API container summary.
+            users (dict[str, Optional[str]]): Username to wallet_container.
+
+        Returns:
+            bool: True if the container should be removed.
+        """
+        labels = container.get("Labels") or {}
+        try:
+            created = datetime.fromisoformat(labels.get(LABEL_CREATED, ""))
+        except ValueError:
+            return False
+        if (datetime.now(UTC) - created).total_seconds() < self.grace:
+            return False
+
+        role = labels.get(LABEL_ROLE)
+        owner = self._owner(container)
+        if role == "carrier":
+            return True
+        if role in ("init", "presync"):
+            return owner not in users
+        if owner is None:
+            # An idle pooled container: the pool manages those.
+            return False
+        if role == "pool" and self.docker.pool is not None:
+            # A pooled container is renamed before the claim is saved; until
+            # the pool records the owner, the claim is still in progress.
+            if await self.docker.pool.owner(container["Id"][:12]) != owner:
+                return False
+            # It still holds the only copy of its wallet's latest cache.
+            if await self.docker.pool.is_pending(container["Id"][:12]):
+                return False
+
+        assigned = users.get(owner)
+        return not assigned or assigned[:12] != container["Id"][:12]
+
+    async def _remove(self, node: Node, container: dict[str, Any]) -> bool:
+        """
+        Removes an orphaned container.
+
+        Args:
+            node (Node): The node the container runs on.
+            container (dict[str, Any]): An Engine API container summary.
+
+        Returns:
+            bool: True if it was removed.
+        """
+        container_id = container["Id"][:12]
+        labels = container.get("Labels") or {}
+        print(f"Found orphaned {labels.get(LABEL_ROLE)} container {container_id}")
+        try:
+            if labels.get(LABEL_ROLE) == "pool" and self.docker.pool is not None:
+                await self.docker.pool.retire(container_id)
+            else:
+                await node.engine.remove_container(container_id)
+        except EngineNotFound:
+            return False
+        node.index.remove_container(container_id)
+        return True
@@ -1,10 +1,51 @@
-from typing import Any, Dict, Tuple, Optional
+from typing import Any, Dict, Tuple, Optional, Awaitable, cast
 
+import asyncio
+from copy import copy
 from json import JSONDecodeError
 
-from httpx import HTTPError
+from httpx import Limits, HTTPError, AsyncClient
 from nerva import WalletRPC
 
+from backend.library.address import decode_address, integrated_address
+
+
+class PersistentWalletRPC(WalletRPC):  # type: ignore[misc]
+    """
+    A WalletRPC that sends every call over one keep-alive HTTP client, so the
+    TCP connection and the digest-auth challenge (which httpx.DigestAuth keeps
+    after the first 401) are reused instead of negotiated again per call.
+
+    Attributes:
+        client (AsyncClient): The HTTP client holding the connection.
+    """
+
+    __slots__ = ["client"]
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.client: AsyncClient = AsyncClient(
+            auth=self.auth,
+            headers=self.headers,
+            limits=Limits(max_connections=4, max_keepalive_connections=2),
+        )
+
+    async def _request(
+        self, *, method: str, params: dict[str, Any]
+    ) -> dict[str, Any]:
+        response = await self.client.post(
+            f"{self.url}/json_rpc",
+            json={"jsonrpc": "2.0", "id": 0, "method": method, "params": params},
+            timeout=self.timeout,
+        )
+        return cast(dict[str, Any], response.json())
+
+    async def aclose(self) -> None:
+        """
+        Closes the client's connections.
+        """
+        await self.client.aclose()
+
 
 class Wallet:
     """
@@ -18,8 +59,23 @@ class Wallet:
         rpc (WalletRPC): An instance of the WalletRPC client to communicate with the wallet.
     """
 
-    def __init__(self, **kwargs: Any) -> None:
-        self.rpc: WalletRPC = WalletRPC(**kwargs)
+    def __init__(self, rpc: Optional[WalletRPC] = None, **kwargs: Any) -> None:
+        self.rpc: WalletRPC = rpc or WalletRPC(**kwargs)
+
+    def with_timeout(self, timeout: float) -> "Wallet":
+        """
+        Returns a wallet sharing this one's RPC client (and so its connection)
+        with a different per-call timeout.
+
+        Args:
+            timeout (float): The per-call timeout, in seconds.
+
+        Returns:
+            Wallet: The wallet.
+        """
+        rpc = copy(self.rpc)
+        rpc.timeout = timeout
+        return Wallet(rpc=rpc)
 
     @property
     async def connected(self) -> bool:
@@ -46,6 +102,102 @@ class Wallet:
         """
         return await self.rpc.get_height()  # type: ignore[no-any-return]
 
+    async def responsive(self) -> bool:
+        """
+        Checks if the wallet RPC server is answering, with or without an open
+        wallet (e.g. a pooled container started with --wallet-dir).
+
+        Returns:
+            bool: True if the RPC server answered, False otherwise.
+        """
+        try:
+            return "version" in (await self.rpc.get_version())["result"]
+
+        except (HTTPError, JSONDecodeError, KeyError):
+            return False
+
+    async def open(self, filename: str, password: str) -> None:
+        """
+        Opens a wallet file from the RPC server's --wallet-dir.
+
+        Args:
+            filename (str): The wallet file name, relative to the wallet dir.
+            password (str): The wallet password.
+
+        Raises:
+            RuntimeError: If the RPC server refused to open the wallet.
+        """
+        res = await self.rpc.open_wallet(filename=filename, password=password)
+        if "error" in res:
+            raise RuntimeError(res["error"].get("message", "open_wallet failed"))
+
+    async def store(self) -> None:
+        """
+        Saves the open wallet's cache to disk.
+        """
+        await self.rpc.store()
+
+    async def close(self) -> None:
+        """
+        Saves and closes the open wallet, leaving the RPC server running.
+        """
+        await self.rpc.close_wallet()
+
+    @staticmethod
+    async def gather(
+        calls: Dict[str, Awaitable[Any]],
+        deadline: float,
+        deadlines: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Runs independent calls concurrently, each bounded by its own deadline,
+        so a batch takes about as long as its slowest call rather than the sum
+        of all of them.
+
+        Args:
+            calls (Dict[str, Awaitable[Any]]): The calls, by name.
+            deadline (float): Seconds each call may take.
+            deadlines (Optional[Dict[str, float]]): Per-call overrides of
+                deadline, e.g. shorter ones for non-critical calls.
+
+        Returns:
+            Dict[str, Any]: Each call's result by name, or the exception it
+            raised (asyncio.TimeoutError when it ran out of time).
+        """
+        limits = deadlines or {}
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(call, limits.get(name, deadline))
+                for name, call in calls.items()
+            ),
+            return_exceptions=True,
+        )
+        return dict(zip(calls, results))
+
+    async def keys(self) -> Dict[str, str]:
+        """
+        Fetches the mnemonic seed and the four wallet keys concurrently.
+
+        Returns:
+            Dict[str, str]: The mnemonic_seed, public_spend_key,
+            secret_spend_key, public_view_key and secret_view_key.
+        """
+        names = (
+            "mnemonic_seed",
+            "public_spend_key",
+            "secret_spend_key",
+            "public_view_key",
+            "secret_view_key",
+        )
+        values = await asyncio.gather(
+            self.seed(),
+            self.public_spend_key(),
+            self.secret_spend_key(),
+            self.public_view_key(),
+            self.secret_view_key(),
+        )
+        return dict(zip(names, values))
+
     async def public_spend_key(self) -> str:
         """
         Fetches the public spend key.
@@ -117,65 +269,6 @@ class Wallet:
         )["result"]
         return res["address_index"], res["address"]
 
-    async def integrated_address(self, address: str, payment_id: str) -> str:
-        """
-        Creates an integrated address using the provided payment ID.
-
-        Args:
-            address (str): The base address.
-            payment_id (str): The payment ID.
-
-        Returns:
-            str: The integrated address.
-        """
-        return (  # type: ignore[no-any-return]
-            await self.rpc.make_integrated_address(
-                payment_id=payment_id, standard_address=address
-            )
-        )["result"]["integrated_address"]
-
-    async def make_integrated_address(self, payment_id: str = "") -> Dict[str, Any]:
-        """
-        Builds an integrated address for this wallet's own address.
-
-        Args:
-            payment_id (str): The 16-hex payment ID to embed. An empty string
-                makes the wallet generate a random one.
-
-        Returns:
-            Dict[str, Any]: The result, including the integrated_address and the
-            (possibly generated) payment_id.
-        """
-        return (  # type: ignore[no-any-return]
-            await self.rpc.make_integrated_address(payment_id=payment_id)
-        )["result"]
-
-    async def validate_address(self, address: str) -> bool:
-        """
-        Validates a given address.
-
-        Args:
-            address (str): The address to validate.
-
-        Returns:
-            bool: True if valid, False otherwise.
-        """
-        return (await self.rpc.validate_address(address=address))["result"]["valid"]  # type: ignore[no-any-return]
-
-    async def is_integrated(self, address: str) -> bool:
-        """
-        Checks if an address is an integrated address.
-
-        Args:
-            address (str): The address to check.
-
-        Returns:
-            bool: True if integrated, False otherwise.
-        """
-        return (await self.rpc.validate_address(address=address))["result"][  # type: ignore[no-any-return]
-            "integrated"
-        ]
-
     async def get_address(self, account_index: int = 0) -> str:
         """
         Gets the main address for an account index.
@@ -203,12 +296,17 @@ class Wallet:
         res = (await self.rpc.get_balance(account_index=account_index))["result"]
         return res["balance"], res["unlocked_balance"]
 
-    async def get_transfers(self, account_index: int = 0) -> Dict[str, Any]:
+    async def get_transfers(
+        self, account_index: int = 0, min_height: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Fetches all transfers for an account.
+        Fetches the transfers for an account.
 
         Args:
             account_index (int, optional): The account index. Defaults to 0.
+            min_height (Optional[int], optional): Only return confirmed
+                transfers above this height; the pending, pool and failed
+                buckets are always complete. Defaults to None (everything).
 
         Returns:
             Dict[str, Any]: The transfer details.
@@ -221,6 +319,8 @@ class Wallet:
                 pending=True,
                 failed=True,
                 pool=True,
+                filter_by_height=min_height is not None,
+                min_height=min_height,
             )
         )["result"]
 
@@ -248,8 +348,8 @@ class Wallet:
         Returns:
             Dict[str, Any]: {"amount": int, "fee": int, "metadata": list[str]}.
         """
-        if payment_id and not await self.is_integrated(dest_address):
-            dest_address = await self.integrated_address(dest_address, payment_id)
+        if payment_id and not decode_address(dest_address).integrated:
+            dest_address = integrated_address(dest_address, payment_id)
 
         if sweep:
             res = (
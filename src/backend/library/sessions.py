@@ -0,0 +1,145 @@
+from typing import Any, Optional
+
+from time import time
+from datetime import UTC, datetime
+
+from backend import config
+from backend.library.metrics import metrics
+
+# Seconds a session hash outlives the session, so the expiry schedule, which
+# reaps a session at its expiry, still finds it after a late reaper tick.
+SESSION_GRACE = 300
+
+# Deletes a session hash, unless it names a container other than ARGV[1].
+END_SCRIPT = """
+local container = redis.call("HGET", KEYS[1], "container")
+if ARGV[1] ~= "" and container and container ~= ARGV[1] then
+    return 0
+end
+return redis.call("DEL", KEYS[1])
+"""
+
+
+def _key(username: str) -> str:
+    return f"wallet-session:{username}"
+
+
+class WalletSessions:
+    """
+    The live state of wallet sessions (container, RPC port and connected
+    flag), kept in a Redis hash per user that expires with the session rather
+    than in the users collection.
+
+    /connect writes the hash, a /keepalive is a single EXPIRE, and when a
+    session was last kept alive is read back from the hash's TTL, so keeping a
+    session alive never writes to Mongo. The users collection still records
+    each session as it was at /connect, which the reaper, the reconciler and
+    startup scheduling read, and which stands in for a missing hash (a session
+    started before this store, or a Redis that lost its data).
+    """
+
+    def __init__(self, lifetime: int) -> None:
+        """
+        Initializes the store.
+
+        Args:
+            lifetime (int): The wallet session lifetime, in seconds.
+        """
+        self.lifetime: int = lifetime
+        self.ttl: int = lifetime + SESSION_GRACE
+
+    async def get(self, username: str) -> Optional[dict[str, Any]]:
+        """
+        Returns a user's live session.
+
+        Args:
+            username (str): The username of the session owner.
+
+        Returns:
+            Optional[dict[str, Any]]: The User session fields (wallet_connected,
+            wallet_port, wallet_container and wallet_started_at), or None if
+            there is no live session in Redis.
+        """
+        from backend.factory import cache
+
+        async with cache.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(_key(username))
+            pipe.pttl(_key(username))
+            session, pttl = await pipe.execute()
+
+        if not session or pttl < 0:
+            metrics.incr("sessions.miss")
+            return None
+
+        metrics.incr("sessions.hit")
+        port = session.get(b"port")
+        started = time() - (self.ttl - pttl / 1000)
+        return {
+            "wallet_connected": session.get(b"connected") == b"1",
+            "wallet_port": int(port) if port else None,
+            "wallet_container": session.get(b"container", b"").decode() or None,
+            "wallet_started_at": datetime.fromtimestamp(started, UTC),
+        }
+
+    async def start(
+        self, username: str, container_id: str, port: Optional[int], connected: bool
+    ) -> None:
+        """
+        Records a new live session, replacing any previous one.
+
+        Args:
+            username (str): The username of the session owner.
+            container_id (str): The wallet RPC container.
+            port (Optional[int]): The container's RPC port.
+            connected (bool): Whether the container was found running.
+        """
+        from backend.factory import cache
+
+        async with cache.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(_key(username))
+            pipe.hset(
+                _key(username),
+                mapping={
+                    "container": container_id,
+                    "port": port or "",
+                    "connected": int(connected),
+                },
+            )
+            pipe.expire(_key(username), self.ttl)
+            await pipe.execute()
+
+    async def touch(self, username: str) -> bool:
+        """
+        Extends a live session by a full lifetime.
+
+        Args:
+            username (str): The username of the session owner.
+
+        Returns:
+            bool: False if there is no live session in Redis to extend.
+        """
+        from backend.factory import cache
+
+        return bool(await cache.redis.expire(_key(username), self.ttl))
+
+    async def end(
+        self, username: str, expected_container: Optional[str] = None
+    ) -> None:
+        """
+        Forgets a user's live session.
+
+        Args:
+            username (str): The username of the session owner.
+            expected_container (Optional[str]): When set, the session is only
+                forgotten if it is still for this container.
+        """
+        from backend.factory import cache
+
+        await cache.redis.eval(  # type: ignore[misc]
+            END_SCRIPT, 1, _key(username), expected_container or ""
+        )
+
+
+wallet_sessions = WalletSessions(
+    lifetime=getattr(config, "PERMANENT_SESSION_LIFETIME", 3600),
+)
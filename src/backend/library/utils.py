@@ -1,6 +1,3 @@
-from typing import Any, Dict
-
-from time import time
 from decimal import Decimal
 
 from quart import request
@@ -67,69 +64,3 @@ def from_atomic(amount: int) -> Decimal:
         Decimal: The amount in Decimal form.
     """
     return (Decimal(amount) * PICO_XNV).quantize(PICO_XNV)
-
-
-def sort_transactions(transactions: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-    """
-    Sorts transactions by timestamp and computes the running total of amounts,
-    distinguishing between incoming and outgoing transactions.
-
-    Args:
-        transactions (dict): A dictionary where the keys are transaction types ('in' or 'out')
-                              and the values are lists of transaction data dictionaries.
-
-    Returns:
-        dict: A sorted dictionary of transactions with running totals. Each entry contains
-              transaction details along with the cumulative total at that point in time.
-    """
-    total = 0
-    txs: Dict[str, Dict[str, Any]] = {}
-    sorted_txs: Dict[str, Dict[str, Any]] = {}
-
-    now = time()
-    live_txids = {
-        t["txid"]
-        for tx_type, entries in transactions.items()
-        if tx_type != "failed"
-        for t in entries
-    }
-
-    for tx_type in transactions:
-        for t in transactions[tx_type]:
-            entry_type = tx_type
-            if tx_type == "failed":
-                # A "failed" tx that also lives in another bucket (or is still
-                # inside the grace window) is the wallet2 race, not a failure.
-                if t["txid"] in live_txids:
-                    continue
-                if now - t["timestamp"] < FAILED_GRACE_SECONDS:
-                    entry_type = "pending"
-            # Key by txid AND type: one txid can appear in multiple buckets
-            # (e.g. a self-send in both "in" and "out"); a bare-txid key would
-            # silently drop one leg from the history.
-            txs[f"{t['txid']}:{entry_type}"] = {
-                "txid": t["txid"],
-                "type": entry_type,
-                "amount": t["amount"],
-                "timestamp": t["timestamp"],
-                "fee": t["fee"],
-            }
-
-    for tx_id, tx_data in sorted(
-        txs.items(), key=lambda x: (x[1]["timestamp"], x[0])
-    ):
-        if tx_data["type"] == "in":
-            total += tx_data["amount"]
-        elif tx_data["type"] == "out":
-            total -= tx_data["amount"]
-            total -= tx_data["fee"]
-
-        sorted_txs[tx_id] = {
-            "txid": tx_data["txid"],
-            "type": tx_data["type"],
-            "amount": str(tx_data["amount"]),
-            "timestamp": tx_data["timestamp"],
-            "total": str(total),
-        }
-
-    return sorted_txs
@@ -0,0 +1,34 @@
+from aiohttp import web
+
+from backend import config
+from backend.proxy.store import BlockStore
+from backend.proxy.server import DaemonProxy
+
+
+def main() -> None:
+    """
+    Runs the caching daemon proxy against the configured Nerva daemon.
+    """
+    upstream = (
+        f"{'https' if config.DAEMON_SSL else 'http'}://"
+        f"{config.DAEMON_HOST}:{config.DAEMON_PORT}"
+    )
+    login = (
+        (config.DAEMON_USERNAME, config.DAEMON_PASSWORD)
+        if config.DAEMON_USERNAME
+        else None
+    )
+    store = BlockStore(
+        getattr(config, "DAEMON_PROXY_CACHE_DIR", "/var/cache/nervault/blocks"),
+        getattr(config, "DAEMON_PROXY_CACHE_MB", 2048) * 1024 * 1024,
+    )
+    proxy = DaemonProxy(upstream, login, store)
+    web.run_app(
+        proxy.app(),
+        host=getattr(config, "DAEMON_PROXY_BIND", "0.0.0.0"),
+        port=getattr(config, "DAEMON_PROXY_PORT", 17566),
+    )
+
+
+if __name__ == "__main__":
+    main()
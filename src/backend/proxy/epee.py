@@ -0,0 +1,115 @@
+from typing import Any
+
+import struct
+
+SIGNATURE = b"\x01\x11\x01\x01\x01\x01\x02\x01"
+VERSION = 1
+
+ARRAY_FLAG = 0x80
+SERIALIZE_TYPE_STRING = 10
+SERIALIZE_TYPE_BOOL = 11
+SERIALIZE_TYPE_OBJECT = 12
+SERIALIZE_TYPE_ARRAY = 13
+
+# Fixed-width scalar types and their struct formats.
+SCALARS: dict[int, str] = {
+    1: "<q",  # int64
+    2: "<i",  # int32
+    3: "<h",  # int16
+    4: "<b",  # int8
+    5: "<Q",  # uint64
+    6: "<I",  # uint32
+    7: "<H",  # uint16
+    8: "<B",  # uint8
+    9: "<d",  # double
+}
+
+
+class EpeeError(ValueError):
+    """A malformed epee portable-storage payload."""
+
+
+class Reader:
+    """
+    A decoder for epee portable storage, the binary format of the daemon's
+    .bin RPC endpoints (e.g. /getblocks.bin).
+
+    Strings decode to bytes, objects to dicts and arrays to lists; the proxy
+    only reads a few top-level fields, so there is no encoder.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.data: bytes = data
+        self.offset: int = 0
+
+    def loads(self) -> dict[str, Any]:
+        """
+        Decodes the whole payload.
+
+        Returns:
+            dict[str, Any]: The root section.
+
+        Raises:
+            EpeeError: If the payload is not valid portable storage.
+        """
+        if self._take(len(SIGNATURE)) != SIGNATURE or self._take(1)[0] != VERSION:
+            raise EpeeError("Not an epee portable-storage payload")
+        return self._section()
+
+    def _take(self, size: int) -> bytes:
+        end = self.offset + size
+        if end > len(self.data):
+            raise EpeeError("Truncated payload")
+        chunk = self.data[self.offset : end]
+        self.offset = end
+        return chunk
+
+    def _varint(self) -> int:
+        if self.offset >= len(self.data):
+            raise EpeeError("Truncated payload")
+        # The low two bits of the first byte give the width: 1, 2, 4 or 8.
+        size = 1 << (self.data[self.offset] & 0x03)
+        return int.from_bytes(self._take(size), "little") >> 2
+
+    def _section(self) -> dict[str, Any]:
+        section: dict[str, Any] = {}
+        for _ in range(self._varint()):
+            name = self._take(self._take(1)[0]).decode("utf-8", errors="replace")
+            section[name] = self._value(self._take(1)[0])
+        return section
+
+    def _value(self, kind: int) -> Any:
+        if kind & ARRAY_FLAG:
+            item = kind & ~ARRAY_FLAG
+            return [self._item(item) for _ in range(self._varint())]
+        return self._item(kind)
+
+    def _item(self, kind: int) -> Any:
+        if kind in SCALARS:
+            fmt = SCALARS[kind]
+            return struct.unpack(fmt, self._take(struct.calcsize(fmt)))[0]
+        if kind == SERIALIZE_TYPE_STRING:
+            return self._take(self._varint())
+        if kind == SERIALIZE_TYPE_BOOL:
+            return self._take(1) != b"\x00"
+        if kind == SERIALIZE_TYPE_OBJECT:
+            return self._section()
+        if kind == SERIALIZE_TYPE_ARRAY:
+            return self._value(self._take(1)[0])
+        raise EpeeError(f"Unknown epee type {kind}")
+
+
+def loads(data: bytes) -> dict[str, Any]:
+    """
+    Decodes an epee portable-storage payload.
+
+    Args:
+        data (bytes): The payload.
+
+    Returns:
+        dict[str, Any]: The root section.
+
+    Raises:
+        EpeeError: If the payload is not valid portable storage.
+    """
+    return Reader(data).loads()
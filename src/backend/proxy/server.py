@@ -0,0 +1,321 @@
+from typing import Any, Callable, Optional, Awaitable
+
+import json
+import time
+import asyncio
+from hashlib import sha256
+
+from aiohttp import (
+    ClientError,
+    ClientSession,
+    ClientTimeout,
+    DigestAuthMiddleware,
+    web,
+)
+
+from backend.proxy import epee
+from backend.proxy.store import BlockStore
+from backend.library.metrics import metrics
+
+# (status, body, content type) of an upstream response.
+Upstream = tuple[int, bytes, str]
+
+# Endpoints whose answers only change with the chain tip (or not at all).
+TIP_PATHS = ("/get_o_indexes.bin",)
+TIP_METHODS = (
+    "get_version",
+    "get_block_count",
+    "get_last_block_header",
+    "get_fee_estimate",
+    "get_hard_fork_info",
+)
+# Endpoints that also move with the transaction pool: cached for a few seconds.
+SHORT_PATHS = (
+    "/get_info",
+    "/getinfo",
+    "/getheight",
+    "/get_transaction_pool_hashes.bin",
+    "/get_transaction_pool_hashes",
+    "/get_transaction_pool",
+)
+SHORT_METHODS = ("get_info",)
+
+
+class DaemonProxy:
+    """
+    A caching HTTP proxy in front of nervad, shared by every wallet container.
+
+    Identical concurrent requests share one upstream call, and answers are
+    reused across wallets:
+
+    - /getblocks.bin responses that end at least reorg_depth blocks below the
+      tip can't change, so they go to the bounded on-disk BlockStore and are
+      served to every later restore that asks for the same range;
+    - tip-dependent answers (the last getblocks batch, output indexes,
+      get_version, fee estimates...) are kept in memory until the tip moves;
+    - get_info and the pool endpoints are kept for short_ttl seconds;
+    - anything else (e.g. /sendrawtransaction) is passed straight through.
+
+    The proxy holds the daemon login itself, so wallets reach it with no
+    credentials; it must only listen on the internal network.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        login: Optional[tuple[str, str]],
+        store: BlockStore,
+        reorg_depth: int = 10,
+        tip_interval: float = 5.0,
+        short_ttl: float = 2.0,
+    ) -> None:
+        """
+        Initializes the proxy.
+
+        Args:
+            upstream (str): The daemon's base URL, e.g. "http://nervad:17566".
+            login (Optional[tuple[str, str]]): The daemon RPC login, if any.
+            store (BlockStore): The on-disk cache for settled block ranges.
+            reorg_depth (int, optional): How far below the tip a block range
+                must end to be cached for good. Defaults to 10.
+            tip_interval (float, optional): Seconds between tip polls.
+                Defaults to 5.
+            short_ttl (float, optional): Seconds get_info and pool answers are
+                reused. Defaults to 2.
+        """
+        self.upstream: str = upstream.rstrip("/")
+        self.login = login
+        self.store: BlockStore = store
+        self.reorg_depth: int = reorg_depth
+        self.tip_interval: float = tip_interval
+        self.short_ttl: float = short_ttl
+
+        self.tip: tuple[int, str] = (0, "")
+        # key -> (tip it was fetched at, or None; expiry time; response)
+        self.recent: dict[
+            str, tuple[Optional[tuple[int, str]], float, Upstream]
+        ] = {}
+        self.inflight: dict[str, asyncio.Future[Upstream]] = {}
+        self._session: Optional[ClientSession] = None
+        self._watcher: Optional[asyncio.Task[None]] = None
+
+    def app(self) -> web.Application:
+        """
+        Builds the aiohttp application serving the proxy.
+
+        Returns:
+            web.Application: The application.
+        """
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_get("/_proxy/stats", self._stats)
+        app.router.add_route("*", "/{path:.*}", self._handle)
+        app.on_startup.append(self._start)
+        app.on_cleanup.append(self._stop)
+        return app
+
+    async def _start(self, _: web.Application) -> None:
+        middlewares = (DigestAuthMiddleware(*self.login),) if self.login else ()
+        self._session = ClientSession(
+            middlewares=middlewares, timeout=ClientTimeout(total=300)
+        )
+        self._watcher = asyncio.create_task(self._watch_tip())
+
+    async def _stop(self, _: web.Application) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+    async def _stats(self, _: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                **metrics.snapshot(),
+                "tip": self.tip[0],
+                "disk_entries": len(self.store.entries),
+                "disk_bytes": self.store.size,
+            }
+        )
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        path = request.path
+        body = await request.read()
+
+        if request.method == "POST" and path == "/getblocks.bin":
+            res = await self._blocks(path, body)
+        elif request.method == "POST" and path == "/json_rpc":
+            return await self._json_rpc(path, body)
+        elif path in TIP_PATHS or path in SHORT_PATHS:
+            key = sha256(path.encode() + b"\0" + body).hexdigest()
+            res = await self._cached(key, path in TIP_PATHS, path, body)
+        else:
+            metrics.incr("proxy.passthrough")
+            res = await self._fetch(path, body, request)
+
+        status, data, content_type = res
+        return web.Response(status=status, body=data, content_type=content_type)
+
+    async def _json_rpc(self, path: str, body: bytes) -> web.Response:
+        try:
+            req = json.loads(body)
+            method = req["method"]
+        except (ValueError, KeyError, TypeError):
+            method = None
+
+        if method not in TIP_METHODS and method not in SHORT_METHODS:
+            metrics.incr("proxy.passthrough")
+            status, data, content_type = await self._fetch(path, body)
+            return web.Response(status=status, body=data, content_type=content_type)
+
+        # Clients number their calls differently, so cache on method and
+        # params and answer with the caller's own id.
+        key = sha256(
+            json.dumps([method, req.get("params")], sort_keys=True).encode()
+        ).hexdigest()
+        status, data, _ = await self._cached(key, method in TIP_METHODS, path, body)
+        try:
+            res = json.loads(data)
+            res["id"] = req.get("id")
+        except (ValueError, TypeError):
+            return web.Response(status=status, body=data)
+        return web.json_response(res, status=status)
+
+    async def _blocks(self, path: str, body: bytes) -> Upstream:
+        key = sha256(path.encode() + b"\0" + body).hexdigest()
+        data = await self.store.get(key)
+        if data is not None:
+            metrics.incr("proxy.disk_hit")
+            return 200, data, "application/octet-stream"
+
+        async def fetch() -> Upstream:
+            res = await self._fetch(path, body)
+            if res[0] == 200 and await asyncio.to_thread(self._settled, res[1]):
+                await self.store.put(key, res[1])
+            elif res[0] == 200:
+                self.recent[key] = (self.tip, time.monotonic() + 60, res)
+            return res
+
+        recent = self._recent(key, tip_bound=True)
+        if recent is not None:
+            return recent
+        return await self._shared(key, fetch)
+
+    def _settled(self, data: bytes) -> bool:
+        """
+        Checks if a /getblocks.bin response covers only blocks deep enough
+        below the tip that a reorg can't change them.
+
+        Args:
+            data (bytes): The epee-encoded response.
+
+        Returns:
+            bool: True if the response can be cached for good.
+        """
+        try:
+            res = epee.loads(data)
+        except epee.EpeeError:
+            return False
+
+        if res.get("status") != b"OK" or res.get("added_pool_txs"):
+            return False
+        blocks = len(res.get("blocks") or [])
+        end = int(res.get("start_height", 0)) + blocks
+        return blocks > 0 and end + self.reorg_depth <= int(
+            res.get("current_height", 0)
+        )
+
+    async def _cached(
+        self, key: str, tip_bound: bool, path: str, body: bytes
+    ) -> Upstream:
+        recent = self._recent(key, tip_bound)
+        if recent is not None:
+            return recent
+
+        async def fetch() -> Upstream:
+            res = await self._fetch(path, body)
+            if res[0] == 200:
+                # Tip-bound entries are also capped at a minute, in case the
+                # tip watcher stalls.
+                ttl = 60 if tip_bound else self.short_ttl
+                tip = self.tip if tip_bound else None
+                self.recent[key] = (tip, time.monotonic() + ttl, res)
+            return res
+
+        return await self._shared(key, fetch)
+
+    def _recent(self, key: str, tip_bound: bool) -> Optional[Upstream]:
+        entry = self.recent.get(key)
+        if entry is None:
+            metrics.incr("proxy.miss")
+            return None
+
+        tip, expires, res = entry
+        if time.monotonic() > expires or (tip_bound and tip != self.tip):
+            del self.recent[key]
+            metrics.incr("proxy.miss")
+            return None
+
+        metrics.incr("proxy.hit")
+        return res
+
+    async def _shared(
+        self, key: str, fetch: Callable[[], Awaitable[Upstream]]
+    ) -> Upstream:
+        """
+        Runs fetch once for any number of concurrent callers with the same key.
+
+        Args:
+            key (str): The request key.
+            fetch (Callable[[], Awaitable[Upstream]]): The upstream call.
+
+        Returns:
+            Upstream: The shared response.
+        """
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetch())
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            metrics.incr("proxy.coalesced")
+        # A caller going away must not cancel the call the others wait on.
+        return await asyncio.shield(future)
+
+    async def _fetch(
+        self, path: str, body: bytes, request: Optional[web.Request] = None
+    ) -> Upstream:
+        assert self._session is not None
+        method = request.method if request is not None else "POST"
+        headers: dict[str, Any] = {}
+        if request is not None and request.content_type:
+            headers["Content-Type"] = request.content_type
+
+        with metrics.timer(f"proxy.upstream.{path.strip('/')}"):
+            try:
+                async with self._session.request(
+                    method,
+                    f"{self.upstream}{path}",
+                    params=request.query if request is not None else None,
+                    data=body or None,
+                    headers=headers,
+                ) as res:
+                    return res.status, await res.read(), res.content_type
+            except (ClientError, asyncio.TimeoutError) as e:
+                metrics.incr("proxy.upstream_error")
+                return 502, str(e).encode(), "text/plain"
+
+    async def _watch_tip(self) -> None:
+        while True:
+            status, data, _ = await self._fetch("/get_info", b"", None)
+            if status == 200:
+                try:
+                    info = json.loads(data)
+                    self.tip = (int(info["height"]), str(info["top_block_hash"]))
+                except (ValueError, KeyError, TypeError):
+                    pass
+
+            now = time.monotonic()
+            for key, (tip, expires, _) in list(self.recent.items()):
+                if expires < now or (tip is not None and tip != self.tip):
+                    del self.recent[key]
+
+            await asyncio.sleep(self.tip_interval)
@@ -0,0 +1,103 @@
+from typing import Optional
+
+import os
+import asyncio
+from collections import OrderedDict
+
+
+class BlockStore:
+    """
+    A size-bounded, least-recently-used on-disk cache of daemon responses.
+
+    Entries are files named by their key inside one directory. The index of
+    keys and sizes is rebuilt from the directory (oldest modification first)
+    at startup, so the cache survives restarts; file I/O runs off the event
+    loop.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        """
+        Initializes the store, indexing any entries already on disk.
+
+        Args:
+            path (str): The cache directory, created if missing.
+            max_bytes (int): The most bytes kept on disk.
+        """
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.entries: OrderedDict[str, int] = OrderedDict()
+
+        os.makedirs(path, exist_ok=True)
+        files = [e for e in os.scandir(path) if e.is_file() and ".tmp" not in e.name]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            self.entries[entry.name] = entry.stat().st_size
+            self.size += entry.stat().st_size
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Reads an entry, marking it most recently used.
+
+        Args:
+            key (str): The entry key (a hex digest).
+
+        Returns:
+            Optional[bytes]: The cached response, or None on a miss.
+        """
+        if key not in self.entries:
+            return None
+
+        try:
+            data = await asyncio.to_thread(self._read, key)
+        except OSError:
+            self._forget(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return data
+
+    async def put(self, key: str, data: bytes) -> None:
+        """
+        Writes an entry, evicting the least recently used ones to stay within
+        the size bound.
+
+        Args:
+            key (str): The entry key (a hex digest).
+            data (bytes): The response to cache.
+        """
+        if len(data) > self.max_bytes or key in self.entries:
+            return
+
+        await asyncio.to_thread(self._write, key, data)
+        self.entries[key] = len(data)
+        self.size += len(data)
+
+        while self.size > self.max_bytes and self.entries:
+            oldest = next(iter(self.entries))
+            self._forget(oldest)
+            await asyncio.to_thread(self._remove, oldest)
+
+    def _read(self, key: str) -> bytes:
+        with open(self._file(key), "rb") as f:
+            data = f.read()
+        os.utime(self._file(key))
+        return data
+
+    def _write(self, key: str, data: bytes) -> None:
+        # Write then rename, so a crash never leaves a truncated entry.
+        tmp = f"{self._file(key)}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(key))
+
+    def _remove(self, key: str) -> None:
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def _forget(self, key: str) -> None:
+        self.size -= self.entries.pop(key, 0)
@@ -1,15 +1,36 @@
 from typing import Any, Callable
 
+import hmac
 from functools import wraps
 
-from quart import jsonify, current_app
-from quart_auth import current_user as _current_user
+from quart import jsonify, request, current_app
+from quart_auth import (
+    Unauthorized,
+    current_user as _current_user,
+)
+from werkzeug.exceptions import NotFound
 
 from backend.utils.models import User
 
 current_user: User = _current_user  # type: ignore[assignment]
 
 
+def snapshot_user(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Marks a view as reading only User.SNAPSHOT_FIELDS of the current user, so
+    the request loads the cached snapshot instead of the whole user document.
+    Apply it directly below the route decorator.
+
+    Args:
+        func (Callable[..., Any]): The view function to mark.
+
+    Returns:
+        Callable[..., Any]: The same function.
+    """
+    func.snapshot_user = True  # type: ignore[attr-defined]
+    return func
+
+
 def check_confirmed(func: Callable[..., Any]) -> Callable[..., Any]:
     """
     A decorator that rejects requests from users who have not confirmed their
@@ -32,3 +53,35 @@ def check_confirmed(func: Callable[..., Any]) -> Callable[..., Any]:
         return await current_app.ensure_async(func)(*args, **kwargs)
 
     return wrapper
+
+
+def require_metrics_token(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    A decorator for operator-only views: the request must carry
+    "Authorization: Bearer <METRICS_TOKEN>". While METRICS_TOKEN is unset the
+    view answers 404, as if it did not exist.
+
+    Args:
+        func (Callable[..., Any]): The view function to decorate.
+
+    Returns:
+        Callable[..., Any]: The wrapped function that checks the token.
+    """
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token: str = current_app.config.get("METRICS_TOKEN") or ""
+        if not token:
+            raise NotFound()
+
+        scheme, _, presented = request.headers.get("Authorization", "").partition(
+            " "
+        )
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            presented.strip().encode(), token.encode()
+        ):
+            raise Unauthorized()
+
+        return await current_app.ensure_async(func)(*args, **kwargs)
+
+    return wrapper
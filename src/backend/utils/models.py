@@ -1,34 +1,86 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Optional
 
 from datetime import UTC, datetime
 
+from quart import g, has_request_context
 from quart_auth import AuthUser
 
-from backend.factory import db
+from backend.factory import db, cache
+from backend.library.clients import wallet_clients
+from backend.library.metrics import metrics
+from backend.library.sessions import wallet_sessions
 
 if TYPE_CHECKING:
     from pymongo.asynchronous.cursor import AsyncCursor
     from pymongo.asynchronous.collection import AsyncCollection
 
 
+def _identity_map() -> Optional[dict[str, User]]:
+    """
+    Returns the users already loaded by the current request, by username, so
+    each user document is fetched once per request; None outside a request.
+    """
+    if not has_request_context():
+        return None
+    users: dict[str, User] = g.setdefault("users", {})
+    return users
+
+
 class User(AuthUser):
     collection: AsyncCollection[Any] = db.get_collection("users")
 
-    # The fields save() persists. A partial save(fields=[...]) writes only a
-    # subset so a stale or separately-loaded instance can't overwrite fields it
-    # does not own.
-    PERSISTED_FIELDS: tuple[str, ...] = (
+    # Field sets for projected loads, so a caller reads only what it uses.
+    AUTH_FIELDS: tuple[str, ...] = (
         "email",
         "password",
         "register_date",
         "confirmed",
         "confirmed_at",
+        "session_version",
+    )
+    TWOFA_FIELDS: tuple[str, ...] = (
         "email_2fa",
         "totp_secret",
         "totp_enabled",
         "backup_codes",
+    )
+    WALLET_FIELDS: tuple[str, ...] = (
+        "wallet_password",
+        "wallet_created",
+        "wallet_connected",
+        "wallet_port",
+        "wallet_container",
+        "wallet_started_at",
+        "wallet_rpc_login",
+        "wallet_node",
+        "wallet_address",
+    )
+
+    # The live session state: read from the session's Redis hash (see
+    # WalletSessions) when there is one, else from the record saved at
+    # /connect. Written by start_session() and keep_alive(), not save().
+    SESSION_FIELDS: tuple[str, ...] = (
+        "wallet_connected",
+        "wallet_port",
+        "wallet_container",
+        "wallet_started_at",
+    )
+
+    # The fields save() persists. A partial save(fields=[...]) writes only a
+    # subset so a stale or separately-loaded instance can't overwrite fields it
+    # does not own.
+    PERSISTED_FIELDS: tuple[str, ...] = AUTH_FIELDS + TWOFA_FIELDS + WALLET_FIELDS
+
+    # The fields load_snapshot() reads: what authenticating a request and the
+    # polled wallet endpoints need, leaving out the password hash and the 2FA
+    # secrets.
+    SNAPSHOT_FIELDS: tuple[str, ...] = (
+        "email",
+        "confirmed",
+        "email_2fa",
+        "totp_enabled",
         "session_version",
         "wallet_password",
         "wallet_created",
@@ -36,8 +88,20 @@ class User(AuthUser):
         "wallet_port",
         "wallet_container",
         "wallet_started_at",
+        "wallet_rpc_login",
+        "wallet_node",
+        "wallet_address",
     )
 
+    # The update that ends a live wallet session (see clear_wallet_data).
+    CLEARED_SESSION: dict[str, Any] = {
+        "wallet_connected": False,
+        "wallet_port": None,
+        "wallet_container": None,
+        "wallet_started_at": None,
+        "wallet_rpc_login": None,
+    }
+
     def __init__(self, username: str) -> None:
         """
         Initializes a User instance with the given username.
@@ -72,6 +136,17 @@ class User(AuthUser):
         self.wallet_port: Optional[int] = 0
         self.wallet_container: Optional[str] = None
         self.wallet_started_at: Optional[datetime] = datetime.fromtimestamp(0, UTC)
+        # "user:password" RPC login of a pooled container; None means the
+        # container was cold-started with the user's own login.
+        self.wallet_rpc_login: Optional[str] = None
+        # The Docker node (see DOCKER_NODES) the wallet volume was placed on;
+        # None means the default node.
+        self.wallet_node: Optional[str] = None
+        # The wallet's primary address, which never changes, kept so it can be
+        # served without a running wallet RPC container; None until first seen.
+        self.wallet_address: Optional[str] = None
+        # The fields read from the database so far (see load()).
+        self._loaded: set[str] = set()
 
     def __repr__(self) -> str:
         """
@@ -126,21 +201,28 @@ class User(AuthUser):
                 instance cannot overwrite fields it does not own. When None, the
                 whole document is written, creating it if missing (upsert).
         """
-        if fields is not None:
-            unknown = set(fields) - set(self.PERSISTED_FIELDS)
-            if unknown:
-                raise ValueError(f"Unknown user fields: {sorted(unknown)}")
-
-        names = list(self.PERSISTED_FIELDS) if fields is None else fields
+        names = self._check_fields(fields)
         await User.collection.update_one(
             {"username": self.username},
             {"$set": {name: getattr(self, name) for name in names}},
             upsert=fields is None,
         )
+        if set(names) & set(self.SNAPSHOT_FIELDS):
+            await User.invalidate_snapshot(self.username)
 
-    async def load(self) -> bool:
+    async def load(
+        self, fields: Optional[Iterable[str]] = None, refresh: bool = False
+    ) -> bool:
         """
-        Loads the user data from the database.
+        Loads the user data from the database. Only the fields not loaded yet
+        are read, so loading again within a request is free unless refresh
+        is set.
+
+        Args:
+            fields (Optional[Iterable[str]]): The fields to load, e.g.
+                User.WALLET_FIELDS; all persisted fields when None.
+            refresh (bool): Re-read the fields even if already loaded, e.g.
+                after taking a lock another request may have written under.
 
         Returns:
             bool: True if user data is successfully loaded.
@@ -148,31 +230,153 @@ class User(AuthUser):
         Raises:
             ValueError: If the user is not found in the database.
         """
-        user = await User.collection.find_one({"username": self.username})
+        names = self._check_fields(fields)
+        if not refresh:
+            names = [name for name in names if name not in self._loaded]
+        if not names and self._loaded:
+            metrics.incr("users.identity_hit")
+            return True
+
+        user = await User.collection.find_one(
+            {"username": self.username}, self._projection(names)
+        )
 
         if not user:
             raise ValueError("User not found")
 
-        self.email = user.get("email", "")
-        self.password = user.get("password", "")
-        self.register_date = user.get("register_date", self.register_date)
-        self.confirmed = user.get("confirmed", False)
-        self.confirmed_at = user.get("confirmed_at", self.confirmed_at)
-        self.email_2fa = user.get("email_2fa", False)
-        self.totp_secret = user.get("totp_secret")
-        self.totp_enabled = user.get("totp_enabled", False)
-        self.backup_codes = user.get("backup_codes", [])
-        self.session_version = user.get("session_version", 0)
-        self.wallet_password = user.get("wallet_password", "")
-        self.wallet_created = user.get("wallet_created", False)
-        self.wallet_connected = user.get("wallet_connected", False)
-        self.wallet_port = user.get("wallet_port", 0)
-        self.wallet_container = user.get("wallet_container")
-        self.wallet_started_at = user.get(
-            "wallet_started_at", self.wallet_started_at
+        self._apply(user, names)
+        if set(names) & set(self.SESSION_FIELDS):
+            await self._load_session()
+        return True
+
+    async def load_snapshot(self) -> None:
+        """
+        Loads only SNAPSHOT_FIELDS, served from this worker's memory when it
+        read them recently. Every write to those fields invalidates every
+        worker's copy (see invalidate_snapshot()), so it never outlives one.
+
+        Raises:
+            ValueError: If the user is not found in the database.
+        """
+        snapshot = await cache.get_local_with(
+            User._snapshot_key(self.username), self._read_snapshot
         )
+        if snapshot is None:
+            raise ValueError("User not found")
 
-        return True
+        for name, value in snapshot.items():
+            setattr(self, name, value)
+        self._loaded.update(self.SNAPSHOT_FIELDS)
+        self._track()
+        await self._load_session()
+
+    async def _load_session(self) -> None:
+        session = await wallet_sessions.get(self.username)
+        if session is not None:
+            for name, value in session.items():
+                setattr(self, name, value)
+
+    async def start_session(
+        self, container_id: str, port: Optional[int], connected: bool
+    ) -> datetime:
+        """
+        Starts a wallet session on a wallet RPC container: records it in Redis,
+        and once in the database as the session's durable record.
+
+        Args:
+            container_id (str): The wallet RPC container.
+            port (Optional[int]): The container's RPC port.
+            connected (bool): Whether the container was found running.
+
+        Returns:
+            datetime: When the session started.
+        """
+        started_at = datetime.now(UTC)
+        self.wallet_connected = connected
+        self.wallet_port = port
+        self.wallet_container = container_id
+        self.wallet_started_at = started_at
+        await wallet_sessions.start(self.username, container_id, port, connected)
+        await self.save(list(self.SESSION_FIELDS))
+        return started_at
+
+    async def keep_alive(self) -> datetime:
+        """
+        Restarts the wallet session timer. Only the session's Redis hash is
+        touched, unless the session predates it and it has to be created.
+
+        Returns:
+            datetime: The restarted session's start time.
+        """
+        started_at = datetime.now(UTC)
+        self.wallet_started_at = started_at
+        if await wallet_sessions.touch(self.username) or not self.wallet_container:
+            return started_at
+
+        # Only recreate a session the reaper has not ended meanwhile.
+        if await User.collection.find_one(
+            {"username": self.username, "wallet_container": self.wallet_container},
+            {"_id": 1},
+        ):
+            await wallet_sessions.start(
+                self.username,
+                self.wallet_container,
+                self.wallet_port,
+                self.wallet_connected,
+            )
+        return started_at
+
+    async def _read_snapshot(self) -> Optional[dict[str, Any]]:
+        user = await User.collection.find_one(
+            {"username": self.username},
+            {"_id": 0, **{name: 1 for name in self.SNAPSHOT_FIELDS}},
+        )
+        metrics.incr("users.snapshot_read")
+        return user
+
+    @staticmethod
+    def _snapshot_key(username: str) -> str:
+        return f"user-snapshot:{username}"
+
+    def _check_fields(self, fields: Optional[Iterable[str]]) -> list[str]:
+        names = list(self.PERSISTED_FIELDS if fields is None else fields)
+        unknown = set(names) - set(self.PERSISTED_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown user fields: {sorted(unknown)}")
+        return names
+
+    @staticmethod
+    def _projection(names: Iterable[str]) -> dict[str, int]:
+        # The username is always read, so a user without any of the fields
+        # still comes back as a (non-empty) document.
+        return {"_id": 0, "username": 1, **{name: 1 for name in names}}
+
+    def _apply(self, user: dict[str, Any], names: Iterable[str]) -> None:
+        # A field missing from the document keeps its __init__ default.
+        for name in names:
+            if name in user:
+                setattr(self, name, user[name])
+            self._loaded.add(name)
+        self._track()
+
+    def _track(self) -> None:
+        users = _identity_map()
+        if users is not None:
+            users.setdefault(self.username, self)
+
+    @staticmethod
+    def _resolve(user: dict[str, Any], fields: Optional[Iterable[str]]) -> User:
+        """
+        Returns the request's instance for a fetched document, filling in
+        the fields it has not loaded yet, or a new instance.
+        """
+        users = _identity_map()
+        u = users.get(user["username"]) if users is not None else None
+        if u is None:
+            u = User(user["username"])
+        names = u._check_fields(fields)
+        u._apply(user, [name for name in names if name not in u._loaded])
+        return u
 
     async def clear_wallet_data(
         self,
@@ -187,7 +391,8 @@ class User(AuthUser):
 
         Args:
             reset_password (bool): Also clear the stored wallet RPC password.
-            reset_wallet (bool): Also mark the wallet as not yet created.
+            reset_wallet (bool): Also mark the wallet as not yet created, and
+                forget its node placement and address.
             expected_container (Optional[str]): When set, the update only applies
                 if the stored wallet_container still matches it, so a concurrent
                 writer (e.g. the reaper) can't wipe a session another request
@@ -197,24 +402,61 @@ class User(AuthUser):
         self.wallet_port = None
         self.wallet_container = None
         self.wallet_started_at = None
-        update: dict[str, Any] = {
-            "wallet_connected": False,
-            "wallet_port": None,
-            "wallet_container": None,
-            "wallet_started_at": None,
-        }
+        self.wallet_rpc_login = None
+        update: dict[str, Any] = dict(User.CLEARED_SESSION)
         if reset_password:
             self.wallet_password = None
             update["wallet_password"] = None
         if reset_wallet:
             self.wallet_created = False
+            self.wallet_node = None
+            self.wallet_address = None
             update["wallet_created"] = False
+            update["wallet_node"] = None
+            update["wallet_address"] = None
+
+        # The cached RPC client (if any) is for the container being let go.
+        wallet_clients.invalidate(self.username)
 
         query: dict[str, Any] = {"username": self.username}
         if expected_container is not None:
             query["wallet_container"] = expected_container
 
         await User.collection.update_one(query, {"$set": update})
+        await wallet_sessions.end(self.username, expected_container)
+        await User.invalidate_snapshot(self.username)
+
+    async def remember_address(self, address: str) -> None:
+        """
+        Stores the wallet's primary address, as read from its RPC container.
+        The update only applies while that container is still the user's, so
+        an address read just before the wallet was deleted or replaced is
+        never kept for the new one.
+
+        Args:
+            address (str): The primary address.
+        """
+        self.wallet_address = address
+        await User.collection.update_one(
+            {
+                "username": self.username,
+                "wallet_container": self.wallet_container,
+                "wallet_created": True,
+            },
+            {"$set": {"wallet_address": address}},
+        )
+        await User.invalidate_snapshot(self.username)
+
+    @staticmethod
+    async def invalidate_snapshot(username: str) -> None:
+        """
+        Drops every worker's snapshot of a user. Anything that writes
+        SNAPSHOT_FIELDS without going through save() must call this.
+
+        Args:
+            username (str): The user whose snapshot is stale.
+        """
+        await cache.invalidate_local(User._snapshot_key(username))
 
     @staticmethod
     async def username_taken(username: str) -> bool:
@@ -236,13 +478,41 @@ class User(AuthUser):
         return user is not None
 
     @staticmethod
-    async def get_by_username(username: str) -> User:
+    async def get(username: str, fields: Optional[Iterable[str]] = None) -> User:
+        """
+        Retrieves a User instance by its exact username, reusing the instance
+        the current request already loaded, if any.
+
+        Args:
+            username (str): The username.
+            fields (Optional[Iterable[str]]): The fields needed; all persisted
+                fields when None.
+
+        Returns:
+            User: A User instance.
+
+        Raises:
+            ValueError: If no user is found with the given username.
+        """
+        users = _identity_map()
+        u = users.get(username) if users is not None else None
+        if u is None:
+            u = User(username)
+        await u.load(fields)
+        return u
+
+    @staticmethod
+    async def get_by_username(
+        username: str, fields: Optional[Iterable[str]] = None
+    ) -> User:
         """
         Retrieves a User instance by username, matched case-insensitively and
         resolved to the stored casing.
 
         Args:
             username (str): The username in any casing.
+            fields (Optional[Iterable[str]]): The fields needed; all persisted
+                fields when None.
 
         Returns:
             User: A User instance.
@@ -252,24 +522,28 @@ class User(AuthUser):
         """
         user = await User.collection.find_one(
             {"username": username.strip()},
-            {"username": 1},
+            User._projection(
+                fields if fields is not None else User.PERSISTED_FIELDS
+            ),
             collation={"locale": "en", "strength": 2},
         )
 
         if not user:
             raise ValueError("User not found")
 
-        u = User(user["username"])
-        await u.load()
-        return u
+        return User._resolve(user, fields)
 
     @staticmethod
-    async def get_by_email(email: str) -> User:
+    async def get_by_email(
+        email: str, fields: Optional[Iterable[str]] = None
+    ) -> User:
         """
         Retrieves a User instance by email.
 
         Args:
             email (str): The email address of the user.
+            fields (Optional[Iterable[str]]): The fields needed; all persisted
+                fields when None.
 
         Returns:
             User: A User instance.
@@ -280,15 +554,16 @@ class User(AuthUser):
         # Case-insensitive match so legacy mixed-case emails keep resolving.
         user = await User.collection.find_one(
             {"email": email.strip()},
+            User._projection(
+                fields if fields is not None else User.PERSISTED_FIELDS
+            ),
             collation={"locale": "en", "strength": 2},
         )
 
         if not user:
             raise ValueError("User not found")
 
-        u = User(user["username"])
-        await u.load()
-        return u
+        return User._resolve(user, fields)
 
     @staticmethod
     async def get_all() -> AsyncCursor[Any]:
@@ -300,6 +575,43 @@ class User(AuthUser):
         """
         return User.collection.find()
 
+    @staticmethod
+    def get_active_sessions() -> AsyncCursor[Any]:
+        """
+        Retrieves the users with a wallet container assigned, projected to the
+        fields the expiry schedule needs.
+
+        Returns:
+            Any: The cursor of {"username", "wallet_started_at"} documents.
+        """
+        return User.collection.find(
+            {"wallet_container": {"$ne": None}},
+            {"_id": 0, "username": 1, "wallet_started_at": 1},
+        )
+
+    @staticmethod
+    def get_wallet_state(usernames: list[str]) -> AsyncCursor[Any]:
+        """
+        Retrieves the users with a wallet container assigned, plus the given
+        users, projected to the fields the Docker reconciler compares.
+
+        Args:
+            usernames (list[str]): Extra users to include (e.g. the owners of
+                labelled containers and volumes).
+
+        Returns:
+            Any: The cursor of {"username", "wallet_container"} documents.
+        """
+        return User.collection.find(
+            {
+                "$or": [
+                    {"wallet_container": {"$ne": None}},
+                    {"username": {"$in": usernames}},
+                ]
+            },
+            {"_id": 0, "username": 1, "wallet_container": 1},
+        )
+
 
 class Event:
     collection: AsyncCollection[Any] = db.get_collection("events")
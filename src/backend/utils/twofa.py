@@ -1,9 +1,24 @@
+import hmac
+import asyncio
 import secrets
+from hashlib import sha256
+
+from backend import config
+from backend.library.hashing import hasher
 
 # Unambiguous alphabet (no 0/O/1/I) so backup codes are easy to read and type.
 _ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
 _CODE_COUNT = 10
 _GROUP = 4
+# Hex characters of the HMAC kept as a code's lookup tag, and what separates
+# the tag from the bcrypt hash (which never contains a colon).
+_TAG_LENGTH = 16
+_TAG_SEPARATOR = ":"
+# Failed scans of untagged (legacy) hashes an account gets per window. Each
+# costs a bcrypt per legacy code, so the budget bounds what wrong codes cost
+# until the next successful login replaces the legacy set.
+_LEGACY_SCANS = 5
+_LEGACY_WINDOW = 900
 
 
 def _one_code() -> str:
@@ -21,32 +36,73 @@ def normalize_code(code: str) -> str:
     return code.strip().upper().replace(" ", "").replace("-", "")
 
 
-def hash_codes(codes: list[str]) -> list[str]:
-    """Returns bcrypt hashes of the given plaintext backup codes."""
-    from backend.factory import bcrypt
+def code_tag(code: str) -> str:
+    """
+    Returns the lookup tag stored with a backup code's hash: a truncated HMAC
+    of the normalised code keyed with SECRET_KEY, so a login attempt finds the
+    one hash it could match without revealing the code to anyone lacking the
+    key.
+    """
+    digest = hmac.new(
+        config.SECRET_KEY.encode(), normalize_code(code).encode(), sha256
+    ).hexdigest()
+    return digest[:_TAG_LENGTH]
+
+
+async def hash_codes(codes: list[str]) -> list[str]:
+    """Returns the stored form ("tag:bcrypt-hash") of plaintext backup codes."""
+    hashes = await asyncio.gather(*(hasher.hash(normalize_code(c)) for c in codes))
+    return [f"{code_tag(c)}{_TAG_SEPARATOR}{h}" for c, h in zip(codes, hashes)]
+
 
-    return [
-        bcrypt.generate_password_hash(normalize_code(c)).decode("utf8")
-        for c in codes
-    ]
+def has_legacy_codes(hashes: list[str]) -> bool:
+    """Whether any stored backup code predates lookup tags."""
+    return any(_TAG_SEPARATOR not in h for h in hashes)
 
 
-def verify_and_consume(code: str, hashes: list[str]) -> tuple[bool, list[str]]:
+async def verify_and_consume(
+    code: str, hashes: list[str], username: str
+) -> tuple[bool, list[str]]:
     """
-    Checks a backup code against the stored hashes.
+    Checks a backup code against the stored hashes. Only the entry whose tag
+    matches is bcrypt-checked, so a wrong code costs at most one hash rather
+    than one per stored code. Untagged (legacy) bcrypt hashes from before tags
+    were added are still scanned, but only _LEGACY_SCANS failed scans per
+    account are allowed per window; the next successful login replaces them
+    with tagged codes.
 
     Returns:
         tuple[bool, list[str]]: (matched, remaining_hashes). On a match the used
         hash is removed so each backup code works only once.
     """
-    from backend.factory import bcrypt
-
     candidate = normalize_code(code)
     if not candidate:
         return False, hashes
 
-    for h in hashes:
-        if bcrypt.check_password_hash(h, candidate):
+    tag = code_tag(candidate)
+    legacy: list[str] = []
+    for stored in hashes:
+        stored_tag, separator, h = stored.partition(_TAG_SEPARATOR)
+        if not separator:
+            legacy.append(stored)
+        elif hmac.compare_digest(stored_tag, tag):
+            if await hasher.check(h, candidate):
+                return True, [x for x in hashes if x != stored]
+            return False, hashes
+
+    if not legacy:
+        return False, hashes
+
+    from backend.factory import cache
+
+    key = f"2fa:legacy-scans:{username}"
+    if int(await cache.redis.get(key) or 0) >= _LEGACY_SCANS:
+        return False, hashes
+
+    for h in legacy:
+        if await hasher.check(h, candidate):
             return True, [x for x in hashes if x != h]
 
+    if await cache.redis.incr(key) == 1:
+        await cache.redis.expire(key, _LEGACY_WINDOW)
     return False, hashes
@@ -21,12 +21,18 @@ export interface SortedTx {
   total: string
 }
 
+export interface TransfersPage {
+  sorted_transactions: Record<string, SortedTx>
+  next_cursor: string | null
+}
+
 export interface WalletOverview {
   address: string
   email: string
   balance: string
   unlocked_balance: string
   sorted_transactions: Record<string, SortedTx>
+  next_cursor: string | null
   price: number
   wallet_height: number
   network_height: number
@@ -52,9 +58,33 @@ export const useWalletStore = defineStore("wallet", {
     },
     async fetchOverview(): Promise<WalletOverview | null> {
       const res = await api.get<WalletOverview>("/wallet")
-      this.overview = res.result ?? null
+      const next = res.result ?? null
+      const prev = this.overview
+      // The overview only carries the latest page; keep the older confirmed
+      // transfers already paged in, and the cursor past them.
+      if (next && prev && prev.next_cursor !== next.next_cursor) {
+        const latest = Object.values(next.sorted_transactions)
+        const oldest = Math.min(...latest.map((t) => t.timestamp))
+        for (const [key, t] of Object.entries(prev.sorted_transactions)) {
+          if ((t.type === "in" || t.type === "out") && t.timestamp < oldest) {
+            next.sorted_transactions[key] = t
+          }
+        }
+        if (latest.length) next.next_cursor = prev.next_cursor
+      }
+      this.overview = next
       return this.overview
     },
+    async fetchMoreTransfers(): Promise<void> {
+      const cursor = this.overview?.next_cursor
+      if (!cursor) return
+      const res = await api.get<TransfersPage>(
+        `/wallet/transfers?cursor=${encodeURIComponent(cursor)}`,
+      )
+      if (!this.overview || !res.result) return
+      Object.assign(this.overview.sorted_transactions, res.result.sorted_transactions)
+      this.overview.next_cursor = res.result.next_cursor
+    },
     async setup(
       mode: "create" | "restore",
       seed?: string,
@@ -0,0 +1,242 @@
+"""
+Shared test setup: the config module and the factory globals create_app()
+would provide, plus in-memory stand-ins for Redis and a Docker engine.
+"""
+
+from typing import Any, Optional
+
+import sys
+import importlib.util
+from pathlib import Path
+
+import backend
+
+try:
+    from backend import config
+except ImportError:
+    # Without a deployment config, run against the documented defaults.
+    _spec = importlib.util.spec_from_file_location(
+        "backend.config", Path(backend.__file__).parent / "config.example.py"
+    )
+    assert _spec is not None and _spec.loader is not None
+    config = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(config)
+    sys.modules["backend.config"] = config
+    backend.config = config  # type: ignore[attr-defined]
+
+from backend import factory
+from backend.library.engine import EngineError, EngineNotFound
+
+
+class FakeLock:
+    def __init__(self, redis: "FakeRedis", name: str) -> None:
+        self.redis = redis
+        self.name = name
+
+    async def acquire(self) -> bool:
+        if self.name in self.redis.locks:
+            return False
+        self.redis.locks.add(self.name)
+        return True
+
+    async def release(self) -> None:
+        self.redis.locks.discard(self.name)
+
+
+class FakeRedis:
+    """The subset of redis.asyncio.Redis the tested code uses, in memory."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.lists: dict[str, list[bytes]] = {}
+        self.zsets: dict[str, dict[bytes, float]] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.locks: set[str] = set()
+
+    @staticmethod
+    def _bytes(value: Any) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def lock(self, name: str, timeout: float = 0, blocking: bool = True) -> FakeLock:
+        return FakeLock(self, name)
+
+    async def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    async def rpush(self, key: str, *values: Any) -> int:
+        self.lists.setdefault(key, []).extend(self._bytes(v) for v in values)
+        return len(self.lists[key])
+
+    async def lpop(self, key: str) -> Optional[bytes]:
+        items = self.lists.get(key)
+        return items.pop(0) if items else None
+
+    async def rpop(self, key: str) -> Optional[bytes]:
+        items = self.lists.get(key)
+        return items.pop() if items else None
+
+    async def hset(
+        self,
+        key: str,
+        field: Optional[str] = None,
+        value: Any = None,
+        mapping: Optional[dict[str, Any]] = None,
+    ) -> int:
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        stored = self.hashes.setdefault(key, {})
+        for k, v in fields.items():
+            stored[self._bytes(k)] = self._bytes(v)
+        return len(fields)
+
+    async def hget(self, key: str, field: str) -> Optional[bytes]:
+        return self.hashes.get(key, {}).get(self._bytes(field))
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        stored = self.hashes.get(key, {})
+        return sum(stored.pop(self._bytes(f), None) is not None for f in fields)
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        stored = self.hashes.setdefault(key, {})
+        value = int(stored.get(self._bytes(field), b"0")) + amount
+        stored[self._bytes(field)] = self._bytes(value)
+        return value
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> int:
+        stored = self.zsets.setdefault(key, {})
+        added = sum(self._bytes(m) not in stored for m in mapping)
+        stored.update({self._bytes(m): float(s) for m, s in mapping.items()})
+        return added
+
+    async def zrem(self, key: str, *members: str) -> int:
+        stored = self.zsets.get(key, {})
+        return sum(stored.pop(self._bytes(m), None) is not None for m in members)
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        return self.zsets.get(key, {}).get(self._bytes(member))
+
+    async def zcard(self, key: str) -> int:
+        return len(self.zsets.get(key, {}))
+
+    async def zrangebyscore(
+        self, key: str, low: Any, high: Any, start: int = 0, num: int = -1
+    ) -> list[bytes]:
+        low = float(low)
+        high = float(high)
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda i: i[1])
+        members = [m for m, s in items if low <= s <= high][start:]
+        return members if num < 0 else members[:num]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.values.get(key)
+
+    async def incr(self, key: str) -> int:
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = self._bytes(value)
+        return value
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        return key in self.values
+
+    async def delete(self, *keys: str) -> int:
+        return sum(
+            (self.values.pop(k, None) is not None)
+            or (self.lists.pop(k, None) is not None)
+            or (self.hashes.pop(k, None) is not None)
+            for k in keys
+        )
+
+
+class FakeCache:
+    def __init__(self) -> None:
+        self.redis = FakeRedis()
+
+
+class FakeDB:
+    def get_collection(self, name: str) -> Any:
+        return None
+
+
+class FakeEngine:
+    """
+    A stand-in Docker engine for one node. Published ports are assigned at
+    start, and only answer on the address they were bound to.
+    """
+
+    def __init__(self) -> None:
+        self.containers: dict[str, dict[str, Any]] = {}
+        self.listening: set[tuple[str, int]] = set()
+        self.archives: list[tuple[str, str, bytes]] = []
+        self.stopped: list[str] = []
+        self._next_port = 49153
+
+    def find(self, container_id: str) -> dict[str, Any]:
+        for cid, c in self.containers.items():
+            if container_id in (cid, cid[:12], c["Name"]):
+                return c
+        raise EngineNotFound(404, f"No such container: {container_id}")
+
+    async def create_container(
+        self, name: Optional[str], body: dict[str, Any]
+    ) -> str:
+        if name and any(c["Name"] == name for c in self.containers.values()):
+            raise EngineError(409, "Conflict")
+        cid = f"{len(self.containers) + 1:064x}"
+        self.containers[cid] = {
+            "Id": cid,
+            "Name": name or "",
+            "Body": body,
+            "Ports": {},
+        }
+        return cid
+
+    async def start_container(self, container_id: str) -> None:
+        c = self.find(container_id)
+        for port, bindings in (
+            c["Body"]["HostConfig"].get("PortBindings", {}).items()
+        ):
+            host_port = self._next_port
+            self._next_port += 1
+            c["Ports"][port] = [
+                {"HostIp": bindings[0]["HostIp"], "HostPort": str(host_port)}
+            ]
+            self.listening.add((bindings[0]["HostIp"], host_port))
+
+    async def inspect_container(self, container_id: str) -> dict[str, Any]:
+        c = self.find(container_id)
+        return {
+            "Id": c["Id"],
+            "Name": f"/{c['Name']}",
+            "Config": {"Labels": c["Body"].get("Labels", {})},
+            "NetworkSettings": {"Ports": c["Ports"]},
+        }
+
+    async def stop_container(self, container_id: str) -> None:
+        c = self.find(container_id)
+        self.listening -= {
+            (b["HostIp"], int(b["HostPort"])) for (b,) in c["Ports"].values()
+        }
+        self.stopped.append(c["Name"])
+
+    async def rename_container(self, container_id: str, name: str) -> None:
+        self.find(container_id)["Name"] = name
+
+    async def remove_container(self, container_id: str, force: bool = True) -> None:
+        self.containers.pop(self.find(container_id)["Id"])
+
+    async def get_archive(self, container_id: str, path: str) -> bytes:
+        self.find(container_id)
+        return path.encode()
+
+    async def put_archive(self, container_id: str, path: str, data: bytes) -> None:
+        self.archives.append((self.find(container_id)["Name"], path, data))
+
+
+if not hasattr(factory, "cache"):
+    factory.cache = FakeCache()  # type: ignore[assignment]
+if not hasattr(factory, "db"):
+    factory.db = FakeDB()  # type: ignore[assignment]
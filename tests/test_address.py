@@ -0,0 +1,148 @@
+import unittest
+
+from backend.library.address import (
+    STANDARD_PREFIX,
+    INTEGRATED_PREFIX,
+    SUBADDRESS_PREFIX,
+    decode_address,
+    encode_address,
+    is_valid_address,
+    integrated_address,
+)
+
+# Reference vectors, built outside this codec: the donation address from the
+# README, and a key pair with its (0, 1) subaddress and an integrated address,
+# derived and encoded with monero-python's ed25519 and base58 and Keccak-256
+# under Nerva's address prefixes.
+DONATION = (
+    "NV1PqtQwRik7FFeAJ5n7iKbHtve3nkeM99x3Q31wjBAm7twvRv6NYkbbP7vSG3n8N3fsUh2gpfZG2P"
+    "Ri4gYhxL4h2r2SnhUoX"
+)
+DONATION_SPEND = "0e8b702ce39525573dee508ce3dccd03a75e0e57154c3580a43f3666478e2939"
+DONATION_VIEW = "efe9747ca074cd8d822f84f6eb08e863ed6b9ca1ac67861387eceef4663ad6ec"
+DONATION_INTEGRATED = (
+    "NizKSUvki5GRwuJJE8Y3VUdw3bPYDKPaLDkKiawg5MyxQn98XfkUaUwLY8pb9j3k582VRAMWeoBPhJ"
+    "KJyYsP1B89AqpQARcWB3v7WcijHAYY7"
+)
+
+STANDARD = (
+    "NV1Jb2GvFir3zdnEijmyqYLi5bko8fbW35GEvfbUFBYSascUD9jPzLC8SZV8p79CZY13u5D6nrHiUB"
+    "JN1aAJoGMz2fES9ndAV"
+)
+SPEND = "03fd411e184b11e5eadf9ee0e4bf75d3f87b2c8d913c197c41bb63da75a7ca82"
+VIEW = "d8bd68aa43ed2c7c2809927287ab004c77dd3aef523d3d9366968b60c2fdc13f"
+SUBADDRESS = (
+    "NS2RBLF6JX7LZmRDPxS1cfHg4uHr5YTqCdchQj2ie8Hq1VyoJNAC6sRDHdMoUowBgpCyAnPtosstNf"
+    "LRCriab7vZ28a98FpYi"
+)
+SUBADDRESS_SPEND = "5b733196b43e74f897794d1c1f2c63af4df56117624bdae8d74ad00ff2c402fc"
+SUBADDRESS_VIEW = "b71a421e45c849750b2c7815371d478df64e224de73be5304d8646ae9dba83ad"
+INTEGRATED = (
+    "NizKRHreMsVDZGnhtHgf1MZ2QTSDAeSTJB43Nj1oDZdEV4nSYmWwiRGgftCGXiJhtaVbvgTcaUCGyB"
+    "F7NZc4GvQqjSjvdv9wQfa7Wcij2AxaX"
+)
+PAYMENT_ID = "0123456789abcdef"
+
+# A valid Monero mainnet address: a good checksum under the wrong prefix.
+MONERO = (
+    "48SSQzEcvQPK7H69vUvwReFT7tCDESdRhPFGubTgJ8WeXUUPQRWjY8oZk3wHfLhsUnChJ1BYyYfoLK"
+    "Qh8epYsupAAWCnDKh"
+)
+# STANDARD with one key byte short, under a valid checksum.
+SHORT = (
+    "NV1Jb2GvFir3zdnEijmyqYLi5bko8fbW35GEvfbUFBYSascUD9jPzLC8SZV8p79CZY13u5D6nrHiUB"
+    "JN1aAJoGMzNoCBeve"
+)
+
+
+class DecodeTest(unittest.TestCase):
+    def test_standard(self) -> None:
+        for address, spend, view in (
+            (DONATION, DONATION_SPEND, DONATION_VIEW),
+            (STANDARD, SPEND, VIEW),
+        ):
+            decoded = decode_address(address)
+            self.assertEqual(decoded.kind, "standard")
+            self.assertEqual(decoded.spend_key.hex(), spend)
+            self.assertEqual(decoded.view_key.hex(), view)
+            self.assertIsNone(decoded.payment_id)
+
+    def test_subaddress(self) -> None:
+        decoded = decode_address(SUBADDRESS)
+        self.assertTrue(decoded.subaddress)
+        self.assertEqual(decoded.spend_key.hex(), SUBADDRESS_SPEND)
+        self.assertEqual(decoded.view_key.hex(), SUBADDRESS_VIEW)
+
+    def test_integrated(self) -> None:
+        decoded = decode_address(INTEGRATED)
+        self.assertTrue(decoded.integrated)
+        self.assertEqual(decoded.spend_key.hex(), SPEND)
+        self.assertEqual(decoded.view_key.hex(), VIEW)
+        self.assertEqual(decoded.payment_id, bytes.fromhex(PAYMENT_ID))
+
+    def test_round_trip(self) -> None:
+        for address, prefix in (
+            (STANDARD, STANDARD_PREFIX),
+            (SUBADDRESS, SUBADDRESS_PREFIX),
+            (INTEGRATED, INTEGRATED_PREFIX),
+        ):
+            decoded = decode_address(address)
+            self.assertEqual(
+                encode_address(
+                    decoded.spend_key,
+                    decoded.view_key,
+                    prefix,
+                    decoded.payment_id or b"",
+                ),
+                address,
+            )
+
+
+class IntegratedAddressTest(unittest.TestCase):
+    def test_builds_reference_addresses(self) -> None:
+        self.assertEqual(integrated_address(STANDARD, PAYMENT_ID), INTEGRATED)
+        self.assertEqual(
+            integrated_address(DONATION, PAYMENT_ID), DONATION_INTEGRATED
+        )
+
+    def test_only_standard_addresses(self) -> None:
+        for address in (SUBADDRESS, INTEGRATED):
+            with self.assertRaises(ValueError):
+                integrated_address(address, PAYMENT_ID)
+
+    def test_payment_id(self) -> None:
+        for payment_id in ("0123", "0123456789abcdef00", "not-hex-at-all!!"):
+            with self.assertRaises(ValueError):
+                integrated_address(STANDARD, payment_id)
+
+
+class InvalidAddressTest(unittest.TestCase):
+    def test_bad_checksum(self) -> None:
+        tampered = STANDARD[:10] + "a" + STANDARD[11:]
+        with self.assertRaisesRegex(ValueError, "checksum"):
+            decode_address(tampered)
+
+    def test_wrong_network(self) -> None:
+        with self.assertRaisesRegex(ValueError, "Not a Nerva mainnet address"):
+            decode_address(MONERO)
+
+    def test_wrong_length(self) -> None:
+        with self.assertRaisesRegex(ValueError, "length"):
+            decode_address(SHORT)
+        with self.assertRaisesRegex(ValueError, "length"):
+            decode_address(STANDARD[:-1])
+
+    def test_invalid_character(self) -> None:
+        with self.assertRaisesRegex(ValueError, "character"):
+            decode_address(STANDARD[:20] + "0" + STANDARD[21:])
+
+    def test_is_valid_address(self) -> None:
+        self.assertTrue(is_valid_address(STANDARD))
+        self.assertTrue(is_valid_address(SUBADDRESS))
+        self.assertTrue(is_valid_address(INTEGRATED))
+        self.assertFalse(is_valid_address(MONERO))
+        self.assertFalse(is_valid_address(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+from typing import Any
+
+import gc
+import asyncio
+import unittest
+from unittest import mock
+
+from redis.exceptions import RedisError
+
+from tests.support import FakeRedis
+from backend.library.cache import Cache
+
+
+class BrokenRedis(FakeRedis):
+    async def set(self, *args: Any, **kwargs: Any) -> bool:
+        raise RedisError("connection reset")
+
+
+class CoinInfoTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        # Skip __init__, which connects to the configured Redis.
+        self.cache = Cache.__new__(Cache)
+        self.cache.redis = BrokenRedis()  # type: ignore[assignment]
+        self.cache.coin_info_ttl = 900
+        self.cache.coin_info_refresh = 720
+        self.cache.coin_info = {"current_price": 0.1}
+        self.cache.coin_info_at = 0.0
+        self.cache._coin_refresh = None
+
+    async def test_failed_refresh_is_reported(self) -> None:
+        loop = asyncio.get_running_loop()
+        unretrieved = mock.Mock()
+        loop.set_exception_handler(lambda _, context: unretrieved(context))
+
+        with mock.patch("builtins.print") as printed:
+            self.assertEqual(
+                await self.cache.get_coin_info(), {"current_price": 0.1}
+            )
+            refresh = self.cache._coin_refresh
+            assert refresh is not None
+            await asyncio.wait([refresh])
+            await asyncio.sleep(0)
+
+        printed.assert_called_once()
+        self.assertIn("connection reset", printed.call_args.args[0])
+
+        del refresh
+        self.cache._coin_refresh = None
+        gc.collect()
+        unretrieved.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
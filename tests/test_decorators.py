@@ -0,0 +1,47 @@
+import unittest
+
+from quart import Quart
+
+import tests.support  # noqa: F401
+from backend.utils.decorators import require_metrics_token
+
+
+def _app(token: str) -> Quart:
+    app = Quart(__name__)
+    app.config["METRICS_TOKEN"] = token
+
+    @app.route("/metrics")
+    @require_metrics_token
+    async def _metrics() -> str:
+        return "ok"
+
+    return app
+
+
+class RequireMetricsTokenTest(unittest.IsolatedAsyncioTestCase):
+    async def test_disabled_without_a_token(self) -> None:
+        client = _app("").test_client()
+        response = await client.get("/metrics", headers={"Authorization": "Bearer "})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_rejects_anonymous_and_wrong_tokens(self) -> None:
+        client = _app("s3cret").test_client()
+        for headers in (
+            {},
+            {"Authorization": "Bearer wrong"},
+            {"Authorization": "Basic s3cret"},
+        ):
+            response = await client.get("/metrics", headers=headers)
+            self.assertEqual(response.status_code, 401)
+
+    async def test_accepts_the_token(self) -> None:
+        client = _app("s3cret").test_client()
+        response = await client.get(
+            "/metrics", headers={"Authorization": "Bearer s3cret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await response.get_data(as_text=True), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from backend.library.index import DockerIndex
+
+CONTAINER_ID = "0123456789ab" + "cd" * 26
+
+
+class ContainerExistsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = DockerIndex()
+        self.index.ready = True
+
+    def test_tracked_names(self) -> None:
+        for prefix in ("rpc", "init", "pool", "presync"):
+            name = f"{prefix}_wallet_alice"
+            self.assertIs(self.index.container_exists(name), False)
+            self.index.add_container(CONTAINER_ID, name)
+            self.assertIs(self.index.container_exists(name), True)
+            self.index.remove_container(CONTAINER_ID)
+
+    def test_ids(self) -> None:
+        self.index.add_container(CONTAINER_ID, "presync_wallet_alice")
+        self.assertIs(self.index.container_exists(CONTAINER_ID), True)
+        self.assertIs(self.index.container_exists(CONTAINER_ID[:12]), True)
+        self.assertIs(self.index.container_exists("fedcba987654"), False)
+
+    def test_untracked_names_go_to_the_engine(self) -> None:
+        self.assertIsNone(self.index.container_exists("some_other_container"))
+        self.assertIsNone(self.index.container_exists("short"))
+
+    def test_not_ready(self) -> None:
+        self.index.ready = False
+        self.assertIsNone(self.index.container_exists("rpc_wallet_alice"))
+
+
+if __name__ == "__main__":
+    unittest.main()
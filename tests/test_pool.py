@@ -0,0 +1,173 @@
+from typing import Any, Optional
+
+import unittest
+from unittest import mock
+
+from tests.support import FakeCache, FakeEngine, config, factory
+from backend.library import pool as pool_module
+from backend.library.pool import IDLE_KEY, PENDING_KEY, WalletPool
+from backend.library.docker import Docker
+
+REMOTE = {"name": "remote", "host": "tcp://10.0.0.5:2375", "address": "10.0.0.5"}
+
+
+class FakeWallet:
+    """A wallet RPC client that only reaches ports the engine is listening on."""
+
+    engine: FakeEngine
+    opened: list[tuple[str, str]] = []
+    stored: int = 0
+
+    def __init__(self, host: str, port: int, **kwargs: Any) -> None:
+        self.host = host
+        self.port = port
+
+    async def responsive(self) -> bool:
+        return (self.host, self.port) in self.engine.listening
+
+    async def open(self, filename: str, password: str) -> None:
+        if not await self.responsive():
+            raise ConnectionError(f"{self.host}:{self.port} is unreachable")
+        self.opened.append((filename, password))
+
+    async def store(self) -> None:
+        if not await self.responsive():
+            raise ConnectionError(f"{self.host}:{self.port} is unreachable")
+        FakeWallet.stored += 1
+
+    async def close(self) -> None:
+        await self.store()
+
+
+class FakeUser:
+    def __init__(self, username: str) -> None:
+        self.username = username
+        self.wallet_password: Optional[str] = "secret"
+        self.wallet_rpc_login: Optional[str] = None
+        self.saved: list[list[str]] = []
+
+    async def save(self, fields: list[str]) -> None:
+        self.saved.append(fields)
+
+
+class PooledStartTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patches = [
+            mock.patch.object(config, "DOCKER_NODES", [REMOTE], create=True),
+            mock.patch.object(config, "WALLET_NETWORK", "", create=True),
+            mock.patch.object(factory, "cache", FakeCache()),
+            mock.patch.object(pool_module, "Wallet", FakeWallet),
+            mock.patch.object(pool_module, "READY_INTERVAL", 0),
+            mock.patch.object(pool_module, "RETRY_DELAY", 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.docker = Docker()
+        self.engine = FakeEngine()
+        self.docker.default.engine = self.engine
+        self.docker.engine = self.engine
+        FakeWallet.engine = self.engine
+        FakeWallet.opened = []
+        FakeWallet.stored = 0
+        self.written: list[tuple[str, list[bytes]]] = []
+        self.copy_back_fails = False
+        self.docker.write_wallet_files = self._write_wallet_files  # type: ignore[method-assign]
+        self.pool = WalletPool(self.docker, size=1, refill_rate=1, max_reuse=1)
+        self.docker.pool = self.pool
+
+    async def _write_wallet_files(
+        self, username: str, archives: list[bytes]
+    ) -> None:
+        if self.copy_back_fails:
+            raise ConnectionError("carrier unavailable")
+        self.written.append((username, archives))
+
+    async def _claimed(self) -> str:
+        await self.pool.refill()
+        container_id = await self.pool.claim(FakeUser("alice"))
+        assert container_id is not None
+        return container_id
+
+    async def test_refill_binds_and_dials_the_default_node(self) -> None:
+        self.assertEqual(await self.pool.refill(), 1)
+
+        (container,) = self.engine.containers.values()
+        (binding,) = container["Ports"].values()
+        self.assertEqual(binding[0]["HostIp"], REMOTE["address"])
+        self.assertEqual(await factory.cache.redis.llen(IDLE_KEY), 1)
+
+    async def test_claim_opens_the_wallet_in_a_pooled_container(self) -> None:
+        await self.pool.refill()
+        user = FakeUser("alice")
+
+        container_id = await self.pool.claim(user)
+
+        self.assertIsNotNone(container_id)
+        self.assertEqual(FakeWallet.opened, [("alice.wallet", "secret")])
+        self.assertEqual(
+            self.engine.find(str(container_id))["Name"], "rpc_wallet_alice"
+        )
+        self.assertEqual(await self.pool.owner(str(container_id)), "alice")
+        self.assertTrue(user.wallet_rpc_login)
+        self.assertEqual(user.saved, [["wallet_rpc_login"]])
+        self.assertEqual(await factory.cache.redis.llen(IDLE_KEY), 0)
+
+    async def test_claim_misses_on_an_empty_pool(self) -> None:
+        self.assertIsNone(await self.pool.claim(FakeUser("alice")))
+
+    async def test_release_copies_the_cache_back_before_stopping(self) -> None:
+        container_id = await self._claimed()
+
+        await self.docker.stop_container(container_id)
+
+        self.assertEqual(self.written, [("alice", [b"/pool/alice.wallet"])])
+        self.assertEqual(self.engine.stopped, ["rpc_wallet_alice"])
+
+    async def test_failed_copy_back_keeps_the_container_running(self) -> None:
+        container_id = await self._claimed()
+        self.copy_back_fails = True
+
+        await self.docker.stop_container(container_id)
+
+        self.assertEqual(self.engine.stopped, [])
+        self.assertTrue(await self.pool.is_pending(container_id))
+        self.assertEqual(await self.pool.owner(container_id), "alice")
+
+        # Still failing: the retry keeps it pending.
+        self.assertEqual(await self.pool.retry_releases(), 0)
+        self.assertEqual(self.engine.stopped, [])
+        self.assertTrue(await self.pool.is_pending(container_id))
+
+        self.copy_back_fails = False
+        self.assertEqual(await self.pool.retry_releases(), 1)
+        self.assertEqual(self.written, [("alice", [b"/pool/alice.wallet"])])
+        self.assertEqual(self.engine.stopped, ["rpc_wallet_alice"])
+        self.assertEqual(await factory.cache.redis.zcard(PENDING_KEY), 0)
+
+    async def test_reconnect_reclaims_a_pending_container(self) -> None:
+        container_id = await self._claimed()
+        self.copy_back_fails = True
+        await self.docker.stop_container(container_id)
+
+        user = FakeUser("alice")
+        self.assertEqual(await self.pool.reclaim(user), container_id)
+
+        self.assertFalse(await self.pool.is_pending(container_id))
+        self.assertTrue(user.wallet_rpc_login)
+        self.assertEqual(await self.pool.retry_releases(), 0)
+        self.assertEqual(self.engine.stopped, [])
+
+    async def test_checkpoint_copies_the_cache_back(self) -> None:
+        container_id = await self._claimed()
+
+        await self.pool.checkpoint(container_id)
+
+        self.assertEqual(FakeWallet.stored, 1)
+        self.assertEqual(self.written, [("alice", [b"/pool/alice.wallet"])])
+        self.assertEqual(self.engine.stopped, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
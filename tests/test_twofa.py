@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+
+from backend.utils import twofa
+from tests.support import FakeCache, factory
+from backend.utils.twofa import (
+    hash_codes,
+    normalize_code,
+    has_legacy_codes,
+    verify_and_consume,
+)
+
+
+class FakeHasher:
+    """Stands in for bcrypt, counting the checks it runs."""
+
+    def __init__(self) -> None:
+        self.checks = 0
+
+    async def hash(self, password: str) -> str:
+        return f"$2b$12${password}"
+
+    async def check(self, pw_hash: str, password: str) -> bool:
+        self.checks += 1
+        return pw_hash == f"$2b$12${password}"
+
+
+class VerifyAndConsumeTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.hasher = FakeHasher()
+        patches = [
+            mock.patch.object(twofa, "hasher", self.hasher),
+            mock.patch.object(factory, "cache", FakeCache()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def test_tagged_codes_cost_one_check(self) -> None:
+        hashes = await hash_codes(["AAAA-BBBB", "CCCC-DDDD", "EEEE-FFFF"])
+        self.assertFalse(has_legacy_codes(hashes))
+
+        matched, remaining = await verify_and_consume("cccc dddd", hashes, "alice")
+        self.assertTrue(matched)
+        self.assertEqual(len(remaining), 2)
+        self.assertEqual(self.hasher.checks, 1)
+
+        self.hasher.checks = 0
+        matched, _ = await verify_and_consume("GGGG-HHHH", hashes, "alice")
+        self.assertFalse(matched)
+        self.assertEqual(self.hasher.checks, 0)
+
+    async def test_legacy_scans_are_capped_per_account(self) -> None:
+        legacy = [f"$2b$12${normalize_code(c)}" for c in ("AAAA-BBBB", "CCCC-DDDD")]
+        self.assertTrue(has_legacy_codes(legacy))
+
+        for _ in range(twofa._LEGACY_SCANS):
+            matched, _ = await verify_and_consume("GGGG-HHHH", legacy, "alice")
+            self.assertFalse(matched)
+        self.assertEqual(self.hasher.checks, 2 * twofa._LEGACY_SCANS)
+
+        # Out of budget: even the right code is not checked for this account.
+        matched, _ = await verify_and_consume("AAAA-BBBB", legacy, "alice")
+        self.assertFalse(matched)
+        self.assertEqual(self.hasher.checks, 2 * twofa._LEGACY_SCANS)
+
+        matched, remaining = await verify_and_consume("AAAA-BBBB", legacy, "bob")
+        self.assertTrue(matched)
+        self.assertEqual(remaining, legacy[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()